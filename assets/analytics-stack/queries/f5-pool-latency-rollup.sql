@@ -0,0 +1,72 @@
+-- F5 Pool Latency from Hourly Rollups
+-- Percentiles de latencia por pool mergeando los histogramas de f5_rollup_hour
+-- (escanea KB de rollups en lugar de las filas de f5_logs)
+
+WITH pool_totals AS (
+    SELECT 
+        entorno_nodo as f5_bigip,
+        ambiente_pool as f5_pool,
+        SUM(request_count) as total_requests,
+        SUM(response_time_sum_ms) * 1.0 / SUM(request_count) as avg_response_time_ms,
+        MAX(response_time_max_ms) as max_response_time_ms,
+        SUM(error_count) as error_count,
+        SUM(server_error_count) as server_errors,
+        (SUM(error_count) * 100.0 / SUM(request_count)) as error_rate_percent,
+        SUM(bytes_sum) as total_bytes_served
+    FROM "DATABASE_NAME_PLACEHOLDER"."f5_rollup_hour"
+    WHERE year = '2025' AND month = '8'
+        AND ambiente_pool IS NOT NULL
+    GROUP BY entorno_nodo, ambiente_pool
+),
+pool_buckets AS (
+    SELECT 
+        entorno_nodo as f5_bigip,
+        ambiente_pool as f5_pool,
+        bucket,
+        SUM(bucket_count) as bucket_count
+    FROM "DATABASE_NAME_PLACEHOLDER"."f5_rollup_hour"
+    CROSS JOIN UNNEST(latency_buckets) AS t (bucket, bucket_count)
+    WHERE year = '2025' AND month = '8'
+        AND ambiente_pool IS NOT NULL
+    GROUP BY entorno_nodo, ambiente_pool, bucket
+),
+cumulative AS (
+    SELECT 
+        f5_bigip,
+        f5_pool,
+        bucket,
+        SUM(bucket_count) OVER (PARTITION BY f5_bigip, f5_pool ORDER BY bucket) * 1.0
+            / SUM(bucket_count) OVER (PARTITION BY f5_bigip, f5_pool) as cumulative_ratio
+    FROM pool_buckets
+),
+percentiles AS (
+    -- Valor representativo del bucket i: 2 * gamma^i / (gamma + 1), gamma = 1.01 / 0.99 (error relativo 1%)
+    SELECT 
+        f5_bigip,
+        f5_pool,
+        2 * POWER(1.01 / 0.99, MIN(CASE WHEN cumulative_ratio >= 0.50 THEN bucket END)) / (1.01 / 0.99 + 1) as p50_response_time_ms,
+        2 * POWER(1.01 / 0.99, MIN(CASE WHEN cumulative_ratio >= 0.95 THEN bucket END)) / (1.01 / 0.99 + 1) as p95_response_time_ms,
+        2 * POWER(1.01 / 0.99, MIN(CASE WHEN cumulative_ratio >= 0.99 THEN bucket END)) / (1.01 / 0.99 + 1) as p99_response_time_ms
+    FROM cumulative
+    GROUP BY f5_bigip, f5_pool
+)
+SELECT 
+    t.f5_bigip,
+    t.f5_pool,
+    t.total_requests,
+    t.avg_response_time_ms,
+    p.p50_response_time_ms,
+    p.p95_response_time_ms,
+    p.p99_response_time_ms,
+    t.max_response_time_ms,
+    t.error_count,
+    t.server_errors,
+    t.error_rate_percent,
+    t.total_bytes_served
+FROM pool_totals t
+JOIN percentiles p
+    ON t.f5_bigip IS NOT DISTINCT FROM p.f5_bigip
+    AND t.f5_pool = p.f5_pool
+WHERE t.total_requests >= 10
+ORDER BY p.p95_response_time_ms DESC, t.error_rate_percent DESC
+LIMIT 50
@@ -0,0 +1,63 @@
+-- GENERADO por scripts/generate_f5_schema.py desde f5-logs-table-schema.yaml - no editar a mano
+CREATE EXTERNAL TABLE IF NOT EXISTS `DATABASE_NAME_PLACEHOLDER`.`f5_logs` (
+  `timestamp_syslog` string COMMENT 'Original syslog timestamp',
+  `hostname` string COMMENT 'Host generating the log',
+  `ip_cliente_externo` string COMMENT 'External client IP',
+  `ip_red_interna` string COMMENT 'Internal backend IP',
+  `usuario_autenticado` string COMMENT 'Authenticated user if any',
+  `identidad` string COMMENT 'Identity field',
+  `timestamp_apache` string COMMENT 'HTTP request timestamp',
+  `metodo` string COMMENT 'HTTP method (GET, POST, etc.)',
+  `recurso` string COMMENT 'Requested resource path',
+  `protocolo` string COMMENT 'HTTP protocol version',
+  `codigo_respuesta` int COMMENT 'HTTP status code',
+  `tamano_respuesta` int COMMENT 'Response size in bytes',
+  `referer` string COMMENT 'HTTP referer header',
+  `user_agent` string COMMENT 'User agent string',
+  `tiempo_respuesta_ms` int COMMENT 'Response time in milliseconds',
+  `edad_cache` string COMMENT 'Cache age/TTL',
+  `content_type` string COMMENT 'Content MIME type',
+  `campo_reservado_1` string COMMENT 'Java session ID (JSESSIONID)',
+  `campo_reservado_2` string COMMENT 'Reserved field',
+  `ambiente_origen` string COMMENT 'F5 VirtualServer name',
+  `ambiente_pool` string COMMENT 'F5 Pool name',
+  `entorno_nodo` string COMMENT 'F5 BigIP node name',
+  `parsed_timestamp_syslog` string COMMENT 'Parsed syslog timestamp (ISO 8601)',
+  `parsed_timestamp_apache` string COMMENT 'Parsed HTTP timestamp (ISO 8601)',
+  `is_error` boolean COMMENT 'True if HTTP error (4xx/5xx)',
+  `status_category` string COMMENT 'HTTP status category (success/client_error/server_error)',
+  `is_slow` boolean COMMENT 'True if response time > threshold',
+  `response_time_category` string COMMENT 'Response time category (fast/normal/slow/critical)',
+  `is_mobile` boolean COMMENT 'True if mobile device detected',
+  `content_category` string COMMENT 'Content type category (html/js/css/image/font/api)',
+  `cache_hit` boolean COMMENT 'True if cache hit detected',
+  `processing_timestamp` string COMMENT 'ETL processing timestamp (ISO 8601)',
+  `etl_version` string COMMENT 'ETL script version',
+  `source_object` string COMMENT 'Raw S3 object the record was read from (idempotent reprocessing)'
+)
+COMMENT 'F5 access logs processed with enhanced F5-specific metrics'
+PARTITIONED BY (
+  `year` string COMMENT 'Year partition (YYYY)',
+  `month` string COMMENT 'Month partition (1-12)',
+  `day` string COMMENT 'Day partition (1-31)',
+  `hour` string COMMENT 'Hour partition (0-23)'
+)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat'
+LOCATION 's3://PROCESSED_BUCKET_PLACEHOLDER/f5-logs/'
+TBLPROPERTIES (
+  'classification'='parquet',
+  'compressionType'='snappy',
+  'typeOfData'='file',
+  'projection.enabled'='true',
+  'projection.year.type'='integer',
+  'projection.year.range'='2025,2035',
+  'projection.month.type'='integer',
+  'projection.month.range'='1,12',
+  'projection.day.type'='integer',
+  'projection.day.range'='1,31',
+  'projection.hour.type'='integer',
+  'projection.hour.range'='0,23',
+  'storage.location.template'='s3://PROCESSED_BUCKET_PLACEHOLDER/f5-logs/year=${year}/month=${month}/day=${day}/hour=${hour}/'
+);
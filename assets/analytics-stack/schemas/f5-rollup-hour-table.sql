@@ -0,0 +1,45 @@
+-- GENERADO por scripts/generate_f5_schema.py desde f5-rollup-hour-table-schema.yaml - no editar a mano
+CREATE EXTERNAL TABLE IF NOT EXISTS `DATABASE_NAME_PLACEHOLDER`.`f5_rollup_hour` (
+  `entorno_nodo` string COMMENT 'F5 BigIP node name',
+  `ambiente_pool` string COMMENT 'F5 Pool name',
+  `ambiente_origen` string COMMENT 'F5 VirtualServer name',
+  `status_category` string COMMENT 'HTTP status category',
+  `content_category` string COMMENT 'Content type category',
+  `request_count` bigint COMMENT 'Requests in the window',
+  `error_count` bigint COMMENT 'Requests with HTTP 4xx/5xx',
+  `server_error_count` bigint COMMENT 'Requests with HTTP 5xx',
+  `slow_count` bigint COMMENT 'Requests over the slow threshold',
+  `mobile_count` bigint COMMENT 'Requests from mobile devices',
+  `cache_hit_count` bigint COMMENT 'Requests served from cache',
+  `response_time_sum_ms` bigint COMMENT 'Sum of response times (AVG = response_time_sum_ms / request_count)',
+  `response_time_max_ms` int COMMENT 'Maximum response time',
+  `bytes_sum` bigint COMMENT 'Sum of response sizes in bytes',
+  `latency_buckets` map<int,bigint> COMMENT 'Log-bucket latency histogram: bucket i covers (gamma^(i-1), gamma^i] ms, gamma = 1.01/0.99',
+  `latency_sketch` binary COMMENT 'Same histogram serialized as f5sketch.LatencySketch (merge/quantile from Python)'
+)
+COMMENT 'F5 access-log rollup per hour and pool/virtual server/status/content'
+PARTITIONED BY (
+  `year` string COMMENT 'Year partition (YYYY)',
+  `month` string COMMENT 'Month partition (1-12)',
+  `day` string COMMENT 'Day partition (1-31)',
+  `hour` string COMMENT 'Hour partition (0-23)'
+)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'
+STORED AS INPUTFORMAT 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat'
+OUTPUTFORMAT 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat'
+LOCATION 's3://PROCESSED_BUCKET_PLACEHOLDER/f5-rollups/hour/'
+TBLPROPERTIES (
+  'classification'='parquet',
+  'compressionType'='snappy',
+  'typeOfData'='file',
+  'projection.enabled'='true',
+  'projection.year.type'='integer',
+  'projection.year.range'='2025,2035',
+  'projection.month.type'='integer',
+  'projection.month.range'='1,12',
+  'projection.day.type'='integer',
+  'projection.day.range'='1,31',
+  'projection.hour.type'='integer',
+  'projection.hour.range'='0,23',
+  'storage.location.template'='s3://PROCESSED_BUCKET_PLACEHOLDER/f5-rollups/hour/year=${year}/month=${month}/day=${day}/hour=${hour}/'
+);
@@ -0,0 +1,379 @@
+"""
+AGESIC Data Lake PoC - Compactación de Particiones F5
+AWS Glue 5.0 (Spark 3.5.4) - Reescritura de archivos pequeños
+
+Firehose entrega un objeto GZIP cada 5 MB / 300 s y los ETL escriben un
+Parquet por tarea y partición, por lo que cada hora acumula decenas de
+objetos pequeños. Este job reescribe las particiones horarias cerradas en
+archivos de ~target_file_mb:
+
+- Raw Firehose:  s3://<raw>/<solution>/year=YYYY/month=MM/day=DD/hour=HH/  (texto GZIP)
+- Procesado:     s3://<processed>/f5-logs/year=Y/month=M/day=D/hour=H/     (Parquet)
+- Procesado legacy: s3://<processed>/<solution>/year=Y/month=M/day=D/hour=H/ (Parquet)
+
+Intercambio de archivos (S3 no tiene rename atómico):
+1. Se escribe la versión compactada en _compaction/<run_id>/ y se valida
+   que tenga la misma cantidad de filas que los archivos originales
+2. Se registra un journal (_compaction/journal/) con objetos viejos y nuevos
+3. Se copian los archivos nuevos a la partición y se borran los viejos
+4. Se borra el journal. Si el job falla entre 2 y 4, la siguiente ejecución
+   completa el intercambio pendiente antes de compactar
+
+Los Parquet compactados se escriben con las mismas opciones que los ETL
+(f5parquet: bloom filters y maxRecordsPerFile), para no perder los bloom
+filters al reescribir una partición.
+
+Los archivos raw compactados se llaman compacted-*.gz y los ETL los excluyen
+de su lectura (como son objetos nuevos el bookmark los volvería a procesar).
+Por eso una hora raw solo se compacta si, además de tener más de
+raw_closed_after_hours, todos sus objetos son anteriores al inicio de la
+última ejecución exitosa de cada ETL de --etl_job_names: si un ETL está
+atrasado o falló, la hora se deja sin compactar hasta que la consuma.
+
+Las particiones procesadas las reescriben también los ETL (lectura de lo
+existente + sobrescritura dinámica, incluso en horas viejas por datos
+tardíos). Para no competir con esa sobrescritura, una partición procesada
+no se compacta mientras haya una ejecución de --etl_job_names en curso ni si
+algún archivo se escribió en las últimas closed_after_hours.
+
+Autor: AWS Data Engineer
+Versión: 1.0
+"""
+
+import sys
+import json
+import math
+import time
+import boto3
+from datetime import datetime, timedelta, timezone
+from awsglue.utils import getResolvedOptions
+from pyspark.context import SparkContext
+from awsglue.context import GlueContext
+from awsglue.job import Job
+
+# Opciones del writer Parquet compartidas con los ETL (vía --extra-py-files)
+from f5parquet import DEFAULT_MAX_RECORDS_PER_FILE, parquet_write_options
+
+# Resolución de argumentos
+args = getResolvedOptions(sys.argv, [
+    'JOB_NAME',
+    'raw_bucket',
+    'processed_bucket',
+    'solution_name'
+])
+
+# Argumentos opcionales con sus valores por defecto
+OPTIONAL_ARGS = {
+    'target_file_mb': '192',            # Tamaño objetivo por archivo compactado
+    'lookback_hours': '72',             # Horas hacia atrás que se revisan
+    'closed_after_hours': '6',          # Partición procesada cerrada (incluye desfase de zona horaria)
+    'raw_closed_after_hours': '48',     # Partición raw cerrada y ya procesada por los ETL
+    'min_files': '4',                   # Mínimo de archivos para compactar una partición
+    'max_records_per_file': str(DEFAULT_MAX_RECORDS_PER_FILE),  # Mismo presupuesto que los ETL
+    'etl_job_names': ''                 # Jobs ETL (coma) que deben haber consumido el raw
+}
+for name, default in OPTIONAL_ARGS.items():
+    if f'--{name}' in sys.argv:
+        args.update(getResolvedOptions(sys.argv, [name]))
+    else:
+        args[name] = default
+
+TARGET_FILE_BYTES = int(args['target_file_mb']) * 1024 * 1024
+MIN_FILES = int(args['min_files'])
+MAX_RECORDS_PER_FILE = int(args['max_records_per_file'])
+
+# Tolerancia del bookmark S3 alrededor del inicio de una ejecución: un objeto
+# escrito poco antes puede quedar para la ejecución siguiente
+ETL_BOOKMARK_MARGIN = timedelta(minutes=15)
+
+# Estados de una ejecución Glue que todavía puede escribir
+ACTIVE_RUN_STATES = ('STARTING', 'RUNNING', 'STOPPING', 'WAITING')
+
+# Layout de columnas (f5parquet.BLOOM_FILTER_COLUMNS) de cada tipo de partición Parquet
+PARQUET_LAYOUTS = {"processed": "f5_logs", "processed_legacy": "legacy"}
+
+# Prefijos de trabajo (ignorados por ETL, crawlers y Athena por empezar con '_')
+STAGING_PREFIX = "_compaction"
+JOURNAL_PREFIX = f"{STAGING_PREFIX}/journal"
+
+sc = SparkContext()
+glueContext = GlueContext(sc)
+spark = glueContext.spark_session
+job = Job(glueContext)
+job.init(args['JOB_NAME'], args)
+
+s3_client = boto3.client('s3')
+run_id = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+
+print(f"Iniciando compactación F5 con AWS Glue 5.0 (Spark {spark.version}) - run {run_id}")
+print(f"Tamaño objetivo: {args['target_file_mb']} MB, ventana: {args['lookback_hours']} horas")
+
+def list_data_objects(bucket, prefix):
+    """Objetos de datos de una partición (omite marcadores como _SUCCESS y subcarpetas)"""
+    objects = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter='/'):
+        for item in page.get('Contents', []):
+            name = item['Key'][len(prefix):]
+            if name and not name.startswith(('_', '.')) and item['Size'] > 0:
+                objects.append((item['Key'], item['Size']))
+    return objects
+
+def delete_keys(bucket, keys):
+    """Borrado en lotes de 1000 (límite de DeleteObjects)"""
+    for start in range(0, len(keys), 1000):
+        chunk = keys[start:start + 1000]
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in chunk], 'Quiet': True}
+        )
+
+def closed_partitions(closed_after_hours):
+    """Horas (UTC) cerradas dentro de la ventana de lookback, de la más reciente a la más antigua"""
+    newest = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=closed_after_hours)
+    return [newest - timedelta(hours=offset) for offset in range(int(args['lookback_hours']))]
+
+def etl_job_names():
+    return [name.strip() for name in args['etl_job_names'].split(',') if name.strip()]
+
+def running_etl_jobs():
+    """Jobs de --etl_job_names con una ejecución en curso"""
+    glue_client = boto3.client('glue')
+    running = []
+    for job_name in etl_job_names():
+        # Primera página: las ejecuciones más recientes
+        runs = glue_client.get_job_runs(JobName=job_name, MaxResults=10)['JobRuns']
+        if any(run['JobRunState'] in ACTIVE_RUN_STATES for run in runs):
+            running.append(job_name)
+    return running
+
+def etl_consumed_before():
+    """
+    Instante hasta el que los ETL ya consumieron el raw: inicio de la última
+    ejecución exitosa de cada job de --etl_job_names (el más antiguo) menos
+    ETL_BOOKMARK_MARGIN. None si no hay jobs configurados o alguno nunca
+    terminó bien: en ese caso no se compacta raw
+    """
+    job_names = etl_job_names()
+    if not job_names:
+        print("Sin --etl_job_names: no se compactan particiones raw")
+        return None
+
+    glue_client = boto3.client('glue')
+    cutoffs = []
+    for job_name in job_names:
+        last_success = None
+        # get_job_runs devuelve las ejecuciones de la más reciente a la más antigua
+        for page in glue_client.get_paginator('get_job_runs').paginate(JobName=job_name):
+            succeeded = [run['StartedOn'] for run in page['JobRuns'] if run['JobRunState'] == 'SUCCEEDED']
+            if succeeded:
+                last_success = max(succeeded)
+                break
+        if last_success is None:
+            print(f"{job_name} no tiene ejecuciones exitosas: no se compactan particiones raw")
+            return None
+        print(f"Última ejecución exitosa de {job_name}: {last_success.isoformat()}")
+        cutoffs.append(last_success)
+    return min(cutoffs) - ETL_BOOKMARK_MARGIN
+
+def modified_since(bucket, prefix, cutoff, skip_prefixes=('_', '.')):
+    """True si algún objeto de datos de la partición se escribió en cutoff o después"""
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter='/'):
+        for item in page.get('Contents', []):
+            name = item['Key'][len(prefix):]
+            if name.startswith(skip_prefixes):
+                continue
+            if item['LastModified'] >= cutoff:
+                return True
+    return False
+
+def consumed_by_etl(bucket, prefix, cutoff):
+    """True si todos los objetos raw originales de la partición son anteriores a cutoff"""
+    # Los compacted-* son de horas ya consumidas, con fecha de la compactación
+    return not modified_since(bucket, prefix, cutoff, ('_', '.', 'compacted-'))
+
+def recently_written(bucket, prefix):
+    """True si un ETL (o una compactación) escribió la partición en las últimas closed_after_hours"""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=int(args['closed_after_hours']))
+    return modified_since(bucket, prefix, cutoff)
+
+def compaction_targets(raw_cutoff):
+    """Particiones candidatas: (tipo, bucket, prefijo, formato)"""
+    targets = []
+    raw_hours = closed_partitions(int(args['raw_closed_after_hours'])) if raw_cutoff else []
+    for hour in raw_hours:
+        # Firehose usa valores con cero a la izquierda
+        targets.append((
+            "raw", args['raw_bucket'],
+            f"{args['solution_name']}/year={hour:%Y}/month={hour:%m}/day={hour:%d}/hour={hour:%H}/",
+            "text"
+        ))
+    for hour in closed_partitions(int(args['closed_after_hours'])):
+        # Spark escribe las particiones enteras sin ceros a la izquierda
+        partition_path = f"year={hour.year}/month={hour.month}/day={hour.day}/hour={hour.hour}/"
+        targets.append(("processed", args['processed_bucket'], f"f5-logs/{partition_path}", "parquet"))
+        targets.append(("processed_legacy", args['processed_bucket'], f"{args['solution_name']}/{partition_path}", "parquet"))
+    return targets
+
+def apply_journal(bucket, journal_key, journal):
+    """Completa un intercambio: copia archivos nuevos faltantes, borra los viejos y el journal"""
+    existing = {key for key, _ in list_data_objects(bucket, journal['prefix'])}
+    for staging_key, final_key in journal['new_keys']:
+        if final_key not in existing:
+            s3_client.copy({'Bucket': bucket, 'Key': staging_key}, bucket, final_key)
+    delete_keys(bucket, [key for key in journal['old_keys'] if key in existing])
+    delete_keys(bucket, [staging_key for staging_key, _ in journal['new_keys']])
+    s3_client.delete_object(Bucket=bucket, Key=journal_key)
+
+def recover_pending_swaps(bucket):
+    """Completa intercambios que quedaron a medias en una ejecución anterior"""
+    paginator = s3_client.get_paginator('list_objects_v2')
+    recovered = 0
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{JOURNAL_PREFIX}/"):
+        for item in page.get('Contents', []):
+            journal = json.loads(s3_client.get_object(Bucket=bucket, Key=item['Key'])['Body'].read())
+            print(f"Completando intercambio pendiente: s3://{bucket}/{journal['prefix']}")
+            apply_journal(bucket, item['Key'], journal)
+            recovered += 1
+    return recovered
+
+def compact_partition(kind, bucket, prefix, data_format):
+    """Compacta una partición y devuelve su resultado (o None si no hace falta)"""
+    objects = list_data_objects(bucket, prefix)
+    total_bytes = sum(size for _, size in objects)
+    target_files = max(1, math.ceil(total_bytes / TARGET_FILE_BYTES))
+
+    if len(objects) < MIN_FILES or len(objects) <= target_files:
+        return None
+
+    source_paths = [f"s3://{bucket}/{key}" for key, _ in objects]
+    staging_path = f"{STAGING_PREFIX}/{run_id}/{prefix}"
+
+    # coalesce (sin shuffle) conserva el orden de filas dentro de cada archivo
+    if data_format == "parquet":
+        source_df = spark.read.option("mergeSchema", "true").parquet(*source_paths)
+        source_df.coalesce(target_files).write.mode("overwrite") \
+            .option("compression", "snappy") \
+            .option("maxRecordsPerFile", MAX_RECORDS_PER_FILE) \
+            .options(**parquet_write_options(PARQUET_LAYOUTS[kind])) \
+            .parquet(f"s3://{bucket}/{staging_path}")
+        compacted_df = spark.read.parquet(f"s3://{bucket}/{staging_path}")
+        extension = ".snappy.parquet"
+    else:
+        source_df = spark.read.text(source_paths)
+        source_df.coalesce(target_files).write.mode("overwrite") \
+            .option("compression", "gzip").text(f"s3://{bucket}/{staging_path}")
+        compacted_df = spark.read.text(f"s3://{bucket}/{staging_path}")
+        extension = ".gz"
+
+    source_rows = source_df.count()
+    compacted_rows = compacted_df.count()
+    if source_rows != compacted_rows:
+        print(f"Advertencia: filas distintas en s3://{bucket}/{prefix} ({source_rows} vs {compacted_rows}), se descarta")
+        delete_keys(bucket, [key for key, _ in list_data_objects(bucket, staging_path)])
+        return {"kind": kind, "prefix": prefix, "status": "row_count_mismatch",
+                "files_before": len(objects), "rows": source_rows}
+
+    staging_objects = list_data_objects(bucket, staging_path)
+    journal = {
+        "prefix": prefix,
+        "old_keys": [key for key, _ in objects],
+        "new_keys": [
+            (staging_key, f"{prefix}compacted-{run_id}-{index:05d}{extension}")
+            for index, (staging_key, _) in enumerate(staging_objects)
+        ]
+    }
+    journal_key = f"{JOURNAL_PREFIX}/{run_id}/{kind}/{prefix.replace('/', '_')}.json"
+    s3_client.put_object(Bucket=bucket, Key=journal_key, Body=json.dumps(journal).encode('utf-8'))
+    apply_journal(bucket, journal_key, journal)
+
+    result = {
+        "kind": kind,
+        "prefix": prefix,
+        "status": "compacted",
+        "rows": source_rows,
+        "files_before": len(objects),
+        "files_after": len(staging_objects),
+        "bytes_before": total_bytes,
+        "bytes_after": sum(size for _, size in staging_objects)
+    }
+    print(f"Compactada s3://{bucket}/{prefix}: {result['files_before']} -> {result['files_after']} archivos")
+    return result
+
+def emit_job_report(report):
+    """
+    Emitir reporte del job: una línea JSON en el log (CloudWatch) y una copia
+    en s3://<processed_bucket>/job-reports/<job>/
+    """
+    report_json = json.dumps(report, ensure_ascii=False, default=str)
+    print(f"JOB_REPORT {report_json}")
+
+    report_key = f"job-reports/{args['JOB_NAME']}/{run_id}.json"
+    try:
+        s3_client.put_object(
+            Bucket=args['processed_bucket'],
+            Key=report_key,
+            Body=report_json.encode('utf-8'),
+            ContentType='application/json'
+        )
+        print(f"Reporte del job guardado en s3://{args['processed_bucket']}/{report_key}")
+    except Exception as e:
+        print(f"Advertencia: no se pudo guardar el reporte del job: {str(e)}")
+
+def compact_partitions():
+    """Función principal de compactación"""
+    start_time = time.time()
+
+    recovered = sum(recover_pending_swaps(bucket) for bucket in {args['raw_bucket'], args['processed_bucket']})
+
+    raw_cutoff = etl_consumed_before()
+    raw_pending_etl = []
+    processed_skipped = []
+    results = []
+    for kind, bucket, prefix, data_format in compaction_targets(raw_cutoff):
+        try:
+            if kind == "raw" and not consumed_by_etl(bucket, prefix, raw_cutoff):
+                raw_pending_etl.append(prefix)
+                continue
+            if kind != "raw":
+                # Se consulta por partición: un ETL puede arrancar durante la compactación
+                running = running_etl_jobs()
+                if running or recently_written(bucket, prefix):
+                    processed_skipped.append({
+                        "prefix": prefix,
+                        "reason": f"etl_running: {', '.join(running)}" if running else "recently_written"
+                    })
+                    continue
+            result = compact_partition(kind, bucket, prefix, data_format)
+            if result:
+                results.append(result)
+        except Exception as e:
+            print(f"Error compactando s3://{bucket}/{prefix}: {str(e)}")
+            results.append({"kind": kind, "prefix": prefix, "status": "error", "error": str(e)[:500]})
+
+    compacted = [result for result in results if result['status'] == 'compacted']
+    emit_job_report({
+        "job_name": args['JOB_NAME'],
+        "run_id": run_id,
+        "target_file_mb": int(args['target_file_mb']),
+        "recovered_swaps": recovered,
+        "raw_etl_cutoff": raw_cutoff,
+        "raw_pending_etl": raw_pending_etl,
+        "processed_skipped": processed_skipped,
+        "partitions_compacted": len(compacted),
+        "files_before": sum(result['files_before'] for result in compacted),
+        "files_after": sum(result['files_after'] for result in compacted),
+        "partitions": results,
+        "duration_seconds": round(time.time() - start_time, 1)
+    })
+
+    if any(result['status'] != 'compacted' for result in results):
+        raise RuntimeError("Compactación con errores, revisar JOB_REPORT")
+
+# Ejecución principal
+if __name__ == "__main__":
+    try:
+        compact_partitions()
+    finally:
+        job.commit()
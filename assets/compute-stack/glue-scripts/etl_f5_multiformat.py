@@ -9,6 +9,10 @@ CARACTERÍSTICAS MULTIFORMATO:
  Fallback robusto entre formatos
  Validación y limpieza de datos
  Métricas detalladas de procesamiento
+ Modo vectorizado Arrow (mapInArrow) con fallback RDD (--processing_mode rdd)
+ Procesamiento incremental: job bookmarks + sobrescritura dinámica de particiones
+ Escritura con presupuesto de filas por archivo y orden por pool/virtual server/código
+ Rollups por minuto y por hora (f5_rollup_minute / f5_rollup_hour) con histograma de latencia mergeable
 
 CHANGELOG v3.0 (2025-08-20):
 - Implementado detector automático de formato
@@ -27,15 +31,26 @@ import sys
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
 from pyspark.context import SparkContext
+from pyspark import TaskContext, StorageLevel
+from pyspark.accumulators import AccumulatorParam
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from awsglue.dynamicframe import DynamicFrame
 from pyspark.sql import functions as F
+from pyspark.sql import Observation
 from pyspark.sql.types import *
 import re
 import json
+import time
+import boto3
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
+
+# Parser F5 compartido (distribuido vía --extra-py-files)
+from f5parse import parse_line, parse_batch, AVRO_FIELD_NAMES, VALID_COLUMN
+from f5schema import spark_schema
+from f5sketch import GAMMA as LATENCY_SKETCH_GAMMA, LatencySketch
+from f5parquet import DEFAULT_MAX_RECORDS_PER_FILE, parquet_write_options
 
 # Resolución de argumentos
 args = getResolvedOptions(sys.argv, [
@@ -45,6 +60,38 @@ args = getResolvedOptions(sys.argv, [
     'solution_name'
 ])
 
+# Modo de procesamiento opcional: 'arrow' (mapInArrow vectorizado, por defecto)
+# o 'rdd' (fallback fila a fila con df.rdd.map)
+if '--processing_mode' in sys.argv:
+    args.update(getResolvedOptions(sys.argv, ['processing_mode']))
+PROCESSING_MODE = args.get('processing_mode', 'arrow').lower()
+
+# Presupuesto de filas por archivo Parquet (~128-256 MB con el esquema F5)
+if '--max_records_per_file' in sys.argv:
+    args.update(getResolvedOptions(sys.argv, ['max_records_per_file']))
+MAX_RECORDS_PER_FILE = int(args.get('max_records_per_file', str(DEFAULT_MAX_RECORDS_PER_FILE)))
+
+# Líneas por lote Arrow en mapInArrow
+ARROW_BATCH_SIZE = 5000
+
+# Columna con el objeto raw de origen de cada línea (attachFilename de Glue).
+# Se conserva en f5-logs/ para que reprocesar un objeto reemplace sus filas
+SOURCE_OBJECT_COLUMN = "source_object"
+
+# Particionado de f5-logs/
+PARTITION_COLUMNS = ["year", "month", "day", "hour"]
+
+# Orden dentro de cada archivo: las estadísticas min/max de Parquet permiten a
+# Athena saltar row groups en las consultas filtradas por pool y código
+SORT_COLUMNS = ["ambiente_pool", "ambiente_origen", "codigo_respuesta"]
+
+# Rollups de f5-logs/ (tablas f5_rollup_minute y f5_rollup_hour en f5-rollups/)
+ROLLUP_DIMENSIONS = ["entorno_nodo", "ambiente_pool", "ambiente_origen", "status_category", "content_category"]
+ROLLUP_SUM_COLUMNS = [
+    "request_count", "error_count", "server_error_count", "slow_count",
+    "mobile_count", "cache_hit_count", "response_time_sum_ms", "bytes_sum"
+]
+
 # Inicializar contexto Glue 5.0
 sc = SparkContext()
 glueContext = GlueContext(sc)
@@ -56,25 +103,82 @@ job.init(args['JOB_NAME'], args)
 spark.conf.set("spark.sql.adaptive.enabled", "true")
 spark.conf.set("spark.sql.adaptive.coalescePartitions.enabled", "true")
 spark.conf.set("spark.sql.adaptive.skewJoin.enabled", "true")
+spark.conf.set("spark.sql.execution.arrow.maxRecordsPerBatch", str(ARROW_BATCH_SIZE))
 
 print(f" Iniciando ETL F5 MULTIFORMATO con AWS Glue 5.0 (Spark {spark.version})")
 print(f" Procesando desde s3://{args['raw_bucket']} hacia s3://{args['processed_bucket']}")
+print(f" Modo de procesamiento: {PROCESSING_MODE}")
+
+# Esquema de salida F5 (común a los modos arrow y rdd), generado desde
+# f5-logs-table-schema.yaml: mismos nombres y tipos que la tabla f5_logs
+F5_SCHEMA = spark_schema()
+
+# Campos entre comillas que se limpian en convert_data_types
+QUOTED_FIELDS = [
+    'identidad', 'referer', 'user_agent', 'edad_cache',
+    'content_type', 'campo_reservado_1', 'ambiente_origen', 'ambiente_pool'
+]
 
-# Patrón regex F5 validado (100% funcional en pruebas locales)
-F5_LOG_PATTERN = r'(?P<timestamp_syslog>\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}) (?P<hostname>[^\s]+) (?P<ip_cliente_externo>[^\s]+) \[(?P<ip_red_interna>[^\]]+)\] (?P<usuario_autenticado>-|"[^"]*") (?P<identidad>"[^"]*") \[(?P<timestamp_apache>[^\]]+)\] "(?P<metodo>\w+) (?P<recurso>[^"]+) (?P<protocolo>HTTP/\d\.\d)" (?P<codigo_respuesta>\d+) (?P<tamano_respuesta>\d+) "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)" Time (?P<tiempo_respuesta_ms>\d+) Age "(?P<edad_cache>[^"]*)" "(?P<content_type>[^"]*)" "(?P<campo_reservado_1>[^"]*)" (?P<campo_reservado_2>-|"[^"]*") "(?P<ambiente_origen>[^"]*)" "(?P<ambiente_pool>[^"]*)" (?P<entorno_nodo>\w+)'
+# Límites superiores (µs por registro) del histograma de latencia de parseo
+LATENCY_BUCKETS_US = [10, 25, 50, 100, 250, 500, 1000, 5000]
+
+class ListAccumulatorParam(AccumulatorParam):
+    """Acumulador de listas: cada tarea agrega sus entradas y el driver las concatena"""
+    
+    def zero(self, value):
+        return []
+    
+    def addInPlace(self, value1, value2):
+        value1.extend(value2)
+        return value1
+
+class PartitionLatency:
+    """Histograma de latencia de parseo de una partición (se envía al driver al terminarla)"""
+    
+    def __init__(self):
+        self.records = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_US) + 1)
+    
+    def record(self, seconds: float, records: int = 1):
+        """Registra `records` parseados en `seconds` (un registro o un lote Arrow)"""
+        if records <= 0:
+            return
+        self.records += records
+        self.seconds += seconds
+        latency_us = seconds * 1_000_000 / records
+        index = len(LATENCY_BUCKETS_US)
+        for position, limit in enumerate(LATENCY_BUCKETS_US):
+            if latency_us <= limit:
+                index = position
+                break
+        self.buckets[index] += records
+    
+    def to_entry(self) -> Dict[str, Any]:
+        task_context = TaskContext.get()
+        return {
+            'partition': task_context.partitionId() if task_context else None,
+            'records': self.records,
+            'seconds': round(self.seconds, 4),
+            'buckets': self.buckets
+        }
 
 class F5LogProcessor:
     """Procesador multiformato para logs F5"""
     
-    def __init__(self):
+    def __init__(self, spark_context: SparkContext):
+        # Contadores como accumulators: el procesador se serializa a cada
+        # executor y un dict local quedaría en cero en el driver
         self.stats = {
-            'total_records': 0,
-            'json_records': 0,
-            'text_records': 0,
-            'parsed_successfully': 0,
-            'parsing_errors': 0,
-            'format_detection_errors': 0
+            'total_records': spark_context.accumulator(0),
+            'json_records': spark_context.accumulator(0),
+            'text_records': spark_context.accumulator(0),
+            'parsed_successfully': spark_context.accumulator(0),
+            'parsing_errors': spark_context.accumulator(0),
+            'format_detection_errors': spark_context.accumulator(0)
         }
+        # Una entrada por partición procesada (ver PartitionLatency)
+        self.partition_latency = spark_context.accumulator([], ListAccumulatorParam())
     
     def detect_format(self, record: str) -> str:
         """
@@ -122,13 +226,11 @@ class F5LogProcessor:
     def parse_text_record(self, text_line: str) -> Optional[Dict[str, Any]]:
         """Procesa registro de texto plano con regex"""
         try:
-            match = re.match(F5_LOG_PATTERN, text_line.strip())
-            if not match:
+            data = parse_line(text_line.strip(), AVRO_FIELD_NAMES)
+            if not data:
                 print(f" Text record doesn't match F5 pattern: {text_line[:100]}...")
                 return None
             
-            data = match.groupdict()
-            
             # Convertir tipos de datos
             data = self.convert_data_types(data)
             
@@ -154,8 +256,7 @@ class F5LogProcessor:
                 data['tiempo_respuesta_ms'] = int(data['tiempo_respuesta_ms'])
             
             # Limpiar campos con comillas
-            for field in ['identidad', 'referer', 'user_agent', 'edad_cache', 
-                         'content_type', 'campo_reservado_1', 'ambiente_origen', 'ambiente_pool']:
+            for field in QUOTED_FIELDS:
                 if data.get(field):
                     value = data[field]
                     if value.startswith('"') and value.endswith('"'):
@@ -308,29 +409,437 @@ class F5LogProcessor:
             self.stats['parsing_errors'] += 1
             return None
     
+    def process_batch(self, lines: List[str], source_object: Optional[str] = None) -> List[Any]:
+        """
+        Versión vectorizada de process_record para un lote de líneas (modo arrow)
+        
+        Las líneas de texto se parsean juntas con f5parse.parse_batch y se
+        enriquecen con pyarrow.compute; las JSON pasan por parse_json_record.
+        Devuelve RecordBatches con el esquema F5_SCHEMA (solo registros válidos),
+        con source_object (objeto raw de las líneas) en cada registro.
+        """
+        import pyarrow as pa
+        from pyspark.sql.pandas.types import to_arrow_schema
+        
+        arrow_schema = to_arrow_schema(F5_SCHEMA)
+        text_lines = []
+        json_lines = []
+        json_records = []
+        unknown_count = 0
+        
+        for line in lines:
+            format_type = self.detect_format(line)
+            
+            if format_type == 'text':
+                text_lines.append(line.strip())
+            elif format_type == 'json':
+                json_lines.append(line)
+            else:
+                unknown_count += 1
+        
+        # Un solo incremento de accumulator por lote
+        self.stats['total_records'] += len(lines)
+        self.stats['text_records'] += len(text_lines)
+        self.stats['json_records'] += len(json_lines)
+        self.stats['format_detection_errors'] += unknown_count
+        
+        for line in json_lines:
+            result = self.parse_json_record(line)
+            if result:
+                result[SOURCE_OBJECT_COLUMN] = source_object
+                json_records.append(result)
+        
+        batches = []
+        if text_lines:
+            parsed = parse_batch(text_lines, AVRO_FIELD_NAMES)
+            valid = parsed.filter(parsed.column(VALID_COLUMN))
+            if valid.num_rows:
+                batches.append(self.enrich_f5_batch(valid, arrow_schema, source_object))
+        if json_records:
+            batches.append(pa.RecordBatch.from_pylist(json_records, schema=arrow_schema))
+        
+        self.stats['parsed_successfully'] += sum(batch.num_rows for batch in batches)
+        return batches
+    
+    def enrich_f5_batch(self, batch, arrow_schema, source_object=None):
+        """
+        Equivalente columnar de convert_data_types + enrich_f5_data sobre un
+        RecordBatch de parse_batch (mismas reglas, expresiones pyarrow.compute)
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        
+        null_string = pa.scalar(None, pa.string())
+        columns = {name: batch.column(name) for name in AVRO_FIELD_NAMES}
+        
+        # El esquema Spark usa string plano para los campos con dictionary encoding
+        for name in ('ambiente_origen', 'ambiente_pool', 'entorno_nodo'):
+            columns[name] = columns[name].dictionary_decode()
+        
+        # Limpiar campos con comillas ('""' y '-' pasan a null)
+        for name in QUOTED_FIELDS:
+            value = columns[name]
+            quoted = pc.and_(pc.starts_with(value, '"'), pc.ends_with(value, '"'))
+            columns[name] = pc.if_else(
+                pc.is_in(value, value_set=pa.array(['""', '-'])),
+                null_string,
+                pc.if_else(quoted, pc.utf8_slice_codeunits(value, 1, -1), value)
+            )
+        for name in ('usuario_autenticado', 'campo_reservado_2'):
+            columns[name] = pc.if_else(pc.equal(columns[name], '-'), null_string, columns[name])
+        
+        codigo = columns['codigo_respuesta']
+        tiempo_ms = columns['tiempo_respuesta_ms'].cast(pa.int32())
+        columns['tiempo_respuesta_ms'] = tiempo_ms
+        columns['tamano_respuesta'] = columns['tamano_respuesta'].cast(pa.int32())
+        
+        # Timestamps (syslog sin año: se usa el año actual)
+        syslog_with_year = pc.binary_join_element_wise(
+            str(datetime.now().year),
+            pc.replace_substring_regex(columns['timestamp_syslog'], r'\s+', ' '),
+            ' '
+        )
+        apache_part = pc.replace_substring_regex(columns['timestamp_apache'], r' .*$', '')
+        dt_syslog = self._strptime_strict(syslog_with_year, '%Y %b %d %H:%M:%S', r'^\d{4} \w+ (?P<day>\d+) ')
+        dt_apache = self._strptime_strict(apache_part, '%d/%b/%Y:%H:%M:%S', r'^(?P<day>\d+)/')
+        columns['parsed_timestamp_syslog'] = pc.strftime(dt_syslog, format='%Y-%m-%dT%H:%M:%S')
+        columns['parsed_timestamp_apache'] = pc.strftime(dt_apache, format='%Y-%m-%dT%H:%M:%S')
+        columns['year'] = pc.year(dt_syslog).cast(pa.int32())
+        columns['month'] = pc.month(dt_syslog).cast(pa.int32())
+        columns['day'] = pc.day(dt_syslog).cast(pa.int32())
+        columns['hour'] = pc.hour(dt_syslog).cast(pa.int32())
+        
+        # Campos derivados para analytics
+        columns['is_error'] = pc.fill_null(pc.greater_equal(codigo, 400), False)
+        columns['status_category'] = pc.fill_null(pc.case_when(
+            pc.make_struct(
+                pc.and_(pc.greater_equal(codigo, 200), pc.less(codigo, 300)),
+                pc.and_(pc.greater_equal(codigo, 300), pc.less(codigo, 400)),
+                pc.and_(pc.greater_equal(codigo, 400), pc.less(codigo, 500)),
+                pc.greater_equal(codigo, 500),
+                field_names=['success', 'redirect', 'client_error', 'server_error']
+            ),
+            'success', 'redirect', 'client_error', 'server_error'
+        ), 'unknown')
+        
+        columns['is_slow'] = pc.fill_null(pc.greater(tiempo_ms, 5000), False)
+        columns['response_time_category'] = pc.fill_null(pc.case_when(
+            pc.make_struct(
+                pc.equal(tiempo_ms, 0),
+                pc.less(tiempo_ms, 100),
+                pc.less(tiempo_ms, 1000),
+                pc.less(tiempo_ms, 5000),
+                pc.is_valid(tiempo_ms),
+                field_names=['unknown', 'fast', 'normal', 'slow', 'very_slow']
+            ),
+            'unknown', 'fast', 'normal', 'slow', 'very_slow'
+        ), 'unknown')
+        
+        columns['is_mobile'] = pc.fill_null(
+            pc.match_substring_regex(columns['user_agent'], 'Mobile|iPhone|Android|iPad|Windows Phone'), False
+        )
+        
+        content_type = columns['content_type']
+        columns['content_category'] = pc.fill_null(pc.case_when(
+            pc.make_struct(
+                pc.match_substring(content_type, 'javascript'),
+                pc.match_substring(content_type, 'css'),
+                pc.match_substring(content_type, 'image'),
+                pc.match_substring(content_type, 'html'),
+                pc.match_substring_regex(content_type, 'json|api'),
+                pc.not_equal(content_type, ''),
+                field_names=['js', 'css', 'image', 'html', 'api', 'other']
+            ),
+            'js', 'css', 'image', 'html', 'api', 'other'
+        ), 'unknown')
+        
+        edad_cache = columns['edad_cache']
+        columns['cache_hit'] = pc.fill_null(
+            pc.and_(pc.not_equal(edad_cache, ''), pc.not_equal(edad_cache, '-')), False
+        )
+        
+        # Metadatos de procesamiento (uno por lote)
+        columns['processing_timestamp'] = pa.array([datetime.now().isoformat()] * batch.num_rows, pa.string())
+        columns['etl_version'] = pa.array(['3.0-multiformato'] * batch.num_rows, pa.string())
+        columns[SOURCE_OBJECT_COLUMN] = pa.array([source_object] * batch.num_rows, pa.string())
+        
+        return pa.RecordBatch.from_arrays(
+            [columns[field.name] for field in arrow_schema],
+            schema=arrow_schema
+        )
+    
+    @staticmethod
+    def _strptime_strict(values, format_string, day_pattern):
+        """
+        pc.strptime con el mismo criterio que datetime.strptime: Arrow acepta
+        días fuera de rango (Feb 30 -> Mar 2), por lo que se anulan las fechas
+        cuyo día no coincide con el del texto original
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        
+        parsed = pc.strptime(values, format=format_string, unit='s', error_is_null=True)
+        day = pc.struct_field(pc.extract_regex(values, day_pattern), [0]).cast(pa.int64())
+        return pc.if_else(pc.equal(pc.day(parsed), day), parsed, pa.scalar(None, parsed.type))
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Valores actuales de los contadores (solo en el driver)"""
+        return {name: accumulator.value for name, accumulator in self.stats.items()}
+    
+    def get_latency_report(self) -> Dict[str, Any]:
+        """Histograma global y por partición de la latencia de parseo"""
+        partitions = sorted(self.partition_latency.value, key=lambda entry: (entry['partition'] is None, entry['partition']))
+        totals = [0] * (len(LATENCY_BUCKETS_US) + 1)
+        for entry in partitions:
+            totals = [total + count for total, count in zip(totals, entry['buckets'])]
+        
+        labels = [f"<={limit}us" for limit in LATENCY_BUCKETS_US] + [f">{LATENCY_BUCKETS_US[-1]}us"]
+        records = sum(entry['records'] for entry in partitions)
+        seconds = sum(entry['seconds'] for entry in partitions)
+        return {
+            'records': records,
+            'parse_seconds': round(seconds, 3),
+            'records_per_second': round(records / seconds, 1) if seconds else None,
+            'histogram': dict(zip(labels, totals)),
+            'partitions': [
+                {
+                    'partition': entry['partition'],
+                    'records': entry['records'],
+                    'seconds': entry['seconds'],
+                    'records_per_second': round(entry['records'] / entry['seconds'], 1) if entry['seconds'] else None,
+                    'histogram': dict(zip(labels, entry['buckets']))
+                }
+                for entry in partitions
+            ]
+        }
+    
     def print_stats(self):
         """Imprime estadísticas de procesamiento"""
+        stats = self.get_stats()
+        latency = self.get_latency_report()
+        
         print("\n ESTADÍSTICAS DE PROCESAMIENTO MULTIFORMATO")
         print("=" * 60)
-        print(f"Total de registros procesados: {self.stats['total_records']}")
-        print(f" Registros JSON: {self.stats['json_records']}")
-        print(f" Registros texto plano: {self.stats['text_records']}")
-        print(f" Parseados exitosamente: {self.stats['parsed_successfully']}")
-        print(f" Errores de parsing: {self.stats['parsing_errors']}")
-        print(f" Errores de detección de formato: {self.stats['format_detection_errors']}")
-        
-        if self.stats['total_records'] > 0:
-            success_rate = (self.stats['parsed_successfully'] / self.stats['total_records']) * 100
+        print(f"Total de registros procesados: {stats['total_records']}")
+        print(f" Registros JSON: {stats['json_records']}")
+        print(f" Registros texto plano: {stats['text_records']}")
+        print(f" Parseados exitosamente: {stats['parsed_successfully']}")
+        print(f" Errores de parsing: {stats['parsing_errors']}")
+        print(f" Errores de detección de formato: {stats['format_detection_errors']}")
+        
+        if stats['total_records'] > 0:
+            success_rate = (stats['parsed_successfully'] / stats['total_records']) * 100
             print(f" Tasa de éxito: {success_rate:.2f}%")
         
+        if latency['records']:
+            print(f" Latencia de parseo: {latency['records_per_second']} registros/s en {len(latency['partitions'])} particiones")
+            for label, count in latency['histogram'].items():
+                print(f"   {label:>10}: {count}")
+        
         print("=" * 60)
 
 # Inicializar procesador
-processor = F5LogProcessor()
+processor = F5LogProcessor(sc)
+
+def extract_line_content(values) -> Optional[str]:
+    """Obtiene el contenido de la línea (puede estar en diferentes columnas)"""
+    for value in values:
+        if value and isinstance(value, str) and len(value.strip()) > 50:
+            return value.strip()
+    return None
+
+def process_arrow_batches(batches):
+    """
+    Función de mapInArrow: lotes Arrow de líneas crudas -> lotes con F5_SCHEMA.
+    Las líneas se procesan agrupadas por objeto raw de origen
+    """
+    latency = PartitionLatency()
+    for batch in batches:
+        names = batch.schema.names
+        source_index = names.index(SOURCE_OBJECT_COLUMN) if SOURCE_OBJECT_COLUMN in names else None
+        columns = [column.to_pylist() for index, column in enumerate(batch.columns) if index != source_index]
+        sources = batch.column(source_index).to_pylist() if source_index is not None else [None] * batch.num_rows
+        lines_by_source = {}
+        for source_object, row in zip(sources, zip(*columns)):
+            line = extract_line_content(row)
+            if line:
+                lines_by_source.setdefault(source_object, []).append(line)
+        for source_object, lines in lines_by_source.items():
+            start = time.perf_counter()
+            results = processor.process_batch(lines, source_object)
+            latency.record(time.perf_counter() - start, len(lines))
+            yield from results
+    processor.partition_latency.add([latency.to_entry()])
+
+def process_partition(rows):
+    """Modo rdd: procesa una partición fila a fila midiendo la latencia por registro"""
+    latency = PartitionLatency()
+    for row in rows:
+        values = row.asDict()
+        source_object = values.pop(SOURCE_OBJECT_COLUMN, None)
+        line_content = extract_line_content(values.values())
+        if not line_content:
+            continue
+        start = time.perf_counter()
+        result = processor.process_record(line_content)
+        latency.record(time.perf_counter() - start)
+        if result is not None:
+            result[SOURCE_OBJECT_COLUMN] = source_object
+            yield result
+    processor.partition_latency.add([latency.to_entry()])
+
+def touched_partitions_filter(partitions):
+    """
+    Predicado sobre columnas de partición que selecciona solo las particiones
+    year/month/day/hour indicadas (Spark lo resuelve con partition pruning)
+    """
+    hours_by_day = {}
+    for partition in partitions:
+        day_key = (partition['year'], partition['month'], partition['day'])
+        hours_by_day.setdefault(day_key, set()).add(partition['hour'])
+    
+    condition = F.lit(False)
+    for (year, month, day), hours in hours_by_day.items():
+        hour_condition = F.col("hour").isin([hour for hour in hours if hour is not None])
+        if None in hours:
+            hour_condition = hour_condition | F.col("hour").isNull()
+        condition = condition | (
+            F.col("year").eqNullSafe(year) & F.col("month").eqNullSafe(month)
+            & F.col("day").eqNullSafe(day) & hour_condition
+        )
+    return condition
+
+def read_existing_partitions(output_path, partitions):
+    """
+    Lee los registros ya procesados de las particiones tocadas, para que la
+    sobrescritura dinámica no pierda lo escrito por ejecuciones anteriores.
+    Devuelve None si todavía no hay datos en output_path
+    """
+    try:
+        existing_df = spark.read.parquet(output_path)
+    except Exception as e:
+        print(f" Sin datos procesados previos en {output_path}: {str(e)[:200]}")
+        return None
+    return existing_df.where(touched_partitions_filter(partitions))
+
+def prepare_for_write(df):
+    """
+    Agrupa cada partición year/month/day/hour en una sola tarea y la ordena por
+    SORT_COLUMNS, de modo que la cantidad de archivos no dependa de las tareas
+    de lectura (con maxRecordsPerFile cada partición se corta en archivos de
+    MAX_RECORDS_PER_FILE filas consecutivas). Las columnas de partición van
+    primero en el orden: así el writer no agrega su propio sort y respeta éste
+    """
+    return df.repartition(*PARTITION_COLUMNS).sortWithinPartitions(*PARTITION_COLUMNS, *SORT_COLUMNS)
+
+def latency_bucket(column):
+    """
+    Índice de bucket del histograma de latencia, equivalente a
+    f5sketch.bucket_index (0 para latencias <= 1 ms)
+    """
+    return F.when(column <= 1, F.lit(0)).otherwise(
+        F.ceil(F.log(LATENCY_SKETCH_GAMMA, column.cast(DoubleType()))).cast(IntegerType())
+    )
+
+def rollup_partials(df):
+    """
+    Primer nivel de los rollups: agregados por partición, minuto, dimensiones y
+    bucket de latencia. Los buckets particionan las filas de cada grupo, así que
+    sumar estos parciales da totales exactos y sus conteos forman el histograma
+    """
+    return df.withColumn(
+        "minute", F.minute(F.col("parsed_timestamp_syslog").cast(TimestampType()))
+    ).withColumn(
+        "latency_bucket", latency_bucket(F.col("tiempo_respuesta_ms"))
+    ).groupBy(*PARTITION_COLUMNS, "minute", *ROLLUP_DIMENSIONS, "latency_bucket").agg(
+        F.count(F.lit(1)).alias("request_count"),
+        count_where(F.col("is_error")).alias("error_count"),
+        count_where(F.col("codigo_respuesta") >= 500).alias("server_error_count"),
+        count_where(F.col("is_slow")).alias("slow_count"),
+        count_where(F.col("is_mobile")).alias("mobile_count"),
+        count_where(F.col("cache_hit")).alias("cache_hit_count"),
+        F.sum("tiempo_respuesta_ms").cast(LongType()).alias("response_time_sum_ms"),
+        F.max("tiempo_respuesta_ms").alias("response_time_max_ms"),
+        F.sum("tamano_respuesta").cast(LongType()).alias("bytes_sum")
+    )
+
+def merge_rollup(partials_df, group_columns):
+    """
+    Combina parciales de rollup en el grano group_columns: suma contadores por
+    bucket de latencia y luego arma latency_buckets (bucket -> cantidad)
+    """
+    by_bucket = partials_df.groupBy(*group_columns, "latency_bucket").agg(
+        *[F.sum(name).alias(name) for name in ROLLUP_SUM_COLUMNS],
+        F.max("response_time_max_ms").alias("response_time_max_ms")
+    )
+    return by_bucket.groupBy(*group_columns).agg(
+        *[F.sum(name).alias(name) for name in ROLLUP_SUM_COLUMNS],
+        F.max("response_time_max_ms").alias("response_time_max_ms"),
+        F.map_from_entries(F.collect_list(
+            F.when(F.col("latency_bucket").isNotNull(), F.struct("latency_bucket", "request_count"))
+        )).alias("latency_buckets")
+    )
+
+@F.udf(returnType=BinaryType())
+def latency_sketch_bytes(buckets, total, maximum):
+    """latency_buckets serializado como f5sketch.LatencySketch (mergeable desde Python)"""
+    return LatencySketch.from_buckets(buckets or {}, total, maximum).to_bytes()
+
+def write_rollups(source_df, processed_bucket):
+    """
+    Escribe f5_rollup_minute y f5_rollup_hour para las particiones de source_df
+    (un archivo por partición, sobrescritura dinámica como f5-logs/). El rollup
+    por hora se obtiene mergeando los parciales por minuto, sin releer filas
+    """
+    partials = rollup_partials(source_df).persist(StorageLevel.MEMORY_AND_DISK)
+    rollups = {
+        "minute": merge_rollup(partials, [*PARTITION_COLUMNS, "minute", *ROLLUP_DIMENSIONS]),
+        "hour": merge_rollup(partials, [*PARTITION_COLUMNS, *ROLLUP_DIMENSIONS])
+    }
+    rollup_paths = []
+    for grain, rollup_df in rollups.items():
+        rollup_path = f"s3://{processed_bucket}/f5-rollups/{grain}/"
+        rollup_df = rollup_df.withColumn("latency_sketch", latency_sketch_bytes(
+            F.col("latency_buckets"), F.col("response_time_sum_ms"), F.col("response_time_max_ms")
+        ))
+        rollup_df.repartition(*PARTITION_COLUMNS).write \
+            .mode("overwrite") \
+            .option("partitionOverwriteMode", "dynamic") \
+            .partitionBy(*PARTITION_COLUMNS) \
+            .parquet(rollup_path)
+        rollup_paths.append(rollup_path)
+        print(f" Rollup por {grain} escrito en: {rollup_path}")
+    partials.unpersist()
+    return rollup_paths
+
+def count_where(condition):
+    """Agregado para observe(): cantidad de filas que cumplen la condición"""
+    return F.sum(F.when(condition, 1).otherwise(0))
+
+def emit_job_report(report, processed_bucket):
+    """
+    Emite el reporte del job: una línea JSON en el log (CloudWatch) y una
+    copia en s3://<processed_bucket>/job-reports/<job>/
+    """
+    report_json = json.dumps(report, ensure_ascii=False, default=str)
+    print(f"JOB_REPORT {report_json}")
+    
+    report_key = f"job-reports/{args['JOB_NAME']}/{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    try:
+        boto3.client('s3').put_object(
+            Bucket=processed_bucket,
+            Key=report_key,
+            Body=report_json.encode('utf-8'),
+            ContentType='application/json'
+        )
+        print(f" Reporte del job guardado en s3://{processed_bucket}/{report_key}")
+    except Exception as e:
+        print(f" No se pudo guardar el reporte del job: {str(e)}")
 
 def process_f5_logs(glue_context, raw_bucket, processed_bucket, solution_name):
     """Función principal de procesamiento multiformato"""
     
+    start_time = time.time()
     print(f"Buscando datos en s3://{raw_bucket}/{solution_name}/")
     
     try:
@@ -342,119 +851,129 @@ def process_f5_logs(glue_context, raw_bucket, processed_bucket, solution_name):
             datasource = glue_context.create_dynamic_frame.from_options(
                 format_options={
                     "withHeader": False,
-                    "separator": "\n"
+                    "separator": "\n",
+                    # Objeto raw de cada línea, para reemplazar sus filas al reprocesarlo
+                    "attachFilename": SOURCE_OBJECT_COLUMN
                 },
                 connection_type="s3",
                 format="csv",
                 connection_options={
                     "paths": [raw_path],
-                    "recurse": True
+                    "recurse": True,
+                    # Horas raw ya procesadas y reescritas por compact_f5_partitions
+                    "exclusions": "[\"**/compacted-*\"]"
                 },
                 transformation_ctx="datasource"
             )
             
-            print(f" Datos cargados exitosamente. Registros encontrados: {datasource.count()}")
+            print(" Datos cargados exitosamente")
             
         except Exception as e:
+            # Sin return: el job falla y el bookmark no avanza sobre objetos
+            # raw que no se escribieron en f5-logs/
             print(f" Error cargando datos: {str(e)}")
-            return
+            raise
         
-        if datasource.count() == 0:
+        # Convertir a DataFrame para procesamiento. Los conteos se recolectan
+        # con observe() durante la escritura, sin acciones count() adicionales
+        df = datasource.toDF()
+        
+        if not df.columns:
             print(" No se encontraron datos para procesar")
             return
         
-        # Convertir a DataFrame para procesamiento
-        df = datasource.toDF()
-        
-        # Procesar cada registro
-        def process_row(row):
-            # Obtener el contenido de la línea (puede estar en diferentes columnas)
-            line_content = None
-            for field in row.asDict():
-                value = row[field]
-                if value and isinstance(value, str) and len(value.strip()) > 50:
-                    line_content = value.strip()
-                    break
-            
-            if not line_content:
-                return None
+        if PROCESSING_MODE == 'rdd':
+            # Fallback: procesar cada registro en Python fila a fila
+            processed_rdd = df.rdd.mapPartitions(process_partition)
             
-            return processor.process_record(line_content)
+            # Crear DataFrame con los datos procesados
+            processed_df = spark.createDataFrame(processed_rdd, schema=F5_SCHEMA)
+        else:
+            # Modo arrow: lotes de ARROW_BATCH_SIZE líneas parseados y enriquecidos
+            # de forma columnar, sin pickling de filas ni createDataFrame
+            processed_df = df.mapInArrow(process_arrow_batches, F5_SCHEMA)
         
-        # Aplicar procesamiento a cada fila
-        processed_rdd = df.rdd.map(process_row).filter(lambda x: x is not None)
+        # Los registros nuevos (solo objetos no procesados, vía bookmark) se
+        # materializan una vez: definen las particiones tocadas y se escriben
+        new_df = processed_df.persist(StorageLevel.MEMORY_AND_DISK)
+        touched_partitions = [row.asDict() for row in new_df.select(*PARTITION_COLUMNS).distinct().collect()]
         
-        if processed_rdd.isEmpty():
-            print(" No se pudieron procesar registros válidos")
+        if not touched_partitions:
+            print(" No se pudieron procesar registros válidos (sin datos nuevos)")
             processor.print_stats()
+            new_df.unpersist()
             return
         
-        # Convertir a DataFrame con esquema F5
-        f5_schema = StructType([
-            StructField("timestamp_syslog", StringType(), True),
-            StructField("hostname", StringType(), True),
-            StructField("ip_cliente_externo", StringType(), True),
-            StructField("ip_red_interna", StringType(), True),
-            StructField("usuario_autenticado", StringType(), True),
-            StructField("identidad", StringType(), True),
-            StructField("timestamp_apache", StringType(), True),
-            StructField("metodo", StringType(), True),
-            StructField("recurso", StringType(), True),
-            StructField("protocolo", StringType(), True),
-            StructField("codigo_respuesta", IntegerType(), True),
-            StructField("tamano_respuesta", IntegerType(), True),
-            StructField("referer", StringType(), True),
-            StructField("user_agent", StringType(), True),
-            StructField("tiempo_respuesta_ms", IntegerType(), True),
-            StructField("edad_cache", StringType(), True),
-            StructField("content_type", StringType(), True),
-            StructField("campo_reservado_1", StringType(), True),
-            StructField("campo_reservado_2", StringType(), True),
-            StructField("ambiente_origen", StringType(), True),
-            StructField("ambiente_pool", StringType(), True),
-            StructField("entorno_nodo", StringType(), True),
-            # Campos derivados
-            StructField("parsed_timestamp_syslog", StringType(), True),
-            StructField("parsed_timestamp_apache", StringType(), True),
-            StructField("year", IntegerType(), True),
-            StructField("month", IntegerType(), True),
-            StructField("day", IntegerType(), True),
-            StructField("hour", IntegerType(), True),
-            StructField("is_error", BooleanType(), True),
-            StructField("status_category", StringType(), True),
-            StructField("is_slow", BooleanType(), True),
-            StructField("response_time_category", StringType(), True),
-            StructField("is_mobile", BooleanType(), True),
-            StructField("content_category", StringType(), True),
-            StructField("cache_hit", BooleanType(), True),
-            StructField("processing_timestamp", StringType(), True),
-            StructField("etl_version", StringType(), True)
-        ])
-        
-        # Crear DataFrame con los datos procesados
-        processed_df = spark.createDataFrame(processed_rdd, schema=f5_schema)
-        
-        print(f" Registros procesados exitosamente: {processed_df.count()}")
-        
-        # Escribir a zona procesada en formato Parquet particionado
+        print(f" Particiones year/month/day/hour afectadas: {len(touched_partitions)}")
+        
+        # Estadísticas en la misma pasada que la escritura
+        output_observation = Observation("f5_output")
+        observed_df = new_df.observe(
+            output_observation,
+            F.count(F.lit(1)).alias("parsed_records"),
+            count_where(F.col("is_error")).alias("error_records"),
+            count_where(F.col("is_slow")).alias("slow_records")
+        )
+        
+        # Escribir a zona procesada en formato Parquet particionado. Con
+        # partitionOverwriteMode=dynamic solo se reemplazan las particiones
+        # tocadas, que se reescriben junto con sus registros ya existentes.
+        # Idempotente: si una ejecución falla después de escribir f5-logs/
+        # (rollups, timeout) el bookmark no avanza y la siguiente relee los
+        # mismos objetos raw; sus filas previas se descartan por source_object
+        # en lugar de duplicarse
         output_path = f"s3://{processed_bucket}/f5-logs/"
+        existing_df = read_existing_partitions(output_path, touched_partitions)
+        if existing_df is None:
+            output_df = observed_df
+        else:
+            if SOURCE_OBJECT_COLUMN in existing_df.columns:
+                new_sources = new_df.select(SOURCE_OBJECT_COLUMN).where(F.col(SOURCE_OBJECT_COLUMN).isNotNull()).distinct()
+                existing_df = existing_df.join(F.broadcast(new_sources), SOURCE_OBJECT_COLUMN, "left_anti")
+            output_df = observed_df.unionByName(existing_df, allowMissingColumns=True)
         
-        processed_df.write \
+        prepare_for_write(output_df).write \
             .mode("overwrite") \
-            .partitionBy("year", "month", "day", "hour") \
+            .option("partitionOverwriteMode", "dynamic") \
+            .option("maxRecordsPerFile", MAX_RECORDS_PER_FILE) \
+            .options(**parquet_write_options('f5_logs')) \
+            .partitionBy(*PARTITION_COLUMNS) \
             .parquet(output_path)
         
+        new_df.unpersist()
         print(f" Datos escritos exitosamente en: {output_path}")
         
+        # Rollups desde el contenido final de las particiones tocadas (registros
+        # nuevos + existentes), releído después de la sobrescritura
+        final_df = spark.read.parquet(output_path).where(touched_partitions_filter(touched_partitions))
+        rollup_paths = write_rollups(final_df, processed_bucket)
+        
+        output_stats = output_observation.get
+        parsed_records = output_stats.get("parsed_records") or 0
+        input_records = processor.get_stats()['total_records']
+        
+        print(f" Registros procesados exitosamente: {parsed_records}")
+        
         # Imprimir estadísticas finales
         processor.print_stats()
         
-        # Mostrar muestra de datos procesados
-        print("\n MUESTRA DE DATOS PROCESADOS:")
-        processed_df.select(
-            "hostname", "ip_cliente_externo", "metodo", "codigo_respuesta", 
-            "tiempo_respuesta_ms", "status_category", "content_category", "is_mobile"
-        ).show(5, truncate=False)
+        emit_job_report({
+            "job_name": args['JOB_NAME'],
+            "processing_mode": PROCESSING_MODE,
+            "source_path": raw_path,
+            "output_path": output_path,
+            "rollup_paths": rollup_paths,
+            "input_records": input_records,
+            "parsed_records": parsed_records,
+            "parse_failures": input_records - parsed_records,
+            "touched_partitions": len(touched_partitions),
+            "max_records_per_file": MAX_RECORDS_PER_FILE,
+            "error_records": output_stats.get("error_records") or 0,
+            "slow_records": output_stats.get("slow_records") or 0,
+            "format_stats": processor.get_stats(),
+            "parse_latency": processor.get_latency_report(),
+            "duration_seconds": round(time.time() - start_time, 1)
+        }, processed_bucket)
         
     except Exception as e:
         print(f" Error en procesamiento principal: {str(e)}")
@@ -470,11 +989,11 @@ try:
         args['solution_name']
     )
     
-    print("ETL MULTIFORMATO COMPLETADO EXITOSAMENTE")
-    
 except Exception as e:
     print(f"ERROR CRÍTICO EN ETL: {str(e)}")
     raise
 
-finally:
-    job.commit()
+# El bookmark avanza solo después de una ejecución exitosa: si el job falla,
+# la siguiente ejecución vuelve a leer los mismos objetos raw
+job.commit()
+print("ETL MULTIFORMATO COMPLETADO EXITOSAMENTE")
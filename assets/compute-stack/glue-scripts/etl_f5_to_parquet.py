@@ -22,6 +22,10 @@ Versión: 2.1 (Compatible con Formato Firehose)
 """
 
 import sys
+import json
+import time
+import boto3
+from datetime import datetime
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
 from pyspark.context import SparkContext
@@ -29,9 +33,12 @@ from awsglue.context import GlueContext
 from awsglue.job import Job
 from awsglue.dynamicframe import DynamicFrame
 from pyspark.sql import functions as F
+from pyspark.sql import Observation
 from pyspark.sql.types import *
-import re
-from datetime import datetime
+
+# Parser F5 compartido (distribuido vía --extra-py-files)
+from f5parse import spark_split, FIELD_NAMES
+from f5parquet import DEFAULT_MAX_RECORDS_PER_FILE, parquet_write_options
 
 # GLUE 5.0: Resolución mejorada de argumentos con mejor manejo de errores
 args = getResolvedOptions(sys.argv, [
@@ -41,6 +48,17 @@ args = getResolvedOptions(sys.argv, [
     'solution_name'
 ])
 
+# Presupuesto de filas por archivo Parquet (opcional, ~128-256 MB por archivo)
+if '--max_records_per_file' in sys.argv:
+    args.update(getResolvedOptions(sys.argv, ['max_records_per_file']))
+MAX_RECORDS_PER_FILE = int(args.get('max_records_per_file', str(DEFAULT_MAX_RECORDS_PER_FILE)))
+
+PARTITION_COLUMNS = ["year", "month", "day", "hour"]
+
+# Orden dentro de cada archivo para que las estadísticas min/max de Parquet
+# permitan saltar row groups en consultas por pool y código de respuesta
+SORT_COLUMNS = ["f5_pool", "f5_virtualserver", "codigo_respuesta"]
+
 # GLUE 5.0: Inicializar con contexto Spark 3.5.4
 sc = SparkContext()
 glueContext = GlueContext(sc)
@@ -55,200 +73,83 @@ spark.conf.set("spark.sql.adaptive.coalescePartitions.enabled", "true")
 print(f"Iniciando Job ETL F5 con AWS Glue 5.0 (Spark {spark.version})")
 print(f"Procesando logs F5 desde s3://{args['raw_bucket']} hacia s3://{args['processed_bucket']}")
 
-# F5 Log Format regex pattern (from espec_portales_2.re)
-F5_LOG_PATTERN = r'(?P<timestamp_syslog>\w{3} \s+\d{1,2} \d{2}:\d{2}:\d{2}) (?P<hostname>[^\s]+) (?P<ip_cliente_externo>[^\s]+) \[(?P<ip_backend_interno>[^\]]+)\] (?P<usuario_autenticado>-|"[^"]*") (?P<identidad>"[^"]*") \[(?P<timestamp_rp>[^\]]+)\] "(?P<metodo>\w+) (?P<request>[^"]+) (?P<protocolo>HTTP/\d\.\d)" (?P<codigo_respuesta>\d+) (?P<tamano_respuesta>\d+) "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)" Time (?P<tiempo_respuesta_ms>\d+) Age "(?P<edad_cache>[^"]*)" "(?P<content_type>[^"]*)" "(?P<jsession_id>[^"]*)" (?P<campo_reservado_2>-|"[^"]*") "(?P<f5_virtualserver>[^"]*)" "(?P<f5_pool>[^"]*)" (?P<f5_bigip_name>\w+)'
+# Campos que pasan a null cuando vienen como '-', '""' o vacíos (esquema AVRO)
+NULLABLE_FIELDS = [
+    'usuario_autenticado', 'identidad', 'referer', 'user_agent',
+    'edad_cache', 'content_type', 'jsession_id', 'campo_reservado_2'
+]
 
-def parse_f5_log(log_line):
+def f5_field(name):
+    """Campo crudo del array producido por spark_split (orden de FIELD_NAMES)"""
+    return F.col("f5_fields").getItem(FIELD_NAMES.index(name))
+
+def clean_nullable(column):
     """
-    Parse F5 Log Format according to AVRO schema
+    '-', '""' o vacío -> null; si el valor viene entre comillas se quitan
     """
-    if not log_line:
-        return None
-    
-    try:
-        match = re.match(F5_LOG_PATTERN, log_line)
-        if match:
-            data = match.groupdict()
-            
-            # Parse syslog timestamp (Aug  8 03:33:33)
-            try:
-                # Convert syslog timestamp to proper format
-                timestamp_syslog = data['timestamp_syslog']
-                # Add current year since syslog doesn't include it
-                current_year = datetime.now().year
-                timestamp_with_year = f"{current_year} {timestamp_syslog}"
-                dt_syslog = datetime.strptime(timestamp_with_year, '%Y %b %d %H:%M:%S')
-                data['parsed_timestamp_syslog'] = dt_syslog.isoformat()
-                data['year'] = dt_syslog.year
-                data['month'] = dt_syslog.month
-                data['day'] = dt_syslog.day
-                data['hour'] = dt_syslog.hour
-            except Exception as e:
-                print(f"Error parseando timestamp syslog: {e}")
-                data['parsed_timestamp_syslog'] = None
-                data['year'] = None
-                data['month'] = None
-                data['day'] = None
-                data['hour'] = None
-            
-            # Parsear timestamp HTTP (08/Aug/2025:03:33:33 -0300)
-            try:
-                timestamp_rp = data['timestamp_rp']
-                # Remover información de zona horaria para parseo
-                timestamp_part = timestamp_rp.split(' ')[0]
-                dt_rp = datetime.strptime(timestamp_part, '%d/%b/%Y:%H:%M:%S')
-                data['parsed_timestamp_rp'] = dt_rp.isoformat()
-            except Exception as e:
-                print(f"Error parseando timestamp HTTP: {e}")
-                data['parsed_timestamp_rp'] = None
-            
-            # Convert numeric fields according to AVRO schema
-            try:
-                data['codigo_respuesta'] = int(data['codigo_respuesta'])
-            except:
-                data['codigo_respuesta'] = None
-            
-            try:
-                data['tamano_respuesta'] = int(data['tamano_respuesta'])
-            except:
-                data['tamano_respuesta'] = 0
-            
-            try:
-                data['tiempo_respuesta_ms'] = int(data['tiempo_respuesta_ms'])
-            except:
-                data['tiempo_respuesta_ms'] = None
-            
-            # Handle null/empty fields according to AVRO schema
-            nullable_fields = [
-                'usuario_autenticado', 'identidad', 'referer', 'user_agent',
-                'edad_cache', 'content_type', 'jsession_id', 'campo_reservado_2'
-            ]
-            
-            for field in nullable_fields:
-                if data[field] == '-' or data[field] == '""' or not data[field]:
-                    data[field] = None
-                elif data[field].startswith('"') and data[field].endswith('"'):
-                    # Remove quotes
-                    data[field] = data[field][1:-1]
-            
-            # Add derived fields for analytics
-            data['is_error'] = data['codigo_respuesta'] >= 400 if data['codigo_respuesta'] else False
-            data['status_category'] = (
-                'success' if data['codigo_respuesta'] and 200 <= data['codigo_respuesta'] < 300 else
-                'redirect' if data['codigo_respuesta'] and 300 <= data['codigo_respuesta'] < 400 else
-                'client_error' if data['codigo_respuesta'] and 400 <= data['codigo_respuesta'] < 500 else
-                'server_error' if data['codigo_respuesta'] and data['codigo_respuesta'] >= 500 else
-                'unknown'
-            )
-            
-            # Performance categorization
-            data['is_slow'] = data['tiempo_respuesta_ms'] > 5000 if data['tiempo_respuesta_ms'] else False
-            data['is_large'] = data['tamano_respuesta'] > 10485760 if data['tamano_respuesta'] else False  # 10MB
-            
-            # Extract domain from request
-            try:
-                request_path = data['request']
-                if request_path and request_path != '-':
-                    # Extract path components for analytics
-                    path_parts = request_path.split('/')
-                    data['request_domain'] = path_parts[0] if len(path_parts) > 0 else None
-                    data['request_path_depth'] = len([p for p in path_parts if p])
-                else:
-                    data['request_domain'] = None
-                    data['request_path_depth'] = 0
-            except:
-                data['request_domain'] = None
-                data['request_path_depth'] = 0
-            
-            # Extract file extension
-            try:
-                request_path = data['request']
-                if request_path and '.' in request_path:
-                    data['file_extension'] = request_path.split('.')[-1].split('?')[0].lower()
-                else:
-                    data['file_extension'] = None
-            except:
-                data['file_extension'] = None
-            
-            # Enhanced analytics fields
-            # Content category
-            content_type = data.get('content_type', '') or ''
-            data['content_category'] = categorize_content_type(content_type)
-            
-            # Mobile detection
-            user_agent = data.get('user_agent', '') or ''
-            data['is_mobile'] = detect_mobile_device(user_agent)
-            
-            # Cache hit detection
-            cache_age = data.get('edad_cache', '') or ''
-            data['cache_hit'] = cache_age not in ('', None, '""', '"')
-            
-            # Response time category
-            if data['tiempo_respuesta_ms']:
-                if data['tiempo_respuesta_ms'] < 100:
-                    data['response_time_category'] = 'fast'
-                elif data['tiempo_respuesta_ms'] < 500:
-                    data['response_time_category'] = 'normal'
-                elif data['tiempo_respuesta_ms'] < 2000:
-                    data['response_time_category'] = 'slow'
-                else:
-                    data['response_time_category'] = 'critical'
-            else:
-                data['response_time_category'] = 'unknown'
-            
-            # F5 environment from BigIP name
-            data['f5_environment'] = data.get('f5_bigip_name', 'UNKNOWN')
-            
-            # Processing metadata
-            data['processing_timestamp'] = datetime.now().isoformat()
-            data['etl_version'] = '2.1.0'
-            
-            return data
-    except Exception as e:
-        print(f"Error parseando línea de log F5: {str(e)}")
-    
-    return None
+    return F.when(
+        column.isin('-', '""', ''), F.lit(None).cast(StringType())
+    ).when(
+        column.startswith('"') & column.endswith('"'),
+        column.substr(F.lit(2), F.length(column) - 2)
+    ).otherwise(column)
 
-def categorize_content_type(content_type):
-    """Categorizar tipo de contenido para análisis"""
-    if not content_type:
-        return 'unknown'
-    
-    content_type = content_type.lower()
-    
-    if 'text/html' in content_type:
-        return 'html'
-    elif 'application/javascript' in content_type or 'text/javascript' in content_type:
-        return 'javascript'
-    elif 'text/css' in content_type:
-        return 'css'
-    elif 'image/' in content_type:
-        return 'image'
-    elif 'font/' in content_type or 'woff' in content_type:
-        return 'font'
-    elif 'application/json' in content_type or 'application/xml' in content_type:
-        return 'api'
-    elif 'video/' in content_type:
-        return 'video'
-    elif 'audio/' in content_type:
-        return 'audio'
-    elif 'application/pdf' in content_type:
-        return 'document'
-    else:
-        return 'other'
+def parse_syslog_timestamp(column):
+    """
+    Parsear timestamp syslog (Aug  8 03:33:33) agregando el año actual,
+    ya que syslog no incluye el año
+    """
+    return F.to_timestamp(
+        F.concat_ws(" ", F.year(F.current_date()).cast(StringType()), F.regexp_replace(column, r"\s+", " ")),
+        "yyyy MMM d HH:mm:ss"
+    )
 
-def detect_mobile_device(user_agent):
-    """Detectar si el request viene de dispositivo móvil"""
-    if not user_agent:
-        return False
-    
-    user_agent = user_agent.lower()
-    mobile_indicators = [
-        'mobile', 'android', 'iphone', 'ipad', 'ipod', 
-        'blackberry', 'windows phone', 'opera mini'
-    ]
+def parse_http_timestamp(column):
+    """
+    Parsear timestamp HTTP (08/Aug/2025:03:33:33 -0300) removiendo la zona horaria
+    """
+    return F.to_timestamp(F.regexp_replace(column, r" [-+]\d{4}$", ""), "dd/MMM/yyyy:HH:mm:ss")
+
+def iso_timestamp_string(column):
+    """
+    Timestamp como string ISO-8601 sin zona (2025-08-08T03:33:33), el mismo
+    formato que escribía el UDF MapType: las particiones existentes de
+    <solution>/ tienen parsed_timestamp_* como string y no se mezclan tipos
+    """
+    return F.date_format(column, "yyyy-MM-dd'T'HH:mm:ss")
+
+def prepare_for_write(df):
+    """
+    Una tarea por partición year/month/day/hour, ordenada por SORT_COLUMNS
+    (las columnas de partición primero para que el writer no reordene).
+    Junto con maxRecordsPerFile, los archivos por partición dependen solo de
+    la cantidad de filas y no de las tareas de lectura
+    """
+    return df.repartition(*PARTITION_COLUMNS).sortWithinPartitions(*PARTITION_COLUMNS, *SORT_COLUMNS)
+
+def count_where(condition):
+    """Agregado para observe(): cantidad de filas que cumplen la condición"""
+    return F.sum(F.when(condition, 1).otherwise(0))
+
+def emit_job_report(report):
+    """
+    Emitir reporte del job: una línea JSON en el log (CloudWatch) y una copia
+    en s3://<processed_bucket>/job-reports/<job>/
+    """
+    report_json = json.dumps(report, ensure_ascii=False, default=str)
+    print(f"JOB_REPORT {report_json}")
     
-    return any(indicator in user_agent for indicator in mobile_indicators)
+    report_key = f"job-reports/{args['JOB_NAME']}/{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    try:
+        boto3.client('s3').put_object(
+            Bucket=args['processed_bucket'],
+            Key=report_key,
+            Body=report_json.encode('utf-8'),
+            ContentType='application/json'
+        )
+        print(f"Reporte del job guardado en s3://{args['processed_bucket']}/{report_key}")
+    except Exception as e:
+        print(f"Advertencia: no se pudo guardar el reporte del job: {str(e)}")
 
 def process_raw_data():
     """
@@ -260,6 +161,8 @@ def process_raw_data():
     spark.conf.set("spark.sql.files.ignoreCorruptFiles", "false")
     spark.conf.set("spark.sql.files.ignoreMissingFiles", "false")
     
+    start_time = time.time()
+    
     # Leer datos crudos desde S3
     raw_path = f"s3://{args['raw_bucket']}/{args['solution_name']}/"
     
@@ -274,20 +177,22 @@ def process_raw_data():
             format="json",
             connection_options={
                 "paths": [raw_path],
-                "recurse": True
+                "recurse": True,
+                # Horas raw ya procesadas y reescritas por compact_f5_partitions
+                "exclusions": "[\"**/compacted-*\"]"
             },
             transformation_ctx="raw_dynamic_frame"
         )
         
-        print(f"Conteo de registros crudos: {raw_dynamic_frame.count()}")
+        # Convertir a DataFrame para procesamiento. Los conteos se recolectan con
+        # observe() durante la escritura, sin acciones count() adicionales
+        raw_df = raw_dynamic_frame.toDF()
+        input_observation = Observation("f5_input")
         
-        if raw_dynamic_frame.count() == 0:
+        if not raw_df.columns:
             print("No se encontraron datos en el bucket origen")
             return
         
-        # Convertir a DataFrame para procesamiento
-        raw_df = raw_dynamic_frame.toDF()
-        
         # Detectar formato de datos: JSON pre-parseado vs logs crudos
         if 'timestamp_syslog' in raw_df.columns and 'ip_cliente_externo' in raw_df.columns:
             # Formato nuevo: datos ya están parseados
@@ -314,9 +219,13 @@ def process_raw_data():
             print("Procesando formato pre-parseado...")
             
             # Parsear timestamp_rp para extraer campos de particionado
-            structured_df = raw_df.withColumn(
+            structured_df = raw_df.observe(
+                input_observation,
+                F.count(F.lit(1)).alias("raw_records"),
+                count_where(F.lit(False)).alias("parse_failures")
+            ).withColumn(
                 "parsed_timestamp_rp",
-                F.to_timestamp(F.regexp_replace(F.col("timestamp_rp"), r" [-+]\d{4}$", ""), "dd/MMM/yyyy:HH:mm:ss")
+                parse_http_timestamp(F.col("timestamp_rp"))
             ).withColumn(
                 "year", F.year(F.col("parsed_timestamp_rp"))
             ).withColumn(
@@ -373,59 +282,53 @@ def process_raw_data():
             )
             
         else:
-            # Lógica de parseo original para logs crudos
+            # Parseo nativo en la JVM (sin UDF Python): una evaluación de la
+            # regex F5 por fila vía spark_split y expresiones Catalyst
             print("Procesando formato de logs crudos...")
             
-            # Procesar líneas de log
-            def parse_log_udf(log_line):
-                return parse_f5_log(log_line)
-            
-            # Registrar UDF
-            from pyspark.sql.functions import udf
-            parse_udf = udf(parse_log_udf, MapType(StringType(), StringType()))
-            
-            # Parsear logs y crear datos estructurados
             parsed_df = raw_df.select(
                 F.col(log_column).alias("raw_log"),
-                parse_udf(F.col(log_column)).alias("parsed_data")
+                spark_split(F.col(log_column)).alias("f5_fields")
+            ).observe(
+                input_observation,
+                F.count(F.lit(1)).alias("raw_records"),
+                count_where(F.col("f5_fields").isNull()).alias("parse_failures")
             ).filter(
-                F.col("parsed_data").isNotNull()
+                F.col("f5_fields").isNotNull()
             )
             
-            # Expandir datos parseados en columnas según esquema AVRO
+            # Expandir campos en columnas según esquema AVRO
             structured_df = parsed_df.select(
                 F.col("raw_log"),
-                # Campos core F5
-                F.col("parsed_data.timestamp_syslog").alias("timestamp_syslog"),
-                F.col("parsed_data.hostname").alias("hostname"),
-                F.col("parsed_data.ip_cliente_externo").alias("ip_cliente_externo"),
-                F.col("parsed_data.ip_backend_interno").alias("ip_backend_interno"),
-                F.col("parsed_data.usuario_autenticado").alias("usuario_autenticado"),
-                F.col("parsed_data.identidad").alias("identidad"),
-                F.col("parsed_data.timestamp_rp").alias("timestamp_rp"),
-                F.col("parsed_data.metodo").alias("metodo"),
-                F.col("parsed_data.request").alias("request"),
-                F.col("parsed_data.protocolo").alias("protocolo"),
-                F.col("parsed_data.codigo_respuesta").cast(IntegerType()).alias("codigo_respuesta"),
-                F.col("parsed_data.tamano_respuesta").cast(LongType()).alias("tamano_respuesta"),
-                F.col("parsed_data.referer").alias("referer"),
-                F.col("parsed_data.user_agent").alias("user_agent"),
-                F.col("parsed_data.tiempo_respuesta_ms").cast(IntegerType()).alias("tiempo_respuesta_ms"),
-                F.col("parsed_data.edad_cache").alias("edad_cache"),
-                F.col("parsed_data.content_type").alias("content_type"),
-                F.col("parsed_data.jsession_id").alias("jsession_id"),
-                F.col("parsed_data.campo_reservado_2").alias("campo_reservado_2"),
-                F.col("parsed_data.f5_virtualserver").alias("f5_virtualserver"),
-                F.col("parsed_data.f5_pool").alias("f5_pool"),
-                F.col("parsed_data.f5_bigip_name").alias("f5_bigip_name"),
+                *[
+                    (clean_nullable(f5_field(name)) if name in NULLABLE_FIELDS else f5_field(name)).alias(name)
+                    for name in FIELD_NAMES
+                ]
+            ).withColumn(
+                "codigo_respuesta", F.col("codigo_respuesta").cast(IntegerType())
+            ).withColumn(
+                "tamano_respuesta", F.col("tamano_respuesta").cast(LongType())
+            ).withColumn(
+                "tiempo_respuesta_ms", F.col("tiempo_respuesta_ms").cast(IntegerType())
+            ).withColumn(
                 # Timestamps parseados
-                F.col("parsed_data.parsed_timestamp_syslog").alias("parsed_timestamp_syslog"),
-                F.col("parsed_data.parsed_timestamp_rp").alias("parsed_timestamp_rp"),
+                "parsed_timestamp_syslog", parse_syslog_timestamp(F.col("timestamp_syslog"))
+            ).withColumn(
+                "parsed_timestamp_rp", parse_http_timestamp(F.col("timestamp_rp"))
+            ).withColumn(
                 # Campos de particionado
-                F.col("parsed_data.year").cast(IntegerType()).alias("year"),
-                F.col("parsed_data.month").cast(IntegerType()).alias("month"),
-                F.col("parsed_data.day").cast(IntegerType()).alias("day"),
-                F.col("parsed_data.hour").cast(IntegerType()).alias("hour")
+                "year", F.year(F.col("parsed_timestamp_syslog"))
+            ).withColumn(
+                "month", F.month(F.col("parsed_timestamp_syslog"))
+            ).withColumn(
+                "day", F.dayofmonth(F.col("parsed_timestamp_syslog"))
+            ).withColumn(
+                "hour", F.hour(F.col("parsed_timestamp_syslog"))
+            ).withColumn(
+                # Se escriben como string hasta migrar los datos ya escritos
+                "parsed_timestamp_syslog", iso_timestamp_string(F.col("parsed_timestamp_syslog"))
+            ).withColumn(
+                "parsed_timestamp_rp", iso_timestamp_string(F.col("parsed_timestamp_rp"))
             )
         
         # Agregar campos de enriquecimiento (compatible con ambos formatos)
@@ -457,60 +360,68 @@ def process_raw_data():
             F.lit("2.1.0")
         )
         
-        # Calcular estadísticas de forma segura
-        total_records = enriched_df.count()
-        print(f"Conteo de registros estructurados: {total_records}")
+        # Estadísticas en la misma pasada que la escritura
+        output_observation = Observation("f5_output")
+        observed_df = enriched_df.observe(
+            output_observation,
+            F.count(F.lit(1)).alias("total_records"),
+            count_where(F.col("codigo_respuesta") >= 400).alias("error_records"),
+            count_where(F.col("tiempo_respuesta_ms") > 5000).alias("slow_records")
+        )
+        
+        # Escribir al bucket procesado en formato Parquet con particionado
+        # (DataFrameWriter en lugar de DynamicFrame para que observe() reciba
+        # las métricas de la ejecución)
+        processed_path = f"s3://{args['processed_bucket']}/{args['solution_name']}/"
+        
+        prepare_for_write(observed_df).write \
+            .mode("append") \
+            .partitionBy(*PARTITION_COLUMNS) \
+            .option("compression", "snappy") \
+            .option("maxRecordsPerFile", MAX_RECORDS_PER_FILE) \
+            .options(**parquet_write_options('legacy')) \
+            .parquet(processed_path)
+        
+        input_stats = input_observation.get
+        output_stats = output_observation.get
+        raw_records = input_stats.get("raw_records") or 0
+        parse_failures = input_stats.get("parse_failures") or 0
+        total_records = output_stats.get("total_records") or 0
+        error_records = output_stats.get("error_records") or 0
+        slow_records = output_stats.get("slow_records") or 0
+        
+        emit_job_report({
+            "job_name": args['JOB_NAME'],
+            "input_format": "preparsed" if use_preparsed_format else "raw",
+            "source_path": raw_path,
+            "output_path": processed_path,
+            "raw_records": raw_records,
+            "parse_failures": parse_failures,
+            "total_records": total_records,
+            "error_records": error_records,
+            "slow_records": slow_records,
+            "error_rate": round(error_records / total_records * 100, 2) if total_records else 0.0,
+            "slow_rate": round(slow_records / total_records * 100, 2) if total_records else 0.0,
+            "duration_seconds": round(time.time() - start_time, 1)
+        })
         
         if total_records > 0:
-            # Calcular estadísticas de errores y respuestas lentas
-            error_records = enriched_df.filter(F.col("codigo_respuesta") >= 400).count()
-            slow_records = enriched_df.filter(F.col("tiempo_respuesta_ms") > 5000).count()
-            
             print("Estadísticas de Procesamiento:")
+            print(f"  Registros crudos: {raw_records}")
+            print(f"  Líneas no parseables: {parse_failures}")
             print(f"  Total de registros: {total_records}")
             print(f"  Registros con error (4xx/5xx): {error_records}")
             print(f"  Registros lentos (>5s): {slow_records}")
             print(f"  Tasa de error: {(error_records/total_records)*100:.2f}%")
             print(f"  Tasa de respuesta lenta: {(slow_records/total_records)*100:.2f}%")
-            
-            # Mostrar datos de muestra para verificación
-            print("\nRegistros procesados de muestra:")
-            enriched_df.select("hostname", "metodo", "codigo_respuesta", "tiempo_respuesta_ms", "status_category").show(5, truncate=False)
-            
+            print(f"Procesamiento exitoso y escritura de datos F5 a {processed_path}")
         else:
             print("Advertencia: No se procesaron registros exitosamente")
             print("Información de debug:")
-            print(f"  Conteo de registros crudos: {raw_dynamic_frame.count()}")
+            print(f"  Conteo de registros crudos: {raw_records}")
             print(f"  Columnas del DataFrame crudo: {raw_df.columns}")
             print("  Datos crudos de muestra:")
             raw_df.show(2, truncate=False)
-            return
-        
-        # Convertir de vuelta a DynamicFrame
-        structured_dynamic_frame = DynamicFrame.fromDF(
-            enriched_df,
-            glueContext,
-            "structured_dynamic_frame"
-        )
-        
-        # Escribir al bucket procesado en formato Parquet con particionado
-        processed_path = f"s3://{args['processed_bucket']}/{args['solution_name']}/"
-        
-        glueContext.write_dynamic_frame.from_options(
-            frame=structured_dynamic_frame,
-            connection_type="s3",
-            format="glueparquet",
-            connection_options={
-                "path": processed_path,
-                "partitionKeys": ["year", "month", "day", "hour"]
-            },
-            format_options={
-                "compression": "snappy"
-            },
-            transformation_ctx="write_processed_data"
-        )
-        
-        print(f"Procesamiento exitoso y escritura de datos F5 a {processed_path}")
         
     except Exception as e:
         print(f"Error procesando datos F5: {str(e)}")
@@ -2,41 +2,19 @@
 """
 AGESIC Data Lake - F5 Log Processor
 Downloads F5 logs from S3 and sends directly to Kinesis
-Specialized regex parser for F5 access logs with 25+ fields
+Uses the shared f5parse parser for F5 access logs with 25+ fields
 """
 
 import boto3
 import json
 import os
-import re
 import sys
 import time
 from datetime import datetime
 from typing import Dict, List, Optional
 
-# F5 Log regex pattern with 25+ specific fields
-F5_LOG_PATTERN = re.compile(
-    r'(?P<timestamp_syslog>\w{3} \s+\d{1,2} \d{2}:\d{2}:\d{2}) '
-    r'(?P<hostname>[^\s]+) '
-    r'(?P<ip_cliente_externo>[^\s]+) '
-    r'\[(?P<ip_backend_interno>[^\]]+)\] '
-    r'(?P<usuario_autenticado>-|"[^"]*") '
-    r'(?P<identidad>"[^"]*") '
-    r'\[(?P<timestamp_rp>[^\]]+)\] '
-    r'"(?P<metodo>\w+) (?P<request>[^"]+) (?P<protocolo>HTTP/\d\.\d)" '
-    r'(?P<codigo_respuesta>\d+) '
-    r'(?P<tamano_respuesta>\d+) '
-    r'"(?P<referer>[^"]*)" '
-    r'"(?P<user_agent>[^"]*)" '
-    r'Time (?P<tiempo_respuesta_ms>\d+) '
-    r'Age "(?P<edad_cache>[^"]*)" '
-    r'"(?P<content_type>[^"]*)" '
-    r'"(?P<jsession_id>[^"]*)" '
-    r'(?P<campo_reservado_2>-|"[^"]*") '
-    r'"(?P<f5_virtualserver>[^"]*)" '
-    r'"(?P<f5_pool>[^"]*)" '
-    r'(?P<f5_bigip_name>\w+)'
-)
+# Shared F5 parser (f5parse.py is synced next to this script from the f5_shared layer)
+from f5parse import parse_line
 
 class F5LogProcessor:
     """F5 Log Processor with specialized parsing and Kinesis integration"""
@@ -61,12 +39,10 @@ class F5LogProcessor:
             raise
     
     def parse_f5_log(self, log_line: str) -> Optional[Dict]:
-        """Parse F5 log line using specialized regex"""
-        match = F5_LOG_PATTERN.match(log_line.strip())
-        if not match:
+        """Parse F5 log line using the shared f5parse parser"""
+        data = parse_line(log_line.strip())
+        if not data:
             return None
-            
-        data = match.groupdict()
         
         # Convert numeric fields
         try:
@@ -1,133 +1,489 @@
 import json
 import base64
-import gzip
-import boto3
+import os
 import re
-from datetime import datetime
-from typing import Dict, List, Any, Optional
-
-# Initialize AWS clients
-cloudwatch_logs = boto3.client('logs')
-cloudwatch = boto3.client('cloudwatch')
-
-# F5 Log Format regex pattern (from espec_portales_2.re)
-F5_LOG_PATTERN = re.compile(
-    r'(?P<timestamp_syslog>\w{3} \s+\d{1,2} \d{2}:\d{2}:\d{2}) '
-    r'(?P<hostname>[^\s]+) '
-    r'(?P<ip_cliente_externo>[^\s]+) '
-    r'\[(?P<ip_backend_interno>[^\]]+)\] '
-    r'(?P<usuario_autenticado>-|"[^"]*") '
-    r'(?P<identidad>"[^"]*") '
-    r'\[(?P<timestamp_rp>[^\]]+)\] '
-    r'"(?P<metodo>\w+) (?P<request>[^"]+) (?P<protocolo>HTTP/\d\.\d)" '
-    r'(?P<codigo_respuesta>\d+) '
-    r'(?P<tamano_respuesta>\d+) '
-    r'"(?P<referer>[^"]*)" '
-    r'"(?P<user_agent>[^"]*)" '
-    r'Time (?P<tiempo_respuesta_ms>\d+) '
-    r'Age "(?P<edad_cache>[^"]*)" '
-    r'"(?P<content_type>[^"]*)" '
-    r'"(?P<jsession_id>[^"]*)" '
-    r'(?P<campo_reservado_2>-|"[^"]*") '
-    r'"(?P<f5_virtualserver>[^"]*)" '
-    r'"(?P<f5_pool>[^"]*)" '
-    r'(?P<f5_bigip_name>\w+)'
-)
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+# Shared F5 parser, latency sketch and KPL de-aggregation (provided by the f5_shared Lambda layer)
+from f5kpl import deaggregate
+from f5parse import match_fields, match_line, triage_fields
+from f5sketch import LatencySketch
+
+# Cold start budget: boto3/botocore, concurrent.futures and gzip are imported
+# on first use, so an environment that only parses healthy lines and emits EMF
+# never loads them (see test_regex/benchmark_lambda_cold_start.py). The one
+# exception is the SSM threshold table (THRESHOLDS_PARAMETER): it is loaded
+# during init, at the end of this module, so boto3 and GetParameter are paid
+# by the init phase instead of the first record of every cold start
+
+# Sinks (CloudWatch Logs delivery and PutMetricData) run on a small pool
+# reused across warm invocations; the handler waits for each one up to the
+# invocation deadline minus a safety margin. Error logs are delivered first
+# and metrics are published only after they succeed, so a retried batch
+# never publishes the same metrics twice
+SINK_WORKERS = 2
+SINK_DEADLINE_MARGIN_MS = 2000
+
+# AWS clients and the sink pool, created lazily and reused across warm invocations
+_aws_session = None
+_aws_clients: Dict[str, Any] = {}
+_sink_executor = None
+_init_lock = threading.Lock()
+
+def get_client(service_name: str) -> Any:
+    """
+    boto3 client for service_name, created on first use (one session,
+    keep-alive pools sized for the sink threads)
+    """
+    global _aws_session
+    client = _aws_clients.get(service_name)
+    if client is None:
+        with _init_lock:
+            client = _aws_clients.get(service_name)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+                
+                if _aws_session is None:
+                    _aws_session = boto3.session.Session()
+                client = _aws_clients[service_name] = _aws_session.client(
+                    service_name,
+                    config=Config(max_pool_connections=SINK_WORKERS, tcp_keepalive=True)
+                )
+    return client
+
+def get_sink_executor() -> Any:
+    """Thread pool for the sinks, created on the first invocation that needs it"""
+    global _sink_executor
+    if _sink_executor is None:
+        with _init_lock:
+            if _sink_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _sink_executor = ThreadPoolExecutor(max_workers=SINK_WORKERS, thread_name_prefix='f5-sink')
+    return _sink_executor
+
+ERROR_LOG_GROUP_NAME = "/aws/lambda/agesic-dl-poc-f5-error-logs"
 
-# Error status codes and performance thresholds
+# Metrics output: 'true'/'api' -> PutMetricData, 'emf' -> Embedded Metric
+# Format on stdout (no API calls), 'false' -> disabled
+METRICS_MODE = os.environ.get('ENABLE_F5_METRICS', 'true').strip().lower()
+METRICS_NAMESPACE = os.environ.get('CUSTOM_NAMESPACE', 'AGESIC/F5Logs')
+METRIC_DIMENSIONS = ['F5Environment', 'Pool']
+
+# CloudWatch accepts up to 150 distinct values per Values/Counts datum
+MAX_DISTRIBUTION_VALUES = 150
+
+# Latency percentiles published as scalars in EMF mode (one document per pool)
+EMF_PERCENTILES = [('P50ResponseTime', 0.50), ('P99ResponseTime', 0.99)]
+
+# Error status codes and default performance thresholds
 ERROR_STATUS_CODES = ['4', '5']  # 4xx and 5xx status codes
 SLOW_RESPONSE_THRESHOLD_MS = 5000  # 5 seconds
 LARGE_RESPONSE_THRESHOLD_BYTES = 10 * 1024 * 1024  # 10MB
 
+# Threshold table with overrides by pool, virtualserver and content_category:
+# SSM parameter (THRESHOLDS_PARAMETER) or the bundled f5_thresholds.json,
+# reloaded every THRESHOLDS_TTL_SECONDS in warm environments
+THRESHOLDS_PARAMETER = os.environ.get('THRESHOLDS_PARAMETER', '')
+THRESHOLDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'f5_thresholds.json')
+THRESHOLDS_TTL_SECONDS = int(os.environ.get('THRESHOLDS_TTL_SECONDS', '300'))
+
+def content_category(content_type: Optional[str]) -> str:
+    """
+    Content category of a response, same rules as the multiformat ETL
+    """
+    if not content_type or content_type == '-':
+        return 'unknown'
+    content_type = content_type.lower()
+    if 'javascript' in content_type:
+        return 'js'
+    if 'css' in content_type:
+        return 'css'
+    if 'image' in content_type:
+        return 'image'
+    if 'html' in content_type:
+        return 'html'
+    if 'json' in content_type or 'api' in content_type:
+        return 'api'
+    return 'other'
+
+class ThresholdTable:
+    """
+    Compiled thresholds: (slow_response_ms, large_response_bytes) per pool,
+    virtualserver and content_category, each entry already merged over the
+    defaults, so a lookup is at most three dict gets.
+    Precedence: pool > virtualserver > content_category > default
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        default = config.get('default', {})
+        self.default = (
+            int(default.get('slow_response_ms', SLOW_RESPONSE_THRESHOLD_MS)),
+            int(default.get('large_response_bytes', LARGE_RESPONSE_THRESHOLD_BYTES))
+        )
+        self.pool = self._compile(config.get('pool', {}))
+        self.virtualserver = self._compile(config.get('virtualserver', {}))
+        self.content_category = self._compile(config.get('content_category', {}))
+    
+    def _compile(self, overrides: Dict[str, Dict[str, Any]]) -> Dict[str, Tuple[int, int]]:
+        return {
+            name: (
+                int(override.get('slow_response_ms', self.default[0])),
+                int(override.get('large_response_bytes', self.default[1]))
+            )
+            for name, override in overrides.items()
+        }
+    
+    def lookup(self, f5_pool: str, f5_virtualserver: str, content_type: Optional[str]) -> Tuple[int, int]:
+        thresholds = self.pool.get(f5_pool) or self.virtualserver.get(f5_virtualserver)
+        if thresholds is None and self.content_category:
+            thresholds = self.content_category.get(content_category(content_type))
+        return thresholds or self.default
+
+# Error-line fingerprinting: repeats of (pool, status, normalized path, error
+# category) within an invocation collapse into one CloudWatch Logs event with
+# a count, first/last F5 timestamps and up to ERROR_SAMPLE_LINES sample lines
+ERROR_DEDUP_ENABLED = os.environ.get('ERROR_DEDUP_ENABLED', 'true').strip().lower() == 'true'
+ERROR_SAMPLE_LINES = int(os.environ.get('ERROR_SAMPLE_LINES', '3'))
+
+# Path segments that vary per request (numeric ids, UUIDs, long hex tokens)
+PATH_ID_PATTERN = re.compile(
+    r'/(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})(?=/|$)'
+)
+
+_threshold_table = None
+_threshold_table_expires = 0.0
+
+def load_threshold_config() -> Dict[str, Any]:
+    """
+    Threshold configuration from SSM when THRESHOLDS_PARAMETER is set,
+    otherwise the bundled f5_thresholds.json. Raises on failure, so that
+    get_thresholds can keep the table it already has
+    """
+    if THRESHOLDS_PARAMETER:
+        response = get_client('ssm').get_parameter(Name=THRESHOLDS_PARAMETER)
+        return json.loads(response['Parameter']['Value'])
+    return load_bundled_thresholds()
+
+def load_bundled_thresholds() -> Dict[str, Any]:
+    with open(THRESHOLDS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def get_thresholds() -> ThresholdTable:
+    """
+    Compiled threshold table, refreshed after THRESHOLDS_TTL_SECONDS. A failed
+    refresh keeps the previous table; the bundled file (or the module
+    defaults) is only used when nothing has been loaded yet
+    """
+    global _threshold_table, _threshold_table_expires
+    now = time.monotonic()
+    if _threshold_table is None or now >= _threshold_table_expires:
+        try:
+            _threshold_table = ThresholdTable(load_threshold_config())
+        except Exception as e:
+            if _threshold_table is not None:
+                print(f"Error refreshing thresholds, keeping the previous table: {str(e)}")
+            else:
+                print(f"Error loading thresholds, using {THRESHOLDS_FILE}: {str(e)}")
+                try:
+                    _threshold_table = ThresholdTable(load_bundled_thresholds())
+                except Exception as e:
+                    print(f"Error loading {THRESHOLDS_FILE}, using default thresholds: {str(e)}")
+                    _threshold_table = ThresholdTable({})
+        _threshold_table_expires = now + THRESHOLDS_TTL_SECONDS
+    return _threshold_table
+
+class PoolMetricsAggregator:
+    """
+    Streaming per-pool metrics over every parsed F5 line in the batch or
+    tumbling window (not only the error subset): counters plus a latency sketch per (BIG-IP, pool), so
+    memory is O(pools) regardless of the number of lines
+    """
+    
+    def __init__(self):
+        self.pools: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.total_lines = 0
+    
+    def add(self, f5_env: str, f5_pool: str, status_code: int, response_time_ms: int,
+            slow_threshold_ms: int = SLOW_RESPONSE_THRESHOLD_MS):
+        key = (f5_env or 'UNKNOWN', f5_pool or 'UNKNOWN')
+        stats = self.pools.get(key)
+        if stats is None:
+            stats = self.pools[key] = {
+                'total_requests': 0,
+                'error_requests': 0,
+                'slow_requests': 0,
+                'latency': LatencySketch()
+            }
+        
+        stats['total_requests'] += 1
+        stats['latency'].add(response_time_ms)
+        if status_code >= 400:
+            stats['error_requests'] += 1
+        if response_time_ms > slow_threshold_ms:
+            stats['slow_requests'] += 1
+        self.total_lines += 1
+    
+    def merge(self, other: 'PoolMetricsAggregator') -> 'PoolMetricsAggregator':
+        """Add the counters and sketches of other into this aggregator (returns self)"""
+        for key, other_stats in other.pools.items():
+            stats = self.pools.get(key)
+            if stats is None:
+                self.pools[key] = other_stats
+                continue
+            stats['total_requests'] += other_stats['total_requests']
+            stats['error_requests'] += other_stats['error_requests']
+            stats['slow_requests'] += other_stats['slow_requests']
+            stats['latency'].merge(other_stats['latency'])
+        self.total_lines += other.total_lines
+        return self
+    
+    def to_state(self) -> Dict[str, Any]:
+        """JSON state carried between invocations of a tumbling window (sketches as base64)"""
+        return {
+            'total_lines': self.total_lines,
+            'pools': [
+                [f5_env, f5_pool, stats['total_requests'], stats['error_requests'], stats['slow_requests'],
+                 base64.b64encode(stats['latency'].to_bytes()).decode('ascii')]
+                for (f5_env, f5_pool), stats in self.pools.items()
+            ]
+        }
+    
+    @classmethod
+    def from_state(cls, state: Optional[Dict[str, Any]]) -> 'PoolMetricsAggregator':
+        aggregator = cls()
+        if not state:
+            return aggregator
+        aggregator.total_lines = state.get('total_lines', 0)
+        for f5_env, f5_pool, total_requests, error_requests, slow_requests, latency in state.get('pools', []):
+            aggregator.pools[(f5_env, f5_pool)] = {
+                'total_requests': total_requests,
+                'error_requests': error_requests,
+                'slow_requests': slow_requests,
+                'latency': LatencySketch.from_bytes(base64.b64decode(latency))
+            }
+        return aggregator
+
+def window_start(event: Dict[str, Any]) -> Optional[datetime]:
+    """Start of the tumbling window of the invocation ('window': {'start': ISO-8601 UTC})"""
+    start = (event.get('window') or {}).get('start')
+    if not start:
+        return None
+    return datetime.strptime(start[:19], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda function to filter F5 logs for ERROR/WARN entries and performance issues
-    and send them to CloudWatch Logs
+    and send them to CloudWatch Logs.
+    
+    Reports partial batch failures (ReportBatchItemFailures): records are
+    processed in order and the sequence number of the first failed record is
+    returned, so Kinesis checkpoints everything before it and only retries
+    from there. Error logs are delivered before any metric is published: if
+    that fails, the failure point is the first record with error lines and
+    only the metrics of the records before it are published (or carried in
+    the window state), so the retried records are counted once.
+    Publishing metrics is best effort once the error logs are delivered.
+    
+    With a tumbling window on the event source the per-pool metrics are
+    carried in the returned 'state' across the invocations of each shard's
+    window and flushed once per pool when the window closes
+    (isFinalInvokeForWindow), timestamped at the window start. Without a
+    window they are flushed every invocation. Error lines are collapsed by
+    fingerprint within each invocation only, so they are delivered without
+    waiting for the window to close
     """
     
-    log_group_name = f"/aws/lambda/agesic-dl-poc-f5-error-logs"
     log_stream_name = f"f5-error-stream-{datetime.now().strftime('%Y-%m-%d-%H')}"
+    records = event.get('Records', [])
+    failed_record = None
     
     try:
-        # Process Kinesis records
-        error_logs = []
+        # Process Kinesis records: every parsed line feeds the per-pool
+        # metrics, only error/performance lines go to CloudWatch Logs
+        # (repeats collapsed by fingerprint)
+        error_logs = ErrorFingerprintCollapser()
+        windowed = 'window' in event
+        pool_metrics = PoolMetricsAggregator.from_state(event.get('state'))
+        # Metrics of the first record with error lines and every record after
+        # it: merged into pool_metrics only once those error lines are delivered
+        pending_metrics = None
+        error_record = None
+        flush_metrics = not windowed or event.get('isFinalInvokeForWindow') or event.get('isWindowTerminatedEarly')
+        processed_records = 0
+        thresholds = get_thresholds()
         
-        for record in event['Records']:
-            # Decode Kinesis data
-            payload = base64.b64decode(record['kinesis']['data'])
-            
-            # Handle gzip compression if present
+        for record in records:
             try:
-                if payload[:2] == b'\x1f\x8b':  # gzip magic number
-                    payload = gzip.decompress(payload)
-                log_data = payload.decode('utf-8')
+                lines = decode_kinesis_record(record)
             except Exception as e:
-                print(f"Error decompressing data: {str(e)}")
-                continue
+                print(f"Error decoding record {record['kinesis'].get('sequenceNumber')}: {str(e)}")
+                failed_record = record
+                break
             
-            # Process each log line or JSON record
-            try:
-                # Try to parse as JSON first (from Kinesis Agent)
-                if log_data.strip().startswith('{'):
-                    json_data = json.loads(log_data.strip())
-                    # Extract the actual log line if it's wrapped
-                    if 'message' in json_data:
-                        log_line = json_data['message']
-                    else:
-                        log_line = log_data.strip()
+            record_metrics = pending_metrics if pending_metrics is not None else PoolMetricsAggregator()
+            errors_before = len(error_logs)
+            for line in lines:
+                error_log = process_f5_log_line(line, record_metrics, thresholds)
+                if error_log:
+                    error_logs.add(error_log)
+            if pending_metrics is None:
+                if len(error_logs) > errors_before:
+                    error_record = record
+                    pending_metrics = record_metrics
                 else:
-                    log_line = log_data.strip()
-                
-                # Process the log line
-                for line in log_line.split('\n'):
-                    if line.strip():
-                        error_log = process_f5_log_line(line.strip())
-                        if error_log:
-                            error_logs.append(error_log)
-                            
-            except json.JSONDecodeError:
-                # Not JSON, process as plain text
-                for line in log_data.strip().split('\n'):
-                    if line.strip():
-                        error_log = process_f5_log_line(line.strip())
-                        if error_log:
-                            error_logs.append(error_log)
+                    pool_metrics.merge(record_metrics)
+            processed_records += 1
         
-        # Send error logs to CloudWatch if any found
-        if error_logs:
-            send_to_cloudwatch(log_group_name, log_stream_name, error_logs)
-            print(f"Processed {len(error_logs)} F5 error/performance log entries")
+        # Deliver the error logs first; a send that outlives the deadline is
+        # cancelled before its next PutLogEvents request
+        error_events = error_logs.events()
+        if error_events:
+            cancelled = threading.Event()
+            try:
+                wait_for_sinks({'logs': get_sink_executor().submit(
+                    error_log_sink.send, log_stream_name, error_events, cancelled)}, context)
+            except Exception as e:
+                cancelled.set()
+                print(f"Error delivering error logs, retrying from record "
+                      f"{error_record['kinesis'].get('sequenceNumber')}: {str(e)}")
+                failed_record = error_record
+                pending_metrics = None
+        if pending_metrics is not None:
+            pool_metrics.merge(pending_metrics)
         
-        # Send custom metrics to CloudWatch
-        send_f5_metrics_to_cloudwatch(error_logs)
+        # Custom metrics (full traffic, not only errors) of the delivered
+        # records; EMF only writes to stdout
+        if flush_metrics and METRICS_MODE == 'emf':
+            emit_f5_metrics_emf(pool_metrics, window_start(event))
+        elif flush_metrics and METRICS_MODE in ('true', 'api'):
+            try:
+                wait_for_sinks({'metrics': get_sink_executor().submit(
+                    send_f5_metrics_to_cloudwatch, pool_metrics, window_start(event))}, context)
+            except Exception as e:
+                # Failing now would retry (and duplicate) the delivered error logs
+                print(f"Error sending F5 metrics to CloudWatch: {str(e)}")
         
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'message': f'Processed {len(error_logs)} F5 error logs',
-                'processed_records': len(event['Records'])
-            })
-        }
+        if error_logs:
+            print(f"Processed {len(error_logs)} F5 error/performance log entries "
+                  f"({len(error_events)} events after collapsing repeats)")
+        
+        return batch_response(failed_record, {
+            'message': f'Processed {len(error_logs)} F5 error logs',
+            'error_events': len(error_events),
+            'processed_records': processed_records,
+            'parsed_lines': pool_metrics.total_lines
+        }, state=pool_metrics.to_state() if windowed and not flush_metrics else None, windowed=windowed)
         
     except Exception as e:
         print(f"Error processing records: {str(e)}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'error': str(e)
-            })
-        }
+        # Raised before any delivery: every record is retried, so the window
+        # keeps the state it came with
+        return batch_response(records[0] if records else None, {
+            'error': str(e)
+        }, state=event.get('state'), windowed='window' in event)
 
-def process_f5_log_line(log_line: str) -> Optional[Dict[str, Any]]:
+def batch_response(failed_record: Optional[Dict[str, Any]], body: Dict[str, Any],
+                   state: Optional[Dict[str, Any]] = None, windowed: bool = False) -> Dict[str, Any]:
     """
-    Process a single F5 log line and return structured data if it's an error or performance issue
+    Handler response with batchItemFailures (read by the Kinesis event source),
+    the tumbling window state when windowed, plus the previous statusCode/body
+    for logs and manual invocations
+    """
+    failures = []
+    if failed_record is not None:
+        failures.append({'itemIdentifier': failed_record['kinesis']['sequenceNumber']})
+    response = {
+        'batchItemFailures': failures,
+        'statusCode': 500 if failures else 200,
+        'body': json.dumps(body)
+    }
+    if windowed:
+        response['state'] = state or {}
+    return response
+
+def decode_kinesis_record(record: Dict[str, Any]) -> List[str]:
+    """
+    Decode a Kinesis record (base64, optional KPL aggregation, optional gzip,
+    plain text or Kinesis Agent JSON) into its non-empty log lines.
+    Raises on malformed data, including a KPL checksum mismatch
+    """
+    lines = []
+    for payload in deaggregate(base64.b64decode(record['kinesis']['data'])):
+        # Handle gzip compression if present
+        if payload[:2] == b'\x1f\x8b':  # gzip magic number
+            import gzip
+            payload = gzip.decompress(payload)
+        log_data = payload.decode('utf-8').strip()
+        
+        # Try to parse as JSON first (from Kinesis Agent), extracting the actual
+        # log line if it's wrapped; otherwise process as plain text
+        log_line = log_data
+        if log_data.startswith('{'):
+            try:
+                json_data = json.loads(log_data)
+                if isinstance(json_data, dict) and 'message' in json_data:
+                    log_line = json_data['message']
+            except json.JSONDecodeError:
+                pass
+        
+        lines.extend(line.strip() for line in log_line.split('\n') if line.strip())
+    return lines
+
+def wait_for_sinks(sinks: Dict[str, Any], context: Any):
+    """
+    Wait for the sink futures until the invocation deadline (remaining time
+    minus SINK_DEADLINE_MARGIN_MS) and re-raise the first sink error
+    """
+    if not sinks:
+        return
+    timeout = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        timeout = max(0, context.get_remaining_time_in_millis() - SINK_DEADLINE_MARGIN_MS) / 1000
+    
+    from concurrent.futures import wait
+    
+    done, pending = wait(sinks.values(), timeout=timeout)
+    if pending:
+        late = [name for name, future in sinks.items() if future in pending]
+        raise TimeoutError(f"Sinks did not finish before the invocation deadline: {', '.join(late)}")
+    for future in done:
+        future.result()
+
+def process_f5_log_line(log_line: str, pool_metrics: Optional[PoolMetricsAggregator] = None,
+                        thresholds: Optional[ThresholdTable] = None) -> Optional[Dict[str, Any]]:
+    """
+    Process a single F5 log line and return structured data if it's an error or performance issue.
+    Every successfully parsed line is also added to pool_metrics when given.
+    Slow/large thresholds come from the threshold table (per pool, virtualserver
+    and content_category)
     """
     try:
-        # Try to parse as F5 log format
-        match = F5_LOG_PATTERN.match(log_line)
-        if match:
-            log_data = match.groupdict()
-            
+        thresholds = thresholds or get_thresholds()
+        
+        # One regex match per line. Fast reject: healthy lines (most of the
+        # traffic) only read a few groups to feed the pool metrics, without
+        # building the field dict
+        match = match_line(log_line)
+        triage = triage_fields(match) if match else None
+        if triage is not None:
+            codigo, tamano, tiempo, content_type, f5_virtualserver, f5_pool, f5_bigip_name = triage
+            slow_threshold_ms, large_threshold_bytes = thresholds.lookup(f5_pool, f5_virtualserver, content_type)
+            status_code = int(codigo)
+            response_time_ms = int(tiempo)
+            if (str(status_code)[0] not in ERROR_STATUS_CODES
+                    and response_time_ms <= slow_threshold_ms
+                    and int(tamano) <= large_threshold_bytes):
+                if pool_metrics is not None:
+                    pool_metrics.add(f5_bigip_name, f5_pool, status_code, response_time_ms, slow_threshold_ms)
+                return None
+        
+        # Full F5 fields from the same match
+        log_data = match_fields(match) if match else None
+        if log_data:
             # Convert numeric fields
             try:
                 status_code = int(log_data['codigo_respuesta'])
@@ -136,6 +492,13 @@ def process_f5_log_line(log_line: str) -> Optional[Dict[str, Any]]:
             except ValueError:
                 return None
             
+            slow_threshold_ms, large_threshold_bytes = thresholds.lookup(
+                log_data['f5_pool'], log_data['f5_virtualserver'], log_data['content_type']
+            )
+            if pool_metrics is not None:
+                pool_metrics.add(log_data['f5_bigip_name'], log_data['f5_pool'], status_code, response_time_ms,
+                                 slow_threshold_ms)
+            
             # Determine if this is an error or performance issue
             is_error = False
             error_reasons = []
@@ -147,14 +510,14 @@ def process_f5_log_line(log_line: str) -> Optional[Dict[str, Any]]:
                 error_reasons.append(f"HTTP {status_code} ({error_type})")
             
             # Check for slow responses
-            if response_time_ms > SLOW_RESPONSE_THRESHOLD_MS:
+            if response_time_ms > slow_threshold_ms:
                 is_error = True
-                error_reasons.append(f"Slow response: {response_time_ms}ms (threshold: {SLOW_RESPONSE_THRESHOLD_MS}ms)")
+                error_reasons.append(f"Slow response: {response_time_ms}ms (threshold: {slow_threshold_ms}ms)")
             
             # Check for large responses (potential performance issue)
-            if response_size > LARGE_RESPONSE_THRESHOLD_BYTES:
+            if response_size > large_threshold_bytes:
                 is_error = True
-                error_reasons.append(f"Large response: {response_size} bytes (threshold: {LARGE_RESPONSE_THRESHOLD_BYTES} bytes)")
+                error_reasons.append(f"Large response: {response_size} bytes (threshold: {large_threshold_bytes} bytes)")
             
             # Return structured error log if any issues found
             if is_error:
@@ -183,13 +546,20 @@ def process_f5_log_line(log_line: str) -> Optional[Dict[str, Any]]:
                         'f5_virtualserver': log_data['f5_virtualserver'],
                         'f5_pool': log_data['f5_pool'],
                         'f5_bigip_name': log_data['f5_bigip_name'],
-                        'error_category': determine_error_category(status_code, response_time_ms, response_size)
+                        'error_category': determine_error_category(
+                            status_code, response_time_ms, response_size,
+                            (slow_threshold_ms, large_threshold_bytes)
+                        )
                     }
                 }
+            
+            # Healthy F5 line (same outcome as the fast reject above)
+            return None
         
         # If not F5 format, check for generic error patterns
         error_keywords = ['ERROR', 'CRITICAL', 'FATAL', 'EXCEPTION', 'FAILED']
-        if any(keyword in log_line.upper() for keyword in error_keywords):
+        log_line_upper = log_line.upper()
+        if any(keyword in log_line_upper for keyword in error_keywords):
             return {
                 'timestamp': datetime.now().isoformat(),
                 'original_log': log_line,
@@ -197,7 +567,7 @@ def process_f5_log_line(log_line: str) -> Optional[Dict[str, Any]]:
                 'error_reasons': ['Contains error keyword'],
                 'parsed_data': {
                     'contains_error_keyword': True,
-                    'detected_keywords': [kw for kw in error_keywords if kw in log_line.upper()]
+                    'detected_keywords': [kw for kw in error_keywords if kw in log_line_upper]
                 }
             }
             
@@ -206,10 +576,13 @@ def process_f5_log_line(log_line: str) -> Optional[Dict[str, Any]]:
     
     return None
 
-def determine_error_category(status_code: int, response_time_ms: int, response_size: int) -> str:
+def determine_error_category(status_code: int, response_time_ms: int, response_size: int,
+                             thresholds: Tuple[int, int] = (SLOW_RESPONSE_THRESHOLD_MS, LARGE_RESPONSE_THRESHOLD_BYTES)) -> str:
     """
-    Determine the category of error based on metrics
+    Determine the category of error based on metrics and the line's
+    (slow_response_ms, large_response_bytes) thresholds
     """
+    slow_threshold_ms, large_threshold_bytes = thresholds
     categories = []
     
     if 400 <= status_code < 500:
@@ -217,194 +590,298 @@ def determine_error_category(status_code: int, response_time_ms: int, response_s
     elif status_code >= 500:
         categories.append('server_error')
     
-    if response_time_ms > SLOW_RESPONSE_THRESHOLD_MS:
+    if response_time_ms > slow_threshold_ms:
         categories.append('performance_slow')
     
-    if response_size > LARGE_RESPONSE_THRESHOLD_BYTES:
+    if response_size > large_threshold_bytes:
         categories.append('performance_large')
     
     return ','.join(categories) if categories else 'unknown'
 
-def send_to_cloudwatch(log_group_name: str, log_stream_name: str, error_logs: List[Dict[str, Any]]):
+def parse_event_time_ms(error_log: Dict[str, Any], default_ms: int) -> int:
     """
-    Send error logs to CloudWatch Logs
+    Event time in epoch ms from the F5 request timestamp (timestamp_rp,
+    e.g. '08/Aug/2025:14:30:00 -0300'); default_ms if absent or unparseable
     """
-    try:
-        # Create log group if it doesn't exist
+    timestamp_rp = error_log.get('parsed_data', {}).get('timestamp_rp')
+    if timestamp_rp:
         try:
-            cloudwatch_logs.create_log_group(logGroupName=log_group_name)
-        except cloudwatch_logs.exceptions.ResourceAlreadyExistsException:
+            return int(datetime.strptime(timestamp_rp, '%d/%b/%Y:%H:%M:%S %z').timestamp() * 1000)
+        except ValueError:
             pass
-        
-        # Create log stream if it doesn't exist
+    return default_ms
+
+def normalize_path(request: str) -> str:
+    """
+    Request path without query string or ;jsessionid, with variable segments
+    (numeric ids, UUIDs, hex tokens) replaced by {id}
+    """
+    path = request.split('?', 1)[0].split(';', 1)[0]
+    return PATH_ID_PATTERN.sub('/{id}', path)
+
+class ErrorFingerprintCollapser:
+    """
+    Collapses repeated F5 error lines before CloudWatch Logs: lines with the
+    same (pool, status, normalized path, error category) become one event
+    (the first line) with the number of occurrences, first/last F5 timestamps
+    and a few more sample lines. Only the first error_log of each fingerprint
+    is kept, so memory is O(fingerprints). Generic (non-F5) error lines and
+    single occurrences are sent unchanged
+    """
+    
+    def __init__(self, enabled: bool = ERROR_DEDUP_ENABLED, sample_lines: int = ERROR_SAMPLE_LINES):
+        self.enabled = enabled
+        self.sample_lines = sample_lines
+        self.groups: Dict[Tuple[str, int, str, str], Dict[str, Any]] = {}
+        self.passthrough: List[Dict[str, Any]] = []
+        self.total = 0
+        self.now_ms = int(time.time() * 1000)
+    
+    def __len__(self) -> int:
+        return self.total
+    
+    def fingerprint(self, error_log: Dict[str, Any]) -> Optional[Tuple[str, int, str, str]]:
+        if not self.enabled or error_log.get('log_type') != 'f5_access':
+            return None
+        data = error_log['parsed_data']
+        return (data['f5_pool'], data['codigo_respuesta'], normalize_path(data['request']), data['error_category'])
+    
+    def add(self, error_log: Dict[str, Any]):
+        self.total += 1
+        key = self.fingerprint(error_log)
+        if key is None:
+            self.passthrough.append(error_log)
+            return
+        event_ms = parse_event_time_ms(error_log, self.now_ms)
+        group = self.groups.get(key)
+        if group is None:
+            self.groups[key] = {
+                'error_log': error_log,
+                'count': 1,
+                'first_ms': event_ms,
+                'last_ms': event_ms,
+                'samples': []
+            }
+            return
+        group['count'] += 1
+        group['first_ms'] = min(group['first_ms'], event_ms)
+        group['last_ms'] = max(group['last_ms'], event_ms)
+        if len(group['samples']) < self.sample_lines:
+            group['samples'].append(error_log['original_log'])
+    
+    def events(self) -> List[Dict[str, Any]]:
+        """Error logs to send: one per fingerprint plus the passthrough lines"""
+        events = list(self.passthrough)
+        for (f5_pool, status_code, path, error_category), group in self.groups.items():
+            error_log = group['error_log']
+            if group['count'] > 1:
+                error_log = dict(error_log)
+                error_log['collapsed'] = {
+                    'fingerprint': {
+                        'f5_pool': f5_pool,
+                        'codigo_respuesta': status_code,
+                        'path': path,
+                        'error_category': error_category
+                    },
+                    'count': group['count'],
+                    'first_seen': datetime.fromtimestamp(group['first_ms'] / 1000, timezone.utc).isoformat(),
+                    'last_seen': datetime.fromtimestamp(group['last_ms'] / 1000, timezone.utc).isoformat(),
+                    'sample_logs': group['samples']
+                }
+            events.append(error_log)
+        return events
+
+class CloudWatchLogsSink:
+    """
+    PutLogEvents sink for the error log group: provisioned streams are
+    remembered across warm invocations, events are ordered by their F5
+    timestamp and packed into batches within the request size/count limits
+    """
+    
+    # PutLogEvents limits: 1 MB per request (message bytes + 26 per event),
+    # 10,000 events, 256 KB per event and a 24 h span per batch
+    MAX_BATCH_BYTES = 1048576
+    MAX_BATCH_EVENTS = 10000
+    EVENT_OVERHEAD_BYTES = 26
+    MAX_EVENT_BYTES = 262144 - EVENT_OVERHEAD_BYTES
+    MAX_BATCH_SPAN_MS = 24 * 3600 * 1000
+    
+    def __init__(self, log_group_name: str, service_name: str = 'logs'):
+        self.log_group_name = log_group_name
+        self.service_name = service_name
+        self.provisioned_streams = set()
+        self.log_group_ready = False
+    
+    @property
+    def client(self) -> Any:
+        return get_client(self.service_name)
+    
+    def ensure_stream(self, log_stream_name: str):
+        """Create the log group/stream once per execution environment"""
+        if log_stream_name in self.provisioned_streams:
+            return
+        if not self.log_group_ready:
+            try:
+                self.client.create_log_group(logGroupName=self.log_group_name)
+            except self.client.exceptions.ResourceAlreadyExistsException:
+                pass
+            self.log_group_ready = True
         try:
-            cloudwatch_logs.create_log_stream(
-                logGroupName=log_group_name,
-                logStreamName=log_stream_name
-            )
-        except cloudwatch_logs.exceptions.ResourceAlreadyExistsException:
+            self.client.create_log_stream(logGroupName=self.log_group_name, logStreamName=log_stream_name)
+        except self.client.exceptions.ResourceAlreadyExistsException:
             pass
-        
-        # Prepare log events
-        log_events = []
+        self.provisioned_streams.add(log_stream_name)
+    
+    def build_events(self, error_logs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], int]]:
+        """Log events sorted by F5 timestamp, with their size for batching"""
+        now_ms = int(time.time() * 1000)
+        events = []
         for error_log in error_logs:
-            log_events.append({
-                'timestamp': int(datetime.now().timestamp() * 1000),
-                'message': json.dumps(error_log, ensure_ascii=False)
-            })
-        
-        # Send logs to CloudWatch in batches (CloudWatch has a limit of 10,000 events per request)
-        batch_size = 1000
-        for i in range(0, len(log_events), batch_size):
-            batch = log_events[i:i + batch_size]
-            cloudwatch_logs.put_log_events(
-                logGroupName=log_group_name,
+            message = json.dumps(error_log, ensure_ascii=False)
+            encoded = message.encode('utf-8')
+            if len(encoded) > self.MAX_EVENT_BYTES:
+                # Oversized events are truncated instead of rejecting the batch
+                encoded = encoded[:self.MAX_EVENT_BYTES]
+                message = encoded.decode('utf-8', errors='ignore')
+                encoded = message.encode('utf-8')
+            events.append((
+                {'timestamp': parse_event_time_ms(error_log, now_ms), 'message': message},
+                len(encoded) + self.EVENT_OVERHEAD_BYTES
+            ))
+        events.sort(key=lambda event: event[0]['timestamp'])
+        return events
+    
+    def batches(self, events: List[Tuple[Dict[str, Any], int]]):
+        """Pack sorted events into PutLogEvents requests by bytes, count and time span"""
+        batch = []
+        batch_bytes = 0
+        for event, size in events:
+            if batch and (batch_bytes + size > self.MAX_BATCH_BYTES
+                          or len(batch) >= self.MAX_BATCH_EVENTS
+                          or event['timestamp'] - batch[0]['timestamp'] > self.MAX_BATCH_SPAN_MS):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append(event)
+            batch_bytes += size
+        if batch:
+            yield batch
+    
+    def put_batch(self, log_stream_name: str, batch: List[Dict[str, Any]]):
+        try:
+            response = self.client.put_log_events(
+                logGroupName=self.log_group_name,
                 logStreamName=log_stream_name,
                 logEvents=batch
             )
-            
-    except Exception as e:
-        print(f"Error sending logs to CloudWatch: {str(e)}")
-        raise
+        except self.client.exceptions.ResourceNotFoundException:
+            # Group or stream deleted since it was cached: provision again and retry once
+            self.provisioned_streams.discard(log_stream_name)
+            self.log_group_ready = False
+            self.ensure_stream(log_stream_name)
+            response = self.client.put_log_events(
+                logGroupName=self.log_group_name,
+                logStreamName=log_stream_name,
+                logEvents=batch
+            )
+        rejected = response.get('rejectedLogEventsInfo')
+        if rejected:
+            # Events older than 14 days or more than 2 h in the future
+            print(f"CloudWatch Logs rejected events in {log_stream_name}: {json.dumps(rejected)}")
+    
+    def send(self, log_stream_name: str, error_logs: List[Dict[str, Any]],
+             cancelled: Optional[threading.Event] = None) -> int:
+        """
+        Send error logs to CloudWatch Logs and return the number of requests.
+        Stops before the next request once cancelled is set (the handler gave
+        up waiting and the records will be retried)
+        """
+        try:
+            self.ensure_stream(log_stream_name)
+            requests = 0
+            for batch in self.batches(self.build_events(error_logs)):
+                if cancelled is not None and cancelled.is_set():
+                    raise TimeoutError(f"Delivery to {log_stream_name} cancelled after {requests} requests")
+                self.put_batch(log_stream_name, batch)
+                requests += 1
+            return requests
+        except Exception as e:
+            print(f"Error sending logs to CloudWatch: {str(e)}")
+            raise
+
+# Module-level so provisioned streams are reused across warm invocations
+error_log_sink = CloudWatchLogsSink(ERROR_LOG_GROUP_NAME)
 
-def send_f5_metrics_to_cloudwatch(error_logs: List[Dict[str, Any]]):
+def pool_metric_values(data: Dict[str, Any]) -> List[Tuple[str, float, str]]:
     """
-    Send F5-specific custom metrics to CloudWatch
+    Per-pool metrics as (name, value, unit), shared by the PutMetricData and EMF outputs
+    """
+    total_requests = data['total_requests']
+    latency = data['latency']
+    
+    # Calculate metrics (mean and P95 from the mergeable latency sketch)
+    avg_response_time = latency.mean or 0
+    error_rate = (data['error_requests'] / total_requests * 100) if total_requests > 0 else 0
+    slow_rate = (data['slow_requests'] / total_requests * 100) if total_requests > 0 else 0
+    p95_response_time = latency.quantile(0.95) or 0
+    
+    # Pool health score (100 - error_rate - slow_rate/2)
+    pool_health_score = max(0, 100 - error_rate - (slow_rate / 2))
+    
+    return [
+        ('RequestCount', total_requests, 'Count'),
+        ('AverageResponseTime', avg_response_time, 'Milliseconds'),
+        ('P95ResponseTime', p95_response_time, 'Milliseconds'),
+        ('ErrorRate', error_rate, 'Percent'),
+        ('PoolHealthScore', pool_health_score, 'Percent')
+    ]
+
+def send_f5_metrics_to_cloudwatch(pool_metrics: PoolMetricsAggregator, timestamp: Optional[datetime] = None):
+    """
+    Send F5-specific custom metrics to CloudWatch (timestamp defaults to now)
     """
     try:
-        if not error_logs:
+        if not pool_metrics.pools:
             return
         
-        # Aggregate metrics by F5 components
-        metrics_data = {}
-        
-        for error_log in error_logs:
-            parsed_data = error_log.get('parsed_data', {})
-            f5_env = parsed_data.get('f5_bigip_name', 'UNKNOWN')
-            f5_pool = parsed_data.get('f5_pool', 'UNKNOWN')
-            f5_vs = parsed_data.get('f5_virtualserver', 'UNKNOWN')
-            response_time = parsed_data.get('tiempo_respuesta_ms', 0)
-            status_code = parsed_data.get('codigo_respuesta', 0)
-            
-            # Initialize metrics structure
-            key = f"{f5_env}|{f5_pool}|{f5_vs}"
-            if key not in metrics_data:
-                metrics_data[key] = {
-                    'f5_env': f5_env,
-                    'f5_pool': f5_pool,
-                    'f5_vs': f5_vs,
-                    'total_requests': 0,
-                    'error_requests': 0,
-                    'slow_requests': 0,
-                    'response_times': [],
-                    'status_codes': []
-                }
-            
-            # Aggregate data
-            metrics_data[key]['total_requests'] += 1
-            metrics_data[key]['response_times'].append(response_time)
-            metrics_data[key]['status_codes'].append(status_code)
-            
-            if str(status_code)[0] in ERROR_STATUS_CODES:
-                metrics_data[key]['error_requests'] += 1
-            
-            if response_time > SLOW_RESPONSE_THRESHOLD_MS:
-                metrics_data[key]['slow_requests'] += 1
-        
         # Send metrics to CloudWatch
         metric_data = []
-        timestamp = datetime.now()
+        timestamp = timestamp or datetime.now()
         
-        for key, data in metrics_data.items():
-            f5_env = data['f5_env']
-            f5_pool = data['f5_pool']
-            total_requests = data['total_requests']
-            error_requests = data['error_requests']
-            slow_requests = data['slow_requests']
-            response_times = data['response_times']
-            
-            # Calculate metrics
-            avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-            error_rate = (error_requests / total_requests * 100) if total_requests > 0 else 0
-            slow_rate = (slow_requests / total_requests * 100) if total_requests > 0 else 0
-            
-            # Calculate P95 response time
-            if response_times:
-                sorted_times = sorted(response_times)
-                p95_index = int(0.95 * len(sorted_times))
-                p95_response_time = sorted_times[p95_index] if p95_index < len(sorted_times) else sorted_times[-1]
-            else:
-                p95_response_time = 0
-            
-            # Pool health score (100 - error_rate - slow_rate/2)
-            pool_health_score = max(0, 100 - error_rate - (slow_rate / 2))
-            
-            # Request Count
-            metric_data.append({
-                'MetricName': 'RequestCount',
-                'Dimensions': [
-                    {'Name': 'F5Environment', 'Value': f5_env},
-                    {'Name': 'Pool', 'Value': f5_pool}
-                ],
-                'Value': total_requests,
-                'Unit': 'Count',
-                'Timestamp': timestamp
-            })
+        for (f5_env, f5_pool), data in pool_metrics.pools.items():
+            dimensions = [
+                {'Name': 'F5Environment', 'Value': f5_env},
+                {'Name': 'Pool', 'Value': f5_pool}
+            ]
             
-            # Average Response Time
-            metric_data.append({
-                'MetricName': 'AverageResponseTime',
-                'Dimensions': [
-                    {'Name': 'F5Environment', 'Value': f5_env},
-                    {'Name': 'Pool', 'Value': f5_pool}
-                ],
-                'Value': avg_response_time,
-                'Unit': 'Milliseconds',
-                'Timestamp': timestamp
-            })
+            for name, value, unit in pool_metric_values(data):
+                metric_data.append({
+                    'MetricName': name,
+                    'Dimensions': dimensions,
+                    'Value': value,
+                    'Unit': unit,
+                    'Timestamp': timestamp
+                })
             
-            # P95 Response Time
-            metric_data.append({
-                'MetricName': 'P95ResponseTime',
-                'Dimensions': [
-                    {'Name': 'F5Environment', 'Value': f5_env},
-                    {'Name': 'Pool', 'Value': f5_pool}
-                ],
-                'Value': p95_response_time,
-                'Unit': 'Milliseconds',
-                'Timestamp': timestamp
-            })
-            
-            # Error Rate
-            metric_data.append({
-                'MetricName': 'ErrorRate',
-                'Dimensions': [
-                    {'Name': 'F5Environment', 'Value': f5_env},
-                    {'Name': 'Pool', 'Value': f5_pool}
-                ],
-                'Value': error_rate,
-                'Unit': 'Percent',
-                'Timestamp': timestamp
-            })
-            
-            # Pool Health Score
-            metric_data.append({
-                'MetricName': 'PoolHealthScore',
-                'Dimensions': [
-                    {'Name': 'F5Environment', 'Value': f5_env},
-                    {'Name': 'Pool', 'Value': f5_pool}
-                ],
-                'Value': pool_health_score,
-                'Unit': 'Percent',
-                'Timestamp': timestamp
-            })
+            # Response time distribution: CloudWatch merges Values/Counts across
+            # invocations, so p95/p99 statistics hold for any period
+            values, counts = data['latency'].to_values_counts()
+            for start in range(0, len(values), MAX_DISTRIBUTION_VALUES):
+                metric_data.append({
+                    'MetricName': 'ResponseTime',
+                    'Dimensions': dimensions,
+                    'Values': values[start:start + MAX_DISTRIBUTION_VALUES],
+                    'Counts': counts[start:start + MAX_DISTRIBUTION_VALUES],
+                    'Unit': 'Milliseconds',
+                    'Timestamp': timestamp
+                })
         
         # Send metrics in batches (CloudWatch limit is 20 metrics per request)
         batch_size = 20
         for i in range(0, len(metric_data), batch_size):
             batch = metric_data[i:i + batch_size]
-            cloudwatch.put_metric_data(
-                Namespace='AGESIC/F5Logs',
+            get_client('cloudwatch').put_metric_data(
+                Namespace=METRICS_NAMESPACE,
                 MetricData=batch
             )
         
@@ -413,3 +890,45 @@ def send_f5_metrics_to_cloudwatch(error_logs: List[Dict[str, Any]]):
     except Exception as e:
         print(f"Error sending F5 metrics to CloudWatch: {str(e)}")
         # Don't raise exception to avoid breaking the main flow
+
+def emit_f5_metrics_emf(pool_metrics: PoolMetricsAggregator, timestamp: Optional[datetime] = None):
+    """
+    Write the same F5 metrics in CloudWatch Embedded Metric Format: one JSON
+    document per pool on stdout, extracted asynchronously by CloudWatch Logs
+    from the function's log group (no API calls on the Kinesis critical path).
+    The latency distribution is summarized as P50/P95/P99 scalars from the
+    sketch, so the output grows with the number of pools, not of lines
+    """
+    timestamp_ms = int((timestamp.timestamp() if timestamp else time.time()) * 1000)
+    documents = 0
+    
+    for (f5_env, f5_pool), data in pool_metrics.pools.items():
+        metrics = pool_metric_values(data) + [
+            (name, round(data['latency'].quantile(q) or 0, 2), 'Milliseconds')
+            for name, q in EMF_PERCENTILES
+        ]
+        
+        document = {
+            '_aws': {
+                'Timestamp': timestamp_ms,
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [METRIC_DIMENSIONS],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, _, unit in metrics]
+                }]
+            },
+            'F5Environment': f5_env,
+            'Pool': f5_pool
+        }
+        for name, value, _ in metrics:
+            document[name] = value
+        print(json.dumps(document, ensure_ascii=False))
+        documents += 1
+    
+    if documents:
+        print(f"Emitted {documents} EMF metric documents")
+
+# Init-time load of the SSM threshold table (off the request path). Failures
+# fall back to the bundled file and are retried after THRESHOLDS_TTL_SECONDS
+if THRESHOLDS_PARAMETER:
+    get_thresholds()
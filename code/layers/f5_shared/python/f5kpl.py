@@ -0,0 +1,138 @@
+"""
+AGESIC Data Lake PoC - Registros Kinesis agregados (formato KPL)
+
+La Kinesis Producer Library empaqueta varios user records en un solo registro
+de Kinesis (hasta 1 MB) para superar el límite de 1000 registros/s por shard:
+
+    magic (F3 89 9A C2) | AggregatedRecord (protobuf) | MD5 del protobuf (16 bytes)
+
+    message AggregatedRecord {
+      repeated string partition_key_table     = 1;
+      repeated string explicit_hash_key_table = 2;
+      repeated Record records                 = 3;
+    }
+    message Record {
+      required uint64 partition_key_index     = 1;
+      optional uint64 explicit_hash_key_index = 2;
+      required bytes  data                    = 3;
+      repeated Tag    tags                    = 4;
+    }
+
+deaggregate() devuelve los payloads de un registro (o el registro tal cual si
+no está agregado) verificando el MD5, sin depender de protobuf.
+aggregate_records() arma el mismo formato para productores Python y pruebas.
+
+Usado por:
+- Lambda de filtrado: de-agregación antes de gzip/JSON/texto
+"""
+
+import hashlib
+from typing import List, Sequence, Tuple
+
+KPL_MAGIC = b'\xf3\x89\x9a\xc2'
+DIGEST_SIZE = 16
+
+# Tamaño máximo de un registro de Kinesis (datos + partition key)
+MAX_RECORD_BYTES = 1024 * 1024
+
+_WIRE_VARINT = 0
+_WIRE_64BIT = 1
+_WIRE_LENGTH_DELIMITED = 2
+_WIRE_32BIT = 5
+
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Varint truncado en registro KPL")
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _fields(message: bytes):
+    """Itera (número de campo, valor) de un mensaje protobuf; bytes para campos length-delimited"""
+    offset = 0
+    while offset < len(message):
+        key, offset = _read_varint(message, offset)
+        field_number, wire_type = key >> 3, key & 0x07
+        if wire_type == _WIRE_VARINT:
+            value, offset = _read_varint(message, offset)
+        elif wire_type == _WIRE_LENGTH_DELIMITED:
+            size, offset = _read_varint(message, offset)
+            if offset + size > len(message):
+                raise ValueError("Campo truncado en registro KPL")
+            value = message[offset:offset + size]
+            offset += size
+        elif wire_type == _WIRE_64BIT:
+            value = message[offset:offset + 8]
+            offset += 8
+        elif wire_type == _WIRE_32BIT:
+            value = message[offset:offset + 4]
+            offset += 4
+        else:
+            raise ValueError(f"Wire type no soportado en registro KPL: {wire_type}")
+        yield field_number, value
+
+
+def is_aggregated(data: bytes) -> bool:
+    return len(data) > len(KPL_MAGIC) + DIGEST_SIZE and data[:len(KPL_MAGIC)] == KPL_MAGIC
+
+
+def deaggregate(data: bytes) -> List[bytes]:
+    """
+    Payloads de los user records de un registro de Kinesis. Un registro no
+    agregado se devuelve como único elemento. ValueError si el MD5 no coincide
+    o el protobuf está truncado (el registro se reporta como fallido, no se
+    pierden líneas en silencio)
+    """
+    if not is_aggregated(data):
+        return [data]
+
+    message = data[len(KPL_MAGIC):-DIGEST_SIZE]
+    if hashlib.md5(message).digest() != data[-DIGEST_SIZE:]:
+        raise ValueError("Checksum MD5 inválido en registro KPL agregado")
+
+    payloads = []
+    for field_number, value in _fields(message):
+        if field_number != 3:
+            continue
+        for record_field, record_value in _fields(value):
+            if record_field == 3:
+                payloads.append(record_value)
+    return payloads
+
+
+def aggregate_records(partition_key: str, payloads: Sequence[bytes]) -> bytes:
+    """
+    Registro agregado con todos los payloads bajo una misma partition key.
+    El llamador debe mantener el resultado por debajo de MAX_RECORD_BYTES
+    """
+    message = bytearray()
+    key = partition_key.encode('utf-8')
+    message.append((1 << 3) | _WIRE_LENGTH_DELIMITED)
+    _write_varint(message, len(key))
+    message += key
+    for payload in payloads:
+        record = bytearray()
+        record.append((1 << 3) | _WIRE_VARINT)
+        _write_varint(record, 0)
+        record.append((3 << 3) | _WIRE_LENGTH_DELIMITED)
+        _write_varint(record, len(payload))
+        record += payload
+        message.append((3 << 3) | _WIRE_LENGTH_DELIMITED)
+        _write_varint(message, len(record))
+        message += record
+    return KPL_MAGIC + bytes(message) + hashlib.md5(message).digest()
@@ -0,0 +1,36 @@
+"""
+AGESIC Data Lake PoC - Opciones del writer Parquet de las tablas F5
+
+Bloom filters por row group en las columnas de búsqueda puntual (IP cliente,
+JSESSIONID, recurso), con la sintaxis por columna de parquet-mr
+('propiedad#columna'). Cualquier job que reescriba estos Parquet debe usar las
+mismas opciones, o la reescritura pierde los bloom filters.
+
+Usado por:
+- ETL multiformato: f5-logs/ (layout 'f5_logs', nombres del esquema AVRO)
+- ETL legacy: <solution>/ del bucket procesado (layout 'legacy')
+- Compactación: reescritura de ambas rutas
+"""
+
+from typing import Dict
+
+# Valores distintos esperados por columna y archivo (dimensiona el bloom filter)
+BLOOM_FILTER_NDV = 200000
+
+# Columnas con bloom filter por layout
+BLOOM_FILTER_COLUMNS = {
+    'f5_logs': ('ip_cliente_externo', 'campo_reservado_1', 'recurso'),
+    'legacy': ('ip_cliente_externo', 'jsession_id', 'request'),
+}
+
+# Presupuesto de filas por archivo (~128-256 MB con el esquema F5)
+DEFAULT_MAX_RECORDS_PER_FILE = 1000000
+
+
+def parquet_write_options(layout: str) -> Dict[str, str]:
+    """Opciones del writer Parquet para el layout ('f5_logs' o 'legacy')"""
+    options = {}
+    for column in BLOOM_FILTER_COLUMNS[layout]:
+        options[f"parquet.bloom.filter.enabled#{column}"] = "true"
+        options[f"parquet.bloom.filter.expected.ndv#{column}"] = str(BLOOM_FILTER_NDV)
+    return options
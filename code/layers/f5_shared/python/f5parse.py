@@ -0,0 +1,336 @@
+"""
+AGESIC Data Lake PoC - Parser compartido de logs de acceso F5
+
+Módulo único usado por todas las etapas del pipeline:
+- Lambda de filtrado (code/lambda/log_filter) vía Lambda Layer
+- Jobs Glue (etl_f5_multiformat.py, etl_f5_to_parquet.py) vía --extra-py-files
+- F5 Bridge en EC2 (assets/ec2-stack/scripts/f5_log_processor.py)
+- Pruebas locales (test_regex/)
+
+El formato F5 es fijo, por lo que existe un camino rápido sin regex que
+separa la línea por sus delimitadores de comillas y corchetes. Si la línea
+no encaja en ese layout se recurre a F5_LOG_PATTERN.
+
+Ambos caminos devuelven exactamente los mismos valores que los grupos de la
+regex (strings crudos, con comillas en usuario_autenticado/identidad/
+campo_reservado_2), por lo que la limpieza y conversión de tipos sigue en
+cada consumidor.
+
+parse_batch() ofrece la variante columnar: parsea un lote de líneas a un
+pyarrow.RecordBatch tipado sin crear un dict por línea. pyarrow es opcional
+(incluido en Glue 5.0) y solo se importa al usar la API de lotes.
+
+spark_split() es el equivalente de split_line() como expresión nativa de
+Spark (Catalyst), para parsear en la JVM sin pasar por workers Python.
+
+match_line() hace un único match de F5_LOG_PATTERN que se reutiliza:
+triage_fields() lee de él solo status, tamaño, tiempo, content_type,
+virtualserver, pool y BIG-IP para descartar líneas sanas, y match_fields()
+arma el dict completo de las demás sin volver a aplicar la regex.
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+# Nombres de campos en orden de aparición (esquema usado por Lambda y ETL legacy)
+FIELD_NAMES = (
+    'timestamp_syslog',
+    'hostname',
+    'ip_cliente_externo',
+    'ip_backend_interno',
+    'usuario_autenticado',
+    'identidad',
+    'timestamp_rp',
+    'metodo',
+    'request',
+    'protocolo',
+    'codigo_respuesta',
+    'tamano_respuesta',
+    'referer',
+    'user_agent',
+    'tiempo_respuesta_ms',
+    'edad_cache',
+    'content_type',
+    'jsession_id',
+    'campo_reservado_2',
+    'f5_virtualserver',
+    'f5_pool',
+    'f5_bigip_name',
+)
+
+# Mismos campos con los nombres del esquema AVRO (espec_portales.avro / ETL multiformato)
+AVRO_FIELD_NAMES = (
+    'timestamp_syslog',
+    'hostname',
+    'ip_cliente_externo',
+    'ip_red_interna',
+    'usuario_autenticado',
+    'identidad',
+    'timestamp_apache',
+    'metodo',
+    'recurso',
+    'protocolo',
+    'codigo_respuesta',
+    'tamano_respuesta',
+    'referer',
+    'user_agent',
+    'tiempo_respuesta_ms',
+    'edad_cache',
+    'content_type',
+    'campo_reservado_1',
+    'campo_reservado_2',
+    'ambiente_origen',
+    'ambiente_pool',
+    'entorno_nodo',
+)
+
+# Tipos de columna de parse_batch por posición de campo (el resto son string)
+_INT32_FIELDS = frozenset([10])             # codigo_respuesta
+_INT64_FIELDS = frozenset([11, 14])         # tamano_respuesta, tiempo_respuesta_ms
+_DICTIONARY_FIELDS = frozenset([19, 20, 21])  # virtualserver, pool, bigip (baja cardinalidad)
+
+# Columna booleana de parse_batch que indica si la línea coincidió con el formato F5
+VALID_COLUMN = 'is_valid'
+
+_NULL_ROW = (None,) * len(FIELD_NAMES)
+
+# Regex canónica (fallback). Acepta uno o más espacios entre mes, día y hora
+# ("Aug  8" y "Aug 18"), que era la diferencia entre las copias anteriores.
+F5_LOG_PATTERN = re.compile(
+    r'(?P<timestamp_syslog>\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}) '
+    r'(?P<hostname>[^\s]+) '
+    r'(?P<ip_cliente_externo>[^\s]+) '
+    r'\[(?P<ip_backend_interno>[^\]]+)\] '
+    r'(?P<usuario_autenticado>-|"[^"]*") '
+    r'(?P<identidad>"[^"]*") '
+    r'\[(?P<timestamp_rp>[^\]]+)\] '
+    r'"(?P<metodo>\w+) (?P<request>[^"]+) (?P<protocolo>HTTP/\d\.\d)" '
+    r'(?P<codigo_respuesta>\d+) '
+    r'(?P<tamano_respuesta>\d+) '
+    r'"(?P<referer>[^"]*)" '
+    r'"(?P<user_agent>[^"]*)" '
+    r'Time (?P<tiempo_respuesta_ms>\d+) '
+    r'Age "(?P<edad_cache>[^"]*)" '
+    r'"(?P<content_type>[^"]*)" '
+    r'"(?P<jsession_id>[^"]*)" '
+    r'(?P<campo_reservado_2>-|"[^"]*") '
+    r'"(?P<f5_virtualserver>[^"]*)" '
+    r'"(?P<f5_pool>[^"]*)" '
+    r'(?P<f5_bigip_name>\w+)'
+)
+
+# Versión Java de la regex para Spark: sin grupos con nombre (Java no admite
+# '_' en los nombres) y anclada al inicio como re.match
+SPARK_LOG_PATTERN = '^' + re.sub(r'\(\?P<\w+>', '(', F5_LOG_PATTERN.pattern)
+
+# Campos de triage_fields, en orden de aparición en la línea
+TRIAGE_FIELD_NAMES = (
+    'codigo_respuesta', 'tamano_respuesta', 'tiempo_respuesta_ms',
+    'content_type', 'f5_virtualserver', 'f5_pool', 'f5_bigip_name'
+)
+
+# Números de grupo de TRIAGE_FIELD_NAMES en F5_LOG_PATTERN (match.group(*TRIAGE_GROUPS))
+TRIAGE_GROUPS = tuple(FIELD_NAMES.index(name) + 1 for name in TRIAGE_FIELD_NAMES)
+
+# Separador interno de spark_split (carácter de control que no aparece en logs F5)
+_SPARK_SEPARATOR = '\x01'
+
+# Longitud a partir de la cual el camino por delimitadores es más barato que
+# la regex en CPython 3.11 (medido: ~800 bytes regex 2.7us vs split 4.9us;
+# ~10 KB regex 17us vs split 14us). Las líneas F5 con referer/cookies largos
+# superan este umbral; las típicas van directo a la regex compilada.
+FAST_PATH_MIN_LENGTH = 4096
+
+
+def _split_fast(line: str) -> Optional[Tuple[str, ...]]:
+    """
+    Camino rápido: separa la línea por comillas y valida el layout fijo F5.
+
+    Solo cubre el layout habitual (usuario_autenticado y campo_reservado_2 en
+    '-', timestamp syslog canónico 'Mmm dd HH:MM:SS'); ante cualquier
+    desviación devuelve None y split_line recurre a la regex. Las validaciones
+    se agrupan en pocas operaciones de str para acotar el costo por línea.
+    """
+    parts = line.split('"')
+    if len(parts) != 19:
+        return None
+    (head, identidad, rp_segment, request_line, numbers, referer, sep1, user_agent,
+     timing, edad_cache, sep2, content_type, sep3, jsession_id, reservado_sep,
+     virtualserver, sep4, pool, tail) = parts
+
+    # Separadores fijos entre campos entre comillas
+    if (sep1 + sep2 + sep3 + sep4 != '    ' or reservado_sep != ' - '
+            or head[-4:] != '] - ' or rp_segment[:2] != ' [' or rp_segment[-2:] != '] '
+            or numbers[:1] != ' ' or numbers[-1:] != ' '
+            or timing[:6] != ' Time ' or timing[-5:] != ' Age ' or tail[:1] != ' '):
+        return None
+
+    # 'Mmm dd HH:MM:SS host ip [backend] - '
+    timestamp_syslog = head[:15]
+    if (head[15:16] != ' ' or timestamp_syslog[3] != ' ' or timestamp_syslog[6] != ' '
+            or timestamp_syslog[9] != ':' or timestamp_syslog[12] != ':'):
+        return None
+    bracket = head.find(' [', 15)
+    host_ip = head[16:bracket]
+    hostname, _, ip_cliente = host_ip.partition(' ')
+    backend = head[bracket + 2:-4]
+    timestamp_rp = rp_segment[2:-2]
+
+    metodo, _, rest = request_line.partition(' ')
+    request, _, protocolo = rest.rpartition(' ')
+    codigo, _, tamano = numbers[1:-1].partition(' ')
+    tiempo = timing[6:-5]
+    bigip = tail[1:]
+
+    # Una sola comprobación por clase de caracteres: dígitos (\d) y palabras (\w)
+    digits = (timestamp_syslog[4].replace(' ', '0') + timestamp_syslog[5] + timestamp_syslog[7:9]
+              + timestamp_syslog[10:12] + timestamp_syslog[13:15] + protocolo[5:6] + protocolo[7:]
+              + codigo + tamano + tiempo)
+    words = timestamp_syslog[:3] + metodo + bigip
+    if not (codigo and tamano and tiempo and metodo and bigip and request
+            and hostname and ip_cliente and bracket > 15
+            and digits.isdigit() and digits.isascii()
+            and words.isascii() and words.replace('_', 'a').isalnum()
+            and len(protocolo) == 8 and protocolo[:5] == 'HTTP/' and protocolo[6] == '.'
+            and ' ' not in ip_cliente and host_ip.isprintable()
+            and backend and ']' not in backend
+            and timestamp_rp and ']' not in timestamp_rp):
+        return None
+
+    return (
+        timestamp_syslog, hostname, ip_cliente, backend, '-', '"' + identidad + '"',
+        timestamp_rp, metodo, request, protocolo, codigo, tamano, referer, user_agent,
+        tiempo, edad_cache, content_type, jsession_id, '-', virtualserver, pool, bigip,
+    )
+
+
+def split_line(line: str) -> Optional[Tuple[str, ...]]:
+    """
+    Separa una línea F5 en sus 22 campos (en el orden de FIELD_NAMES).
+
+    Las líneas de al menos FAST_PATH_MIN_LENGTH caracteres pasan primero por
+    el camino rápido; el resto (y las que no encajan) usan la regex compilada.
+    Devuelve None si la línea no es formato F5.
+    """
+    if not line:
+        return None
+    if len(line) >= FAST_PATH_MIN_LENGTH:
+        fields = _split_fast(line)
+        if fields is not None:
+            return fields
+    match = F5_LOG_PATTERN.match(line)
+    if match:
+        return match.groups()
+    return None
+
+
+def match_line(line: str) -> Optional[re.Match]:
+    """
+    Único match de F5_LOG_PATTERN para triage_fields() y match_fields(), o
+    None si la línea no es formato F5 (las mismas líneas que rechaza
+    split_line). Va siempre por la regex, sin el camino rápido.
+    """
+    return F5_LOG_PATTERN.match(line)
+
+
+def triage_fields(match: re.Match) -> Tuple[str, str, str, str, str, str, str]:
+    """
+    (codigo_respuesta, tamano_respuesta, tiempo_respuesta_ms, content_type,
+    f5_virtualserver, f5_pool, f5_bigip_name) de un match de match_line(),
+    sin armar el dict ni los demás campos. Pensado para descartar líneas
+    sanas antes del parseo completo (Lambda de filtrado).
+    """
+    return match.group(*TRIAGE_GROUPS)
+
+
+def match_fields(match: re.Match, field_names: Sequence[str] = FIELD_NAMES) -> Dict[str, str]:
+    """Dict campo -> valor crudo del match (lo mismo que parse_line para esa línea)"""
+    return dict(zip(field_names, match.groups()))
+
+
+def parse_line(line: str, field_names: Sequence[str] = FIELD_NAMES) -> Optional[Dict[str, str]]:
+    """
+    Parsea una línea F5 y devuelve un dict campo -> valor crudo (str).
+
+    Equivalente a F5_LOG_PATTERN.match(line).groupdict(). Usar
+    field_names=AVRO_FIELD_NAMES para obtener los nombres del esquema AVRO.
+    """
+    fields = split_line(line)
+    if fields is None:
+        return None
+    return dict(zip(field_names, fields))
+
+
+def batch_schema(field_names: Sequence[str] = FIELD_NAMES):
+    """Esquema Arrow de los lotes devueltos por parse_batch"""
+    import pyarrow as pa
+
+    fields = []
+    for index, name in enumerate(field_names):
+        if index in _INT32_FIELDS:
+            arrow_type = pa.int32()
+        elif index in _INT64_FIELDS:
+            arrow_type = pa.int64()
+        elif index in _DICTIONARY_FIELDS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    fields.append(pa.field(VALID_COLUMN, pa.bool_(), nullable=False))
+    return pa.schema(fields)
+
+
+def parse_batch(lines: Iterable[str], field_names: Sequence[str] = FIELD_NAMES):
+    """
+    Parsea un lote de líneas F5 a un pyarrow.RecordBatch columnar.
+
+    - codigo_respuesta como int32, tamano_respuesta y tiempo_respuesta_ms como int64
+      (conversión vectorizada de Arrow, sin int() por línea)
+    - virtualserver/pool/bigip con dictionary encoding
+    - Las líneas que no coinciden quedan como nulls en todas las columnas
+      (bitmap de validez de Arrow) y con is_valid=False; el orden y la
+      cantidad de filas se preservan
+
+    Las columnas numéricas sin nulls se pueden pasar a NumPy sin copia
+    (batch.column(i).to_numpy()).
+    """
+    import pyarrow as pa
+
+    schema = batch_schema(field_names)
+    rows = [split_line(line) for line in lines]
+    valid = [row is not None for row in rows]
+    if not rows:
+        return pa.RecordBatch.from_arrays([pa.array([], type=field.type) for field in schema], schema=schema)
+
+    # Transponer filas a columnas en C (zip) en lugar de construir dicts
+    columns = zip(*[row if row is not None else _NULL_ROW for row in rows])
+
+    arrays = []
+    for index, values in enumerate(columns):
+        array = pa.array(values, type=pa.string())
+        if index in _DICTIONARY_FIELDS:
+            array = array.dictionary_encode()
+        elif index in _INT32_FIELDS or index in _INT64_FIELDS:
+            array = array.cast(schema.field(index).type)
+        arrays.append(array)
+    arrays.append(pa.array(valid, type=pa.bool_()))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def spark_split(log_col):
+    """
+    Expresión Spark array<string> con los 22 campos crudos (orden de FIELD_NAMES).
+
+    Una sola evaluación de la regex por fila: regexp_replace reescribe la
+    línea como los 22 grupos unidos por un separador de control y split la
+    convierte en array. Devuelve null si la línea no es formato F5 (o contiene
+    el separador). Acceder a cada campo con element_at/getItem.
+    """
+    from pyspark.sql import functions as F
+
+    replacement = _SPARK_SEPARATOR.join(f'${index}' for index in range(1, len(FIELD_NAMES) + 1))
+    fields = F.split(F.regexp_replace(log_col, f'(?s){SPARK_LOG_PATTERN}.*', replacement), _SPARK_SEPARATOR)
+    return F.when(
+        ~log_col.contains(_SPARK_SEPARATOR) & (F.size(fields) == len(FIELD_NAMES)),
+        fields
+    )
@@ -0,0 +1,77 @@
+"""
+AGESIC Data Lake PoC - Esquema de la tabla f5_logs (f5-logs/)
+
+GENERADO por scripts/generate_f5_schema.py desde f5-logs-table-schema.yaml - no editar a mano.
+
+COLUMNS y PARTITION_KEYS siguen el orden de la tabla; spark_schema() arma el
+StructType con el que etl_f5_multiformat.py escribe el Parquet (claves de
+partición al final, como int). pyspark solo se importa al llamar a spark_schema().
+"""
+
+TABLE_NAME = 'f5_logs'
+
+# (nombre, tipo) de las columnas de datos
+COLUMNS = (
+    ('timestamp_syslog', 'string'),
+    ('hostname', 'string'),
+    ('ip_cliente_externo', 'string'),
+    ('ip_red_interna', 'string'),
+    ('usuario_autenticado', 'string'),
+    ('identidad', 'string'),
+    ('timestamp_apache', 'string'),
+    ('metodo', 'string'),
+    ('recurso', 'string'),
+    ('protocolo', 'string'),
+    ('codigo_respuesta', 'int'),
+    ('tamano_respuesta', 'int'),
+    ('referer', 'string'),
+    ('user_agent', 'string'),
+    ('tiempo_respuesta_ms', 'int'),
+    ('edad_cache', 'string'),
+    ('content_type', 'string'),
+    ('campo_reservado_1', 'string'),
+    ('campo_reservado_2', 'string'),
+    ('ambiente_origen', 'string'),
+    ('ambiente_pool', 'string'),
+    ('entorno_nodo', 'string'),
+    ('parsed_timestamp_syslog', 'string'),
+    ('parsed_timestamp_apache', 'string'),
+    ('is_error', 'boolean'),
+    ('status_category', 'string'),
+    ('is_slow', 'boolean'),
+    ('response_time_category', 'string'),
+    ('is_mobile', 'boolean'),
+    ('content_category', 'string'),
+    ('cache_hit', 'boolean'),
+    ('processing_timestamp', 'string'),
+    ('etl_version', 'string'),
+    ('source_object', 'string'),
+)
+
+# (nombre, tipo en Spark) de las claves de partición
+PARTITION_KEYS = (
+    ('year', 'int'),
+    ('month', 'int'),
+    ('day', 'int'),
+    ('hour', 'int'),
+)
+
+# Tipo Hive/Athena -> clase de pyspark.sql.types
+SPARK_TYPES = {
+    'string': 'StringType',
+    'int': 'IntegerType',
+    'bigint': 'LongType',
+    'double': 'DoubleType',
+    'boolean': 'BooleanType',
+    'timestamp': 'TimestampType',
+}
+
+
+def spark_schema():
+    """StructType de Spark con COLUMNS + PARTITION_KEYS (todas nullable)"""
+    from pyspark.sql import types as T
+
+    return T.StructType([
+        T.StructField(name, getattr(T, SPARK_TYPES[column_type])(), True)
+        for name, column_type in COLUMNS + PARTITION_KEYS
+    ])
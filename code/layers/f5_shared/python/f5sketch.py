@@ -0,0 +1,164 @@
+"""
+AGESIC Data Lake PoC - Sketch de latencia mergeable (estilo DDSketch)
+
+Histograma logarítmico con error relativo acotado: el bucket i cubre
+(GAMMA^(i-1), GAMMA^i] ms y se reporta con el valor 2*GAMMA^i/(GAMMA+1), a
+menos de RELATIVE_ACCURACY (1%) de cualquier valor del bucket. Las
+latencias <= 1 ms van al bucket 0.
+
+A diferencia de ordenar la lista completa o de PERCENTILE_APPROX, dos
+sketches se combinan sumando los conteos por bucket, por lo que un p99 de un
+día sale de mergear 24 sketches horarios (o los de varias invocaciones
+Lambda) sin volver a leer las filas.
+
+Usado por:
+- Lambda de filtrado: P95 por pool y distribución de latencia a CloudWatch
+- ETL multiformato: columna binaria latency_sketch de los rollups (misma
+  indexación que latency_buckets, ver bucket_index)
+
+Formato binario (to_bytes): versión (1 byte), RELATIVE_ACCURACY (float64),
+suma (float64), máximo (float64), cantidad de buckets (varint) y por bucket
+el delta del índice respecto del anterior y su conteo (varints).
+"""
+
+import math
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<Bddd')
+
+
+def bucket_index(value: float) -> int:
+    """Índice de bucket de una latencia en ms (0 para valores <= 1)"""
+    if value <= 1:
+        return 0
+    return int(math.ceil(math.log(value) / _LOG_GAMMA))
+
+
+def bucket_value(index: int) -> float:
+    """Valor representativo del bucket (error relativo <= RELATIVE_ACCURACY)"""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+
+class LatencySketch:
+    """Sketch de latencias en ms: add, merge, quantile y serialización a bytes"""
+
+    __slots__ = ('buckets', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value: float, count: int = 1):
+        index = bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        if value > self.max:
+            self.max = float(value)
+
+    def merge(self, other: 'LatencySketch') -> 'LatencySketch':
+        """Suma los conteos de other en este sketch (devuelve self)"""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Valor del cuantil q (0-1): primer bucket cuyo acumulado alcanza q*count.
+        None si el sketch está vacío
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index in sorted(self.buckets):
+            cumulative += self.buckets[index]
+            if cumulative >= rank:
+                return min(bucket_value(index), self.max) if index else bucket_value(index)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_values_counts(self) -> Tuple[List[float], List[int]]:
+        """Valores representativos y conteos (formato Values/Counts de CloudWatch)"""
+        indexes = sorted(self.buckets)
+        return [bucket_value(index) for index in indexes], [self.buckets[index] for index in indexes]
+
+    def to_bytes(self) -> bytes:
+        out = bytearray(_HEADER.pack(_FORMAT_VERSION, RELATIVE_ACCURACY, self.sum, self.max))
+        _write_varint(out, len(self.buckets))
+        previous = 0
+        for index in sorted(self.buckets):
+            _write_varint(out, index - previous)
+            _write_varint(out, self.buckets[index])
+            previous = index
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'LatencySketch':
+        version, relative_accuracy, total, maximum = _HEADER.unpack_from(data, 0)
+        if version != _FORMAT_VERSION or relative_accuracy != RELATIVE_ACCURACY:
+            raise ValueError(f"Sketch incompatible: versión {version}, precisión {relative_accuracy}")
+        sketch = cls()
+        size, offset = _read_varint(data, _HEADER.size)
+        index = 0
+        for _ in range(size):
+            delta, offset = _read_varint(data, offset)
+            count, offset = _read_varint(data, offset)
+            index += delta
+            sketch.buckets[index] = count
+            sketch.count += count
+        sketch.sum = total
+        sketch.max = maximum
+        return sketch
+
+    @classmethod
+    def from_buckets(cls, buckets: Dict[int, int], total: float = 0.0, maximum: float = 0.0) -> 'LatencySketch':
+        """Sketch a partir de un histograma bucket -> conteo (p. ej. latency_buckets de los rollups)"""
+        sketch = cls()
+        for index, count in buckets.items():
+            sketch.buckets[int(index)] = sketch.buckets.get(int(index), 0) + int(count)
+            sketch.count += int(count)
+        sketch.sum = float(total or 0)
+        sketch.max = float(maximum or 0)
+        return sketch
+
+
+def merge_all(sketches: Iterable[LatencySketch]) -> LatencySketch:
+    """Merge de varios sketches en uno nuevo"""
+    merged = LatencySketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+AGESIC Data Lake PoC - Generador de esquema F5 (tablas f5_logs y rollups)
+
+Genera desde los YAML de assets/analytics-stack/schemas/:
+1. <tabla>.sql: DDL de Athena (Parquet SerDe + partition projection) para
+   f5_logs, f5_rollup_minute y f5_rollup_hour
+2. code/layers/f5_shared/python/f5schema.py: columnas y StructType de Spark
+   usados por etl_f5_multiformat.py para escribir f5-logs/
+
+Así la tabla y los archivos Parquet comparten nombres y tipos: Athena usa el
+lector columnar con column pruning en lugar de un esquema inferido por crawler.
+
+Usage:
+    python scripts/generate_f5_schema.py          # regenerar archivos
+    python scripts/generate_f5_schema.py --check  # fallar si están desactualizados
+"""
+
+import argparse
+import os
+import sys
+
+import yaml
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCHEMAS_DIR = os.path.join(ROOT_DIR, 'assets', 'analytics-stack', 'schemas')
+SCHEMA_PATH = os.path.join(SCHEMAS_DIR, 'f5-logs-table-schema.yaml')
+MODULE_PATH = os.path.join(ROOT_DIR, 'code', 'layers', 'f5_shared', 'python', 'f5schema.py')
+
+# YAML de tabla -> DDL generado (SCHEMA_PATH además genera MODULE_PATH)
+TABLE_SCHEMAS = {
+    SCHEMA_PATH: os.path.join(SCHEMAS_DIR, 'f5-logs-table.sql'),
+    os.path.join(SCHEMAS_DIR, 'f5-rollup-minute-table-schema.yaml'): os.path.join(SCHEMAS_DIR, 'f5-rollup-minute-table.sql'),
+    os.path.join(SCHEMAS_DIR, 'f5-rollup-hour-table-schema.yaml'): os.path.join(SCHEMAS_DIR, 'f5-rollup-hour-table.sql'),
+}
+
+# Tipos Hive/Athena -> clase de pyspark.sql.types
+SPARK_TYPES = {
+    'string': 'StringType',
+    'int': 'IntegerType',
+    'bigint': 'LongType',
+    'double': 'DoubleType',
+    'boolean': 'BooleanType',
+    'timestamp': 'TimestampType',
+}
+
+
+def generated_notice(schema_path):
+    return f'GENERADO por scripts/generate_f5_schema.py desde {os.path.basename(schema_path)} - no editar a mano'
+
+
+def load_table_schema(path=SCHEMA_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def table_parameters(schema):
+    """TBLPROPERTIES de la tabla: parámetros del YAML + partition projection"""
+    parameters = dict(schema.get('parameters', {}))
+    parameters['projection.enabled'] = 'true'
+    for key, projection in schema['partition_projection'].items():
+        if key == 'location_template':
+            parameters['storage.location.template'] = projection
+            continue
+        for setting, value in projection.items():
+            parameters[f'projection.{key}.{setting}'] = str(value)
+    return parameters
+
+
+def sql_string(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def render_ddl(schema, schema_path=SCHEMA_PATH):
+    """CREATE EXTERNAL TABLE de Athena con placeholders de base de datos y bucket"""
+    def column_lines(columns):
+        return ',\n'.join(
+            f"  `{column['name']}` {column['type']} COMMENT {sql_string(column.get('comment', ''))}"
+            for column in columns
+        )
+
+    storage = schema['storage_descriptor']
+    properties = ',\n'.join(
+        f'  {sql_string(key)}={sql_string(value)}' for key, value in table_parameters(schema).items()
+    )
+    return (
+        f"-- {generated_notice(schema_path)}\n"
+        f"CREATE EXTERNAL TABLE IF NOT EXISTS `DATABASE_NAME_PLACEHOLDER`.`{schema['table']['name']}` (\n"
+        f"{column_lines(schema['columns'])}\n"
+        f")\n"
+        f"COMMENT {sql_string(schema['table']['description'])}\n"
+        f"PARTITIONED BY (\n"
+        f"{column_lines(schema['partition_keys'])}\n"
+        f")\n"
+        f"ROW FORMAT SERDE {sql_string(storage['serde_info']['serialization_library'])}\n"
+        f"STORED AS INPUTFORMAT {sql_string(storage['input_format'])}\n"
+        f"OUTPUTFORMAT {sql_string(storage['output_format'])}\n"
+        f"LOCATION {sql_string(storage['location'])}\n"
+        f"TBLPROPERTIES (\n"
+        f"{properties}\n"
+        f");\n"
+    )
+
+
+def render_spark_module(schema):
+    """Módulo Python con las columnas de f5_logs y su StructType (import lazy de pyspark)"""
+    for column in schema['columns'] + schema['partition_keys']:
+        spark_type = column.get('spark_type', column['type'])
+        if spark_type not in SPARK_TYPES:
+            raise ValueError(f"Tipo no soportado para {column['name']}: {spark_type}")
+
+    def tuple_lines(columns):
+        return '\n'.join(
+            f"    ({column['name']!r}, {column.get('spark_type', column['type'])!r}),"
+            for column in columns
+        )
+
+    spark_types = '\n'.join(f'    {hive!r}: {spark!r},' for hive, spark in SPARK_TYPES.items())
+    return f'''"""
+AGESIC Data Lake PoC - Esquema de la tabla {schema['table']['name']} (f5-logs/)
+
+{generated_notice(SCHEMA_PATH)}.
+
+COLUMNS y PARTITION_KEYS siguen el orden de la tabla; spark_schema() arma el
+StructType con el que etl_f5_multiformat.py escribe el Parquet (claves de
+partición al final, como int). pyspark solo se importa al llamar a spark_schema().
+"""
+
+TABLE_NAME = {schema['table']['name']!r}
+
+# (nombre, tipo) de las columnas de datos
+COLUMNS = (
+{tuple_lines(schema['columns'])}
+)
+
+# (nombre, tipo en Spark) de las claves de partición
+PARTITION_KEYS = (
+{tuple_lines(schema['partition_keys'])}
+)
+
+# Tipo Hive/Athena -> clase de pyspark.sql.types
+SPARK_TYPES = {{
+{spark_types}
+}}
+
+
+def spark_schema():
+    """StructType de Spark con COLUMNS + PARTITION_KEYS (todas nullable)"""
+    from pyspark.sql import types as T
+
+    return T.StructType([
+        T.StructField(name, getattr(T, SPARK_TYPES[column_type])(), True)
+        for name, column_type in COLUMNS + PARTITION_KEYS
+    ])
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generar DDL de Athena y esquema Spark de las tablas F5 desde los YAML')
+    parser.add_argument('--check', action='store_true', help='Solo verificar que los archivos generados estén al día')
+    args = parser.parse_args()
+
+    outputs = {}
+    for schema_path, ddl_path in TABLE_SCHEMAS.items():
+        schema = load_table_schema(schema_path)
+        outputs[ddl_path] = render_ddl(schema, schema_path)
+    outputs[MODULE_PATH] = render_spark_module(load_table_schema())
+
+    stale = []
+    for path, content in outputs.items():
+        current = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                current = f.read()
+        if current == content:
+            continue
+        stale.append(os.path.relpath(path, ROOT_DIR))
+        if not args.check:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    if args.check and stale:
+        print(f"❌ Archivos desactualizados respecto al YAML: {', '.join(stale)}")
+        sys.exit(1)
+    print(f"✅ Esquemas F5: {len(TABLE_SCHEMAS)} tablas"
+          + (f" (regenerados: {', '.join(stale)})" if stale and not args.check else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ from aws_cdk import (
     aws_kinesis as kinesis,
     aws_ec2 as ec2,
     aws_logs as logs,
+    aws_sqs as sqs,
+    aws_ssm as ssm,
     Duration,
     RemovalPolicy,
     CfnOutput
@@ -77,6 +79,36 @@ class ComputeStack(Stack):
             )
         )
         
+        # Layer con el parser F5 compartido (f5parse)
+        self.f5_shared_layer = lambda_.LayerVersion(
+            self, "F5SharedLayer",
+            code=lambda_.Code.from_asset("code/layers/f5_shared"),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_11],
+            description="Parser F5 compartido (f5parse) para Lambda, Glue y EC2"
+        )
+        
+        # Tabla de umbrales (lento/grande) por pool, virtualserver y categoría
+        # de contenido. El valor inicial es el f5_thresholds.json empaquetado
+        # con la función; se puede editar el parámetro sin redesplegar
+        thresholds_path = os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "code",
+            "lambda",
+            "log_filter",
+            "f5_thresholds.json"
+        )
+        with open(thresholds_path, 'r') as f:
+            thresholds_value = f.read()
+        
+        self.log_filter_thresholds = ssm.StringParameter(
+            self, "F5LogFilterThresholds",
+            parameter_name=f"/{project_config['prefix']}/f5-log-filter/thresholds",
+            string_value=thresholds_value,
+            description="Umbrales de respuesta lenta/grande por pool, virtualserver y categoría de contenido"
+        )
+        self.log_filter_thresholds.grant_read(lambda_role)
+        
         # Función Lambda para filtrado de logs F5
         self.log_filter_lambda = lambda_.Function(
             self, "F5LogFilterFunction",
@@ -84,26 +116,53 @@ class ComputeStack(Stack):
             handler="lambda_function.lambda_handler",
             code=lambda_.Code.from_asset("code/lambda/log_filter"),
             role=lambda_role,
+            layers=[self.f5_shared_layer],
             vpc=vpc,
             security_groups=[lambda_sg],
             timeout=Duration.minutes(5),
             memory_size=512,
             environment={
                 "LOG_LEVEL": "INFO",
-                "ENABLE_F5_METRICS": "true",
-                "CUSTOM_NAMESPACE": f"{project_config['prefix']}/F5Analytics"
+                # "emf": métricas en Embedded Metric Format por stdout (sin
+                # PutMetricData); "true" usa la API, "false" las desactiva
+                "ENABLE_F5_METRICS": "emf",
+                "CUSTOM_NAMESPACE": "AGESIC/F5Logs",
+                # Umbrales por pool/virtualserver/categoría, releídos cada 5 min
+                "THRESHOLDS_PARAMETER": self.log_filter_thresholds.parameter_name,
+                "THRESHOLDS_TTL_SECONDS": "300",
+                # Líneas de error repetidas (pool, status, path normalizado,
+                # categoría) colapsadas en un evento por invocación
+                "ERROR_DEDUP_ENABLED": "true",
+                "ERROR_SAMPLE_LINES": "3"
             },
             description="Filtrado mejorado de logs F5 con métricas personalizadas de CloudWatch"
         )
         
-        # Agregar fuente de eventos Kinesis
+        # Destino de fallas: metadatos (shard y rango de secuencias) de los
+        # registros que agotan los reintentos, para reprocesarlos desde el stream
+        self.log_filter_failure_queue = sqs.Queue(
+            self, "F5LogFilterFailureQueue",
+            queue_name=f"{project_config['prefix']}-f5-log-filter-failures",
+            retention_period=Duration.days(14),
+            encryption=sqs.QueueEncryption.SQS_MANAGED
+        )
+        
+        # Agregar fuente de eventos Kinesis: la función devuelve
+        # batchItemFailures (primer registro fallido) y los lotes con error se
+        # dividen a la mitad antes de reintentar, aislando el registro problemático.
+        # Ventana tumbling de 60 s por shard: las métricas por pool viajan en el
+        # 'state' entre invocaciones y se publican una vez al cerrar la ventana
         self.log_filter_lambda.add_event_source(
             lambda_events.KinesisEventSource(
                 stream=kinesis_stream,
                 starting_position=lambda_.StartingPosition.LATEST,
                 batch_size=100,
                 max_batching_window=Duration.seconds(5),
-                retry_attempts=3
+                retry_attempts=3,
+                report_batch_item_failures=True,
+                bisect_batch_on_error=True,
+                on_failure=lambda_events.SqsDlq(self.log_filter_failure_queue),
+                tumbling_window=Duration.seconds(60)
             )
         )
         
@@ -120,6 +179,11 @@ class ComputeStack(Stack):
         raw_bucket.grant_read(glue_role)
         processed_bucket.grant_read_write(glue_role)
         
+        # Compactación: reescritura de objetos raw de Firehose y prefijo de trabajo
+        for key_pattern in (f"{project_config['solution']}/*", "_compaction/*"):
+            raw_bucket.grant_put(glue_role, key_pattern)
+            raw_bucket.grant_delete(glue_role, key_pattern)
+        
         glue_role.add_to_policy(
             iam.PolicyStatement(
                 effect=iam.Effect.ALLOW,
@@ -152,6 +216,18 @@ class ComputeStack(Stack):
             retain_on_delete=False
         )
         
+        # Desplegar parser F5 compartido para Glue (--extra-py-files)
+        f5_shared_deployment = s3deploy.BucketDeployment(
+            self, "F5SharedLibDeployment",
+            sources=[s3deploy.Source.asset("code/layers/f5_shared/python")],
+            destination_bucket=raw_bucket,
+            destination_key_prefix="libs/",
+            retain_on_delete=False
+        )
+        f5_shared_py_files = ",".join(
+            f"s3://{raw_bucket.bucket_name}/libs/{module}" for module in ("f5parse.py", "f5schema.py", "f5sketch.py", "f5parquet.py")
+        )
+        
         # Desplegar configuraciones de Kinesis Agent
         kinesis_configs_deployment = s3deploy.BucketDeployment(
             self, "KinesisConfigsDeployment",
@@ -176,11 +252,15 @@ class ComputeStack(Stack):
                 "--solution_name": project_config['solution'],
                 "--enable-metrics": "true",
                 "--custom-logStream-prefix": "f5-multiformat-processing",
+                "--processing_mode": "arrow",
+                "--max_records_per_file": "1000000",
                 "--custom-logGroup-prefix": f"{project_config['prefix']}-etl-multiformat",
                 "--conf": f"spark.hadoop.fs.s3a.endpoint.region={self.region}",
                 "--processed_bucket": processed_bucket.bucket_name,
                 "--raw_bucket": raw_bucket.bucket_name,
-                "--job-bookmark-option": "job-bookmark-disable",
+                "--extra-py-files": f5_shared_py_files,
+                # Incremental: solo objetos raw nuevos (bookmark del datasource)
+                "--job-bookmark-option": "job-bookmark-enable",
                 "--enable-spark-ui": "true",
                 "--spark-event-logs-path": f"s3://{processed_bucket.bucket_name}/spark-logs/",
                 "--enable-continuous-cloudwatch-log": "true"
@@ -211,10 +291,12 @@ class ComputeStack(Stack):
                 "--solution_name": project_config['solution'],
                 "--enable-metrics": "true",
                 "--custom-logStream-prefix": "f5-legacy-processing",
+                "--max_records_per_file": "1000000",
                 "--custom-logGroup-prefix": f"{project_config['prefix']}-etl-legacy",
                 "--conf": f"spark.hadoop.fs.s3a.endpoint.region={self.region}",
                 "--processed_bucket": processed_bucket.bucket_name,
                 "--raw_bucket": raw_bucket.bucket_name,
+                "--extra-py-files": f5_shared_py_files,
                 "--job-bookmark-option": "job-bookmark-enable"
             },
             description="ETL legacy para logs F5 - Respaldo del job multiformato",
@@ -228,6 +310,54 @@ class ComputeStack(Stack):
             )
         )
         
+        # Job de compactación de archivos pequeños (raw y procesado)
+        compaction_config = glue_config.get("glue_jobs", {}).get("f5_compaction", {})
+        compaction_arguments = {
+            "--solution_name": project_config['solution'],
+            "--enable-metrics": "true",
+            "--custom-logGroup-prefix": f"{project_config['prefix']}-compaction",
+            "--conf": f"spark.hadoop.fs.s3a.endpoint.region={self.region}",
+            "--processed_bucket": processed_bucket.bucket_name,
+            "--raw_bucket": raw_bucket.bucket_name,
+            "--extra-py-files": f5_shared_py_files,
+            # Las horas raw se compactan solo después de que ambos ETL (que leen
+            # el raw con bookmarks) las consumieron, y las procesadas solo sin
+            # ejecuciones de ETL en curso
+            "--etl_job_names": ",".join([self.f5_etl_job_multiformat.name, self.f5_etl_job_legacy.name]),
+            "--job-bookmark-option": "job-bookmark-disable"
+        }
+        compaction_arguments.update(compaction_config.get("default_arguments", {}))
+        self.f5_compaction_job = glue.CfnJob(
+            self, "F5CompactionJob",
+            name=f"{project_config['prefix']}-f5-compaction",
+            role=glue_role.role_arn,
+            command=glue.CfnJob.JobCommandProperty(
+                name="glueetl",
+                script_location=f"s3://{raw_bucket.bucket_name}/scripts/compact_f5_partitions.py",
+                python_version="3"
+            ),
+            default_arguments=compaction_arguments,
+            description="Compactación de particiones horarias F5 en archivos de tamaño objetivo",
+            glue_version=compaction_config.get("glue_version", "5.0"),
+            worker_type=compaction_config.get("worker_type", "G.1X"),
+            number_of_workers=compaction_config.get("number_of_workers", 2),
+            timeout=compaction_config.get("timeout", 120),
+            max_retries=compaction_config.get("max_retries", 0),
+            execution_property=glue.CfnJob.ExecutionPropertyProperty(
+                max_concurrent_runs=compaction_config.get("max_concurrent_runs", 1)
+            )
+        )
+        
+        glue.CfnTrigger(
+            self, "F5CompactionTrigger",
+            name=f"{project_config['prefix']}-f5-compaction-schedule",
+            type="SCHEDULED",
+            schedule=compaction_config.get("schedule", "cron(0 5 * * ? *)"),
+            start_on_creation=True,
+            actions=[glue.CfnTrigger.ActionProperty(job_name=self.f5_compaction_job.ref)],
+            description="Compactación diaria de particiones F5 cerradas"
+        )
+        
         # Configuración de crawlers desde assets
         crawlers_config = glue_config.get("crawlers", {})
         
@@ -258,40 +388,88 @@ class ComputeStack(Stack):
             description=raw_crawler_config.get("description", "Crawler para datos raw con soporte F5")
         )
         
-        # Crawler para datos procesados
-        processed_crawler_config = crawlers_config.get("processed_data", {})
-        self.processed_crawler = glue.CfnCrawler(
-            self, "ProcessedDataCrawler",
-            name=f"{project_config['prefix']}-processed-crawler",
-            role=glue_role.role_arn,
-            database_name=self.glue_database.ref,
-            targets=glue.CfnCrawler.TargetsProperty(
-                s3_targets=[
-                    glue.CfnCrawler.S3TargetProperty(
-                        path=f"s3://{processed_bucket.bucket_name}/f5-logs/"
-                    )
-                ]
-            ),
-            recrawl_policy=glue.CfnCrawler.RecrawlPolicyProperty(
-                recrawl_behavior=processed_crawler_config.get("recrawl_behavior", "CRAWL_NEW_FOLDERS_ONLY")
-            ),
-            schema_change_policy=glue.CfnCrawler.SchemaChangePolicyProperty(
-                update_behavior="LOG",  # Requerido para CRAWL_NEW_FOLDERS_ONLY
-                delete_behavior="LOG"   # Requerido para CRAWL_NEW_FOLDERS_ONLY
-            ),
-            schedule=glue.CfnCrawler.ScheduleProperty(
-                schedule_expression=processed_crawler_config.get("schedule", "cron(0 3 * * ? *)")
-            ),
-            description=processed_crawler_config.get("description", "Crawler para datos procesados F5 en formato Parquet")
+        # Tablas f5_logs y rollups definidas desde los esquemas de assets con
+        # partition projection: Athena calcula las particiones year/month/day/hour
+        # sin crawler ni consultas de metadatos, y los datos son visibles apenas
+        # el ETL escribe
+        schemas_dir = os.path.join(
+            os.path.dirname(__file__), 
+            "..", 
+            "assets", 
+            "analytics-stack", 
+            "schemas"
         )
         
+        def resolve_placeholders(value):
+            return value.replace("PROCESSED_BUCKET_PLACEHOLDER", processed_bucket.bucket_name)
+        
+        def glue_columns(columns):
+            return [
+                glue.CfnTable.ColumnProperty(
+                    name=column["name"], type=column["type"], comment=column.get("comment")
+                )
+                for column in columns
+            ]
+        
+        def projected_table(construct_id, schema_file):
+            with open(os.path.join(schemas_dir, schema_file), 'r') as f:
+                table_schema = yaml.safe_load(f)
+            
+            projection_parameters = {"projection.enabled": "true"}
+            for key, projection in table_schema["partition_projection"].items():
+                if key == "location_template":
+                    projection_parameters["storage.location.template"] = resolve_placeholders(projection)
+                    continue
+                for setting, value in projection.items():
+                    projection_parameters[f"projection.{key}.{setting}"] = str(value)
+            
+            storage_config = table_schema["storage_descriptor"]
+            return glue.CfnTable(
+                self, construct_id,
+                catalog_id=self.account,
+                database_name=self.glue_database.ref,
+                table_input=glue.CfnTable.TableInputProperty(
+                    name=table_schema["table"]["name"],
+                    description=table_schema["table"]["description"],
+                    table_type=table_schema["table"]["table_type"],
+                    parameters={**table_schema.get("parameters", {}), **projection_parameters},
+                    partition_keys=glue_columns(table_schema["partition_keys"]),
+                    storage_descriptor=glue.CfnTable.StorageDescriptorProperty(
+                        location=resolve_placeholders(storage_config["location"]),
+                        input_format=storage_config["input_format"],
+                        output_format=storage_config["output_format"],
+                        serde_info=glue.CfnTable.SerdeInfoProperty(
+                            serialization_library=storage_config["serde_info"]["serialization_library"]
+                        ),
+                        columns=glue_columns(table_schema["columns"])
+                    )
+                )
+            )
+        
+        self.f5_logs_table = projected_table("F5LogsTable", "f5-logs-table-schema.yaml")
+        # Rollups por minuto y por hora escritos por el ETL multiformato
+        self.f5_rollup_minute_table = projected_table("F5RollupMinuteTable", "f5-rollup-minute-table-schema.yaml")
+        self.f5_rollup_hour_table = projected_table("F5RollupHourTable", "f5-rollup-hour-table-schema.yaml")
+        
         # Salidas
+        CfnOutput(
+            self, "F5LogFilterFailureQueueUrl",
+            value=self.log_filter_failure_queue.queue_url,
+            description="Cola SQS con los lotes Kinesis que la Lambda de filtrado no pudo procesar"
+        )
+        
         CfnOutput(
             self, "GlueDatabaseName",
             value=self.glue_database.ref,
             description="Nombre de base de datos Glue para análisis F5"
         )
         
+        CfnOutput(
+            self, "F5LogsTableName",
+            value=self.f5_logs_table.ref,
+            description="Tabla f5_logs con partition projection (sin crawler)"
+        )
+        
         CfnOutput(
             self, "F5ETLJobMultiformatName",
             value=self.f5_etl_job_multiformat.name,
@@ -304,6 +482,12 @@ class ComputeStack(Stack):
             description="Nombre del job ETL Legacy F5 (Respaldo)"
         )
         
+        CfnOutput(
+            self, "F5CompactionJobName",
+            value=self.f5_compaction_job.ref,
+            description="Nombre del job de compactación de particiones F5"
+        )
+        
         CfnOutput(
             self, "ComputeAssetsLocation",
             value=f"s3://{raw_bucket.bucket_name}/scripts/",
@@ -103,7 +103,11 @@ class EC2StackEnhanced(Stack):
         # Deploy EC2 assets to S3 for easy access
         self.ec2_assets_deployment = s3deploy.BucketDeployment(
             self, "EC2AssetsDeployment",
-            sources=[s3deploy.Source.asset("assets/ec2-stack")],
+            sources=[
+                s3deploy.Source.asset("assets/ec2-stack"),
+                # Parser F5 compartido (queda en ec2-assets/f5parse.py)
+                s3deploy.Source.asset("code/layers/f5_shared/python")
+            ],
             destination_bucket=raw_bucket,
             destination_key_prefix="ec2-assets/",
             retain_on_delete=False
@@ -188,6 +192,7 @@ class EC2StackEnhanced(Stack):
             "",
             "# Descargar assets desde S3",
             f"aws s3 sync s3://{raw_bucket.bucket_name}/ec2-assets/scripts/ /opt/agesic-datalake/ --region us-east-2",
+            f"aws s3 cp s3://{raw_bucket.bucket_name}/ec2-assets/f5parse.py /opt/agesic-datalake/f5parse.py --region us-east-2",
             "chmod +x /opt/agesic-datalake/*.sh",
             "chmod +x /opt/agesic-datalake/*.py",
             "chown -R ec2-user:ec2-user /opt/agesic-datalake/",
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark local del arranque en frío de la Lambda de filtrado
+(code/lambda/log_filter/lambda_function_f5.py).
+
+Cada medición corre en un intérprete nuevo (como un entorno de ejecución
+recién creado) y reporta:
+- tiempo de import del módulo del handler y si cargó boto3/gzip/concurrent.futures
+- latencia de la primera invocación y promedio de las siguientes (warm) con un
+  evento Kinesis local armado desde sample_f5_logs.txt
+- carga de la tabla de umbrales desde SSM (GetParameter con stub + compilación),
+  que con THRESHOLDS_PARAMETER definido ocurre en el init del módulo
+- costo de import de boto3 + creación del cliente (si boto3 está instalado):
+  con THRESHOLDS_PARAMETER definido (como en el stack) lo paga el init junto
+  con los umbrales; sin él, la primera invocación que envía algo
+
+Los clientes AWS se reemplazan por un stub local que no hace llamadas de red,
+de modo que se mide solo el código de la función. No forma parte de pytest:
+
+    python3 benchmark_lambda_cold_start.py --lines 500 --error-ratio 0.05 --budget-ms 100
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(TEST_DIR, '..', 'code', 'lambda', 'log_filter')
+LAYER_DIR = os.path.join(TEST_DIR, '..', 'code', 'layers', 'f5_shared', 'python')
+SAMPLE_FILE = os.path.join(TEST_DIR, 'sample_f5_logs.txt')
+
+LAZY_MODULES = ('boto3', 'botocore', 'gzip', 'concurrent.futures')
+
+
+class StubClient:
+    """Cliente de CloudWatch/CloudWatch Logs sin red (respuestas vacías)"""
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+
+    class exceptions:
+        class ResourceAlreadyExistsException(Exception):
+            pass
+
+        class ResourceNotFoundException(Exception):
+            pass
+
+    def __getattr__(self, name):
+        return lambda **kwargs: self.responses.get(name, {})
+
+
+class StubContext:
+    def __init__(self, timeout_ms=300000):
+        self.deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+def build_event(lines, error_ratio, records=100):
+    """Evento Kinesis con `records` registros de texto plano (95% 2xx por defecto)"""
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        samples = [line.strip() for line in f if line.strip()]
+    rng = random.Random(42)
+    generated = []
+    for i in range(lines):
+        line = samples[i % len(samples)]
+        if rng.random() < error_ratio:
+            line = line.replace('" 200 ', f'" {rng.choice([404, 503])} ', 1)
+        generated.append(line)
+    per_record = max(1, len(generated) // records)
+    return {'Records': [
+        {'kinesis': {
+            'data': base64.b64encode('\n'.join(generated[start:start + per_record]).encode('utf-8')).decode('ascii'),
+            'sequenceNumber': str(49600000000000000000000000000000000000000000 + start),
+            'partitionKey': 'bench'
+        }}
+        for start in range(0, len(generated), per_record)
+    ]}
+
+
+def measure(args):
+    """Medición dentro del intérprete hijo: imprime un JSON con los tiempos"""
+    sys.path[:0] = [LAMBDA_DIR, LAYER_DIR]
+    start = time.perf_counter()
+    import lambda_function_f5 as handler_module
+    import_ms = (time.perf_counter() - start) * 1000
+    loaded_at_import = [name for name in LAZY_MODULES if name in sys.modules]
+
+    for service_name in ('logs', 'cloudwatch'):
+        handler_module._aws_clients[service_name] = StubClient()
+
+    # Umbrales desde SSM como en el init con THRESHOLDS_PARAMETER (sin red)
+    with open(handler_module.THRESHOLDS_FILE, 'r', encoding='utf-8') as f:
+        handler_module._aws_clients['ssm'] = StubClient({'get_parameter': {'Parameter': {'Value': f.read()}}})
+    handler_module.THRESHOLDS_PARAMETER = '/bench/f5-log-filter/thresholds'
+    handler_module._threshold_table = None
+    start = time.perf_counter()
+    handler_module.get_thresholds()
+    thresholds_ms = (time.perf_counter() - start) * 1000
+
+    event = build_event(args.lines, args.error_ratio)
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')  # EMF y prints del handler
+    try:
+        start = time.perf_counter()
+        response = handler_module.lambda_handler(event, StubContext())
+        first_ms = (time.perf_counter() - start) * 1000
+        warm = []
+        for _ in range(args.warm):
+            start = time.perf_counter()
+            handler_module.lambda_handler(event, StubContext())
+            warm.append((time.perf_counter() - start) * 1000)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    boto3_ms = None
+    try:
+        start = time.perf_counter()
+        import boto3
+        boto3.session.Session(region_name='us-east-1').client('logs')
+        boto3_ms = (time.perf_counter() - start) * 1000
+    except ImportError:
+        pass
+
+    print(json.dumps({
+        'import_ms': import_ms,
+        'loaded_at_import': loaded_at_import,
+        'thresholds_ms': thresholds_ms,
+        'first_invocation_ms': first_ms,
+        'warm_invocation_ms': sum(warm) / len(warm) if warm else None,
+        'boto3_client_ms': boto3_ms,
+        'failures': response['batchItemFailures']
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque en frío de la Lambda de filtrado F5')
+    parser.add_argument('--lines', type=int, default=500, help='Líneas F5 en el evento de prueba')
+    parser.add_argument('--error-ratio', type=float, default=0.05, help='Proporción de líneas 4xx/5xx')
+    parser.add_argument('--warm', type=int, default=5, help='Invocaciones warm después de la primera')
+    parser.add_argument('--runs', type=int, default=5, help='Intérpretes nuevos por modo de métricas')
+    parser.add_argument('--budget-ms', type=float, default=100.0, help='Presupuesto de import del handler (ms)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args)
+        return
+
+    over_budget = False
+    print(f"Python {sys.version.split()[0]} - evento de {args.lines} líneas ({args.error_ratio:.0%} errores), {args.runs} arranques por modo")
+    for mode in ('emf', 'api'):
+        env = dict(os.environ, ENABLE_F5_METRICS=mode, AWS_DEFAULT_REGION='us-east-1')
+        env.pop('THRESHOLDS_PARAMETER', None)  # el init no debe llamar a SSM real
+        results = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child',
+                 '--lines', str(args.lines), '--error-ratio', str(args.error_ratio), '--warm', str(args.warm)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+        def median(key):
+            values = sorted(result[key] for result in results if result[key] is not None)
+            return values[len(values) // 2] if values else None
+
+        import_ms = median('import_ms')
+        over_budget = over_budget or import_ms > args.budget_ms
+        boto3_ms = median('boto3_client_ms')
+        print(f"  ENABLE_F5_METRICS={mode}")
+        print(f"    import del handler     {import_ms:8.1f} ms (presupuesto {args.budget_ms:.0f} ms)"
+              f"  módulos diferidos cargados: {', '.join(results[0]['loaded_at_import']) or 'ninguno'}")
+        print(f"    umbrales SSM (init)    {median('thresholds_ms'):8.1f} ms (stub de GetParameter, sin latencia de red)")
+        print(f"    primera invocación     {median('first_invocation_ms'):8.1f} ms")
+        print(f"    invocación warm        {median('warm_invocation_ms'):8.1f} ms")
+        print(f"    boto3 + cliente        " + (f"{boto3_ms:8.1f} ms (en el init si THRESHOLDS_PARAMETER está definido)"
+                                                 if boto3_ms is not None else "     n/d (boto3 no instalado)"))
+        if results[0]['failures']:
+            print(f"    batchItemFailures: {results[0]['failures']}")
+
+    if over_budget:
+        print(f"❌ El import del handler supera el presupuesto de {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
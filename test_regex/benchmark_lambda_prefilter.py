@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark local del descarte rápido (f5parse.triage_fields) en
+process_f5_log_line de la Lambda de filtrado: líneas/s con el pre-filtro vs
+dict completo (match_fields) en cada línea, sobre una mezcla realista (~95% 2xx).
+
+Verifica además que ambos caminos devuelvan las mismas líneas de error y las
+mismas métricas por pool. No forma parte de pytest:
+
+    python3 benchmark_lambda_prefilter.py --lines 200000 --healthy-ratio 0.95
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [
+    os.path.join(TEST_DIR, '..', 'code', 'lambda', 'log_filter'),
+    os.path.join(TEST_DIR, '..', 'code', 'layers', 'f5_shared', 'python'),
+]
+SAMPLE_FILE = os.path.join(TEST_DIR, 'sample_f5_logs.txt')
+TIME_PATTERN = re.compile(r'Time \d+ ')
+
+
+def generate_lines(count, healthy_ratio):
+    """Mezcla de líneas F5: healthy_ratio 2xx/3xx bajo el menor umbral de f5_thresholds.json, el resto 4xx/5xx o lentas"""
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        samples = [line.strip() for line in f if line.strip()]
+    rng = random.Random(42)
+    lines = []
+    for i in range(count):
+        line = samples[i % len(samples)]
+        if rng.random() < healthy_ratio:
+            status, elapsed = rng.choice([200, 200, 200, 204, 301, 304]), rng.randint(1, 900)
+        elif rng.random() < 0.7:
+            status, elapsed = rng.choice([404, 500, 503]), rng.randint(1, 4000)
+        else:
+            status, elapsed = 200, rng.randint(5001, 30000)
+        line = TIME_PATTERN.sub(f'Time {elapsed} ', line.replace('" 200 ', f'" {status} ', 1), count=1)
+        lines.append(line)
+    return lines
+
+
+def run(module, lines):
+    pool_metrics = module.PoolMetricsAggregator()
+    start = time.perf_counter()
+    error_logs = [error_log for error_log in (module.process_f5_log_line(line, pool_metrics) for line in lines) if error_log]
+    return time.perf_counter() - start, error_logs, pool_metrics
+
+
+def comparable(error_logs, pool_metrics):
+    """Resultado sin el timestamp de procesamiento, para comparar ambos caminos"""
+    logs = [{key: value for key, value in error_log.items() if key != 'timestamp'} for error_log in error_logs]
+    pools = {
+        key: (stats['total_requests'], stats['error_requests'], stats['slow_requests'], stats['latency'].buckets)
+        for key, stats in pool_metrics.pools.items()
+    }
+    return logs, pools
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del pre-filtro de líneas sanas en la Lambda de filtrado')
+    parser.add_argument('--lines', type=int, default=200000, help='Líneas F5 generadas')
+    parser.add_argument('--healthy-ratio', type=float, default=0.95, help='Proporción de líneas sanas')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones (se reporta la mejor)')
+    args = parser.parse_args()
+
+    import lambda_function_f5 as module
+
+    lines = generate_lines(args.lines, args.healthy_ratio)
+    triage_fields = module.triage_fields
+    results = {}
+    for label, triage in (("parseo completo", lambda match: None), ("pre-filtro", triage_fields)):
+        module.triage_fields = triage
+        runs = [run(module, lines) for _ in range(args.repeat)]
+        elapsed = min(seconds for seconds, _, _ in runs)
+        results[label] = (elapsed, comparable(runs[0][1], runs[0][2]))
+        print(f"  {label:<16} {len(lines) / elapsed:12,.0f} líneas/s  ({elapsed:.2f}s, {len(runs[0][1])} líneas de error)")
+    module.triage_fields = triage_fields
+
+    (full_elapsed, full_result), (fast_elapsed, fast_result) = results.values()
+    assert full_result == fast_result, "el pre-filtro cambió las líneas de error o las métricas"
+    print(f"✅ Mismas líneas de error y métricas por pool - aceleración x{full_elapsed / fast_elapsed:.1f} "
+          f"({args.healthy_ratio:.0%} líneas sanas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark local (Spark local mode) de búsquedas puntuales sobre Parquet F5:
+bytes leídos para un filtro por ip_cliente_externo / jsession_id / request
+con el writer por defecto vs bloom filters
+(mismas opciones que f5parquet.parquet_write_options del layout legacy).
+
+Requiere pyspark y Java 17 (no forma parte de las pruebas de pytest):
+
+    python3 benchmark_parquet_lookup.py --rows 2000000 --row-group-mb 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from urllib.request import urlopen
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..', 'code', 'layers', 'f5_shared', 'python'))
+from f5parquet import BLOOM_FILTER_COLUMNS as LAYOUT_BLOOM_FILTER_COLUMNS, parquet_write_options
+
+BLOOM_FILTER_COLUMNS = list(LAYOUT_BLOOM_FILTER_COLUMNS['legacy'])
+SORT_COLUMNS = ["f5_pool", "f5_virtualserver", "codigo_respuesta"]
+
+
+def build_df(spark, rows, F):
+    """Registros F5 sintéticos con la cardinalidad de una hora de producción"""
+    return spark.range(rows).select(
+        F.concat_ws(".", F.lit("190"), F.lit("64"),
+                    F.abs(F.hash("id", F.lit(1)) % 256).cast("string"),
+                    F.abs(F.hash("id", F.lit(2)) % 256).cast("string")).alias("ip_cliente_externo"),
+        F.md5(F.abs(F.hash("id", F.lit(3)) % (rows // 5)).cast("string")).alias("jsession_id"),
+        F.concat(F.lit("www.gub.uy/Portal/tramite/"), (F.abs(F.hash("id", F.lit(4))) % 50000).cast("string")).alias("request"),
+        F.concat(F.lit("/PortalGubUy/Pool_"), (F.col("id") % 40).cast("string")).alias("f5_pool"),
+        F.concat(F.lit("/PortalGubUy/vs_"), (F.col("id") % 12).cast("string")).alias("f5_virtualserver"),
+        F.concat(F.lit("bigip-"), (F.col("id") % 3).cast("string")).alias("f5_bigip_name"),
+        F.element_at(F.array(*[F.lit(m) for m in ("GET", "GET", "GET", "POST", "HEAD")]),
+                     (F.col("id") % 5 + 1).cast("int")).alias("metodo"),
+        F.element_at(F.array(*[F.lit(c) for c in (200, 200, 200, 200, 301, 404, 503)]),
+                     (F.col("id") % 7 + 1).cast("int")).alias("codigo_respuesta"),
+        (F.abs(F.hash("id", F.lit(5))) % 9000).alias("tiempo_respuesta_ms"),
+        F.lit("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36").alias("user_agent")
+    ).withColumn(
+        "status_category",
+        F.when(F.col("codigo_respuesta") < 300, "Success")
+         .when(F.col("codigo_respuesta") < 400, "Redirect")
+         .when(F.col("codigo_respuesta") < 500, "Client Error")
+         .otherwise("Server Error")
+    )
+
+
+def stage_input_bytes(spark):
+    """Suma de inputBytes de todas las etapas (API REST de la Spark UI)"""
+    url = f"{spark.sparkContext.uiWebUrl}/api/v1/applications/{spark.sparkContext.applicationId}/stages"
+    with urlopen(url) as response:
+        return sum(stage.get("inputBytes", 0) for stage in json.load(response))
+
+
+def lookup(spark, path, column, value, F):
+    """Ejecuta el filtro puntual y devuelve (filas, bytes leídos, segundos)"""
+    time.sleep(0.5)  # la UI actualiza métricas de forma asíncrona
+    before = stage_input_bytes(spark)
+    start = time.perf_counter()
+    matches = spark.read.parquet(path).where(F.col(column) == value).count()
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5)
+    return matches, stage_input_bytes(spark) - before, elapsed
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de búsqueda puntual con y sin bloom filters Parquet')
+    parser.add_argument('--rows', type=int, default=2000000, help='Cantidad de registros generados')
+    parser.add_argument('--files', type=int, default=4, help='Archivos Parquet por variante')
+    parser.add_argument('--row-group-mb', type=int, default=8, help='Tamaño de row group (parquet.block.size)')
+    args = parser.parse_args()
+
+    from pyspark.sql import SparkSession
+    from pyspark.sql import functions as F
+
+    spark = SparkSession.builder.master("local[4]").appName("f5-parquet-lookup-benchmark").getOrCreate()
+    spark.sparkContext.setLogLevel("WARN")
+    # Los conteos deben leer las columnas filtradas, no solo metadatos
+    spark.conf.set("spark.sql.parquet.aggregatePushdown", "false")
+
+    workdir = tempfile.mkdtemp(prefix="f5-parquet-lookup-")
+    try:
+        df = build_df(spark, args.rows, F).repartition(args.files).sortWithinPartitions(*SORT_COLUMNS).cache()
+        sample = df.select(*BLOOM_FILTER_COLUMNS).limit(1).collect()[0]
+        print(f"Spark {spark.version} - {df.count():,} registros, row groups de {args.row_group_mb} MB")
+
+        variants = {
+            "por defecto": {},
+            "bloom filters": parquet_write_options('legacy')
+        }
+        paths = {}
+        for label, options in variants.items():
+            paths[label] = os.path.join(workdir, label.replace(" ", "_").replace("+", ""))
+            df.write.mode("overwrite") \
+                .option("parquet.block.size", str(args.row_group_mb * 1024 * 1024)) \
+                .options(**options) \
+                .parquet(paths[label])
+            print(f"  {label:<22} {directory_size(paths[label]) / 1024 / 1024:8.1f} MB en disco")
+
+        print("Búsquedas puntuales (bytes leídos por el scan):")
+        for column in BLOOM_FILTER_COLUMNS:
+            value = sample[column]
+            results = {label: lookup(spark, path, column, value, F) for label, path in paths.items()}
+            counts = {matches for matches, _, _ in results.values()}
+            assert len(counts) == 1, f"{column}: resultados distintos {results}"
+            for label, (matches, scanned, elapsed) in results.items():
+                print(f"  {column:<20} {label:<22} {scanned / 1024 / 1024:8.1f} MB  {elapsed:6.2f}s  ({matches} filas)")
+            # Valor inexistente: el caso típico de una investigación sin resultados
+            for label, path in paths.items():
+                _, scanned, _ = lookup(spark, path, column, f"no-existe-{column}", F)
+                print(f"  {column:<20} {label:<22} {scanned / 1024 / 1024:8.1f} MB  (valor inexistente)")
+    finally:
+        spark.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
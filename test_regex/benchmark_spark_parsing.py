@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark local (Spark local mode) del parseo de logs F5 crudos en etl_f5_to_parquet:
+UDF Python con MapType (implementación anterior) vs expresiones nativas Catalyst
+(f5parse.spark_split + to_timestamp/CASE WHEN).
+
+Requiere pyspark y Java 17 (no forma parte de las pruebas de pytest):
+
+    python3 benchmark_spark_parsing.py --rows 1000000 --partitions 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code', 'layers', 'f5_shared', 'python'))
+from f5parse import parse_line, spark_split, FIELD_NAMES
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_f5_logs.txt')
+
+NULLABLE_FIELDS = [
+    'usuario_autenticado', 'identidad', 'referer', 'user_agent',
+    'edad_cache', 'content_type', 'jsession_id', 'campo_reservado_2'
+]
+
+MOBILE_INDICATORS = ['mobile', 'android', 'iphone', 'ipad', 'ipod', 'blackberry', 'windows phone', 'opera mini']
+
+
+def generate_lines(rows):
+    """Genera líneas F5 variando status, tiempos y día a partir de sample_f5_logs.txt"""
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        samples = [line.strip() for line in f if line.strip()]
+    rng = random.Random(42)
+    lines = []
+    for i in range(rows):
+        line = samples[i % len(samples)]
+        line = line.replace('" 200 ', f'" {rng.choice([200, 200, 200, 301, 404, 503])} ', 1)
+        line = line.replace('Time 4213 ', f'Time {rng.randint(1, 9000)} ', 1)
+        lines.append(line.replace('Aug  8', f'Aug {rng.randint(1, 28):2d}', 1))
+    # 1% de líneas que no son F5
+    lines.extend('linea que no es formato F5' for _ in range(rows // 100))
+    return lines
+
+
+def legacy_parse_f5_log(log_line):
+    """Copia del UDF anterior de etl_f5_to_parquet (parse + enriquecimiento en Python)"""
+    data = parse_line(log_line) if log_line else None
+    if not data:
+        return None
+    try:
+        dt_syslog = datetime.strptime(f"{datetime.now().year} {data['timestamp_syslog']}", '%Y %b %d %H:%M:%S')
+        data['parsed_timestamp_syslog'] = dt_syslog.isoformat()
+        data['year'], data['month'], data['day'], data['hour'] = dt_syslog.year, dt_syslog.month, dt_syslog.day, dt_syslog.hour
+    except ValueError:
+        data['parsed_timestamp_syslog'] = data['year'] = data['month'] = data['day'] = data['hour'] = None
+    try:
+        data['parsed_timestamp_rp'] = datetime.strptime(data['timestamp_rp'].split(' ')[0], '%d/%b/%Y:%H:%M:%S').isoformat()
+    except ValueError:
+        data['parsed_timestamp_rp'] = None
+    data['codigo_respuesta'] = int(data['codigo_respuesta'])
+    data['tamano_respuesta'] = int(data['tamano_respuesta'])
+    data['tiempo_respuesta_ms'] = int(data['tiempo_respuesta_ms'])
+    for field in NULLABLE_FIELDS:
+        if data[field] in ('-', '""', ''):
+            data[field] = None
+        elif data[field].startswith('"') and data[field].endswith('"'):
+            data[field] = data[field][1:-1]
+    data['is_error'] = data['codigo_respuesta'] >= 400
+    data['is_slow'] = data['tiempo_respuesta_ms'] > 5000
+    data['is_large'] = data['tamano_respuesta'] > 10485760
+    path_parts = data['request'].split('/')
+    data['request_domain'] = path_parts[0]
+    data['request_path_depth'] = len([p for p in path_parts if p])
+    data['file_extension'] = data['request'].split('.')[-1].split('?')[0].lower() if '.' in data['request'] else None
+    user_agent = (data['user_agent'] or '').lower()
+    data['is_mobile'] = any(indicator in user_agent for indicator in MOBILE_INDICATORS)
+    data['cache_hit'] = data['edad_cache'] not in ('', None, '""', '"')
+    data['f5_environment'] = data['f5_bigip_name']
+    data['processing_timestamp'] = datetime.now().isoformat()
+    data['etl_version'] = '2.1.0'
+    return data
+
+
+def build_udf_df(raw_df, F, T):
+    parse_udf = F.udf(legacy_parse_f5_log, T.MapType(T.StringType(), T.StringType()))
+    parsed_df = raw_df.select(
+        F.col("message").alias("raw_log"),
+        parse_udf(F.col("message")).alias("parsed_data")
+    ).filter(F.col("parsed_data").isNotNull())
+    return parsed_df.select(
+        F.col("raw_log"),
+        *[F.col(f"parsed_data.{name}").alias(name) for name in FIELD_NAMES
+          if name not in ('codigo_respuesta', 'tamano_respuesta', 'tiempo_respuesta_ms')],
+        F.col("parsed_data.codigo_respuesta").cast(T.IntegerType()).alias("codigo_respuesta"),
+        F.col("parsed_data.tamano_respuesta").cast(T.LongType()).alias("tamano_respuesta"),
+        F.col("parsed_data.tiempo_respuesta_ms").cast(T.IntegerType()).alias("tiempo_respuesta_ms"),
+        F.col("parsed_data.parsed_timestamp_syslog").alias("parsed_timestamp_syslog"),
+        F.col("parsed_data.parsed_timestamp_rp").alias("parsed_timestamp_rp"),
+        *[F.col(f"parsed_data.{name}").cast(T.IntegerType()).alias(name) for name in ('year', 'month', 'day', 'hour')]
+    )
+
+
+def build_native_df(raw_df, F, T):
+    """Mismas expresiones que la rama de logs crudos de etl_f5_to_parquet.process_raw_data"""
+    def field(name):
+        return F.col("f5_fields").getItem(FIELD_NAMES.index(name))
+
+    def clean_nullable(column):
+        return F.when(column.isin('-', '""', ''), F.lit(None).cast(T.StringType())).when(
+            column.startswith('"') & column.endswith('"'), column.substr(F.lit(2), F.length(column) - 2)
+        ).otherwise(column)
+
+    parsed_df = raw_df.select(
+        F.col("message").alias("raw_log"),
+        spark_split(F.col("message")).alias("f5_fields")
+    ).filter(F.col("f5_fields").isNotNull())
+    syslog_ts = F.to_timestamp(
+        F.concat_ws(" ", F.year(F.current_date()).cast(T.StringType()), F.regexp_replace(F.col("timestamp_syslog"), r"\s+", " ")),
+        "yyyy MMM d HH:mm:ss"
+    )
+    return parsed_df.select(
+        F.col("raw_log"),
+        *[(clean_nullable(field(name)) if name in NULLABLE_FIELDS else field(name)).alias(name) for name in FIELD_NAMES]
+    ).withColumn("codigo_respuesta", F.col("codigo_respuesta").cast(T.IntegerType())
+    ).withColumn("tamano_respuesta", F.col("tamano_respuesta").cast(T.LongType())
+    ).withColumn("tiempo_respuesta_ms", F.col("tiempo_respuesta_ms").cast(T.IntegerType())
+    ).withColumn("parsed_timestamp_syslog", syslog_ts
+    ).withColumn("parsed_timestamp_rp", F.to_timestamp(
+        F.regexp_replace(F.col("timestamp_rp"), r" [-+]\d{4}$", ""), "dd/MMM/yyyy:HH:mm:ss")
+    ).withColumn("year", F.year("parsed_timestamp_syslog")
+    ).withColumn("month", F.month("parsed_timestamp_syslog")
+    ).withColumn("day", F.dayofmonth("parsed_timestamp_syslog")
+    ).withColumn("hour", F.hour("parsed_timestamp_syslog"))
+
+
+def run(df, label, total_rows, runs):
+    """Ejecuta el plan completo con el sink noop y devuelve filas/segundo (mejor corrida)"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        df.write.format("noop").mode("overwrite").save()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = total_rows / best
+    print(f"  {label:<28} {best:8.2f}s  {rate:12,.0f} filas/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark UDF vs parseo nativo Spark para logs F5')
+    parser.add_argument('--rows', type=int, default=500000, help='Cantidad de líneas generadas')
+    parser.add_argument('--partitions', type=int, default=8, help='Particiones del DataFrame de entrada')
+    parser.add_argument('--runs', type=int, default=3, help='Corridas por variante (se reporta la mejor)')
+    args = parser.parse_args()
+
+    from pyspark.sql import SparkSession
+    from pyspark.sql import functions as F
+    from pyspark.sql import types as T
+
+    spark = SparkSession.builder.master(f"local[{args.partitions}]").appName("f5-parse-benchmark").getOrCreate()
+    spark.sparkContext.setLogLevel("WARN")
+
+    lines = generate_lines(args.rows)
+    raw_df = spark.createDataFrame([(line,) for line in lines], ["message"]).repartition(args.partitions).cache()
+    total_rows = raw_df.count()
+    print(f"Spark {spark.version} - {total_rows:,} líneas en {args.partitions} particiones")
+
+    udf_df = build_udf_df(raw_df, F, T)
+    native_df = build_native_df(raw_df, F, T)
+
+    # Ambas variantes deben aceptar exactamente las mismas líneas
+    udf_count, native_count = udf_df.count(), native_df.count()
+    assert udf_count == native_count, f"UDF={udf_count} nativo={native_count}"
+    mismatches = udf_df.select("codigo_respuesta", "tiempo_respuesta_ms", "f5_pool", "identidad", "year", "hour").exceptAll(
+        native_df.select("codigo_respuesta", "tiempo_respuesta_ms", "f5_pool", "identidad", "year", "hour")
+    ).count()
+    assert mismatches == 0, f"{mismatches} filas difieren entre UDF y parseo nativo"
+
+    print("Resultados:")
+    udf_rate = run(udf_df, "UDF Python (MapType)", total_rows, args.runs)
+    native_rate = run(native_df, "Nativo (spark_split)", total_rows, args.runs)
+    print(f"Aceleración: {native_rate / udf_rate:.1f}x")
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
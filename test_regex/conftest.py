@@ -0,0 +1,68 @@
+"""
+Fixtures compartidas de las pruebas de la Lambda de filtrado
+(test_lambda_*.py): handler con clientes AWS aislados, contexto de
+invocación y líneas F5 de muestra
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [
+    os.path.join(TEST_DIR, '..', 'code', 'lambda', 'log_filter'),
+    os.path.join(TEST_DIR, '..', 'code', 'layers', 'f5_shared', 'python'),
+]
+
+SAMPLE_PATH = os.path.join(TEST_DIR, 'sample_f5_logs.txt')
+
+
+class Context:
+    """Contexto de invocación Lambda con 60 s restantes"""
+
+    def get_remaining_time_in_millis(self):
+        return 60000
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """
+    Módulo lambda_function_f5 con clientes AWS, streams provisionados y tabla
+    de umbrales propios de cada prueba (monkeypatch los restaura al final)
+    """
+    import lambda_function_f5
+
+    monkeypatch.setattr(lambda_function_f5, '_aws_clients', {})
+    monkeypatch.setattr(lambda_function_f5, '_threshold_table', None)
+    monkeypatch.setattr(lambda_function_f5.error_log_sink, 'provisioned_streams', set())
+    monkeypatch.setattr(lambda_function_f5.error_log_sink, 'log_group_ready', False)
+    return lambda_function_f5
+
+
+@pytest.fixture
+def context():
+    return Context()
+
+
+@pytest.fixture
+def sample_line():
+    """
+    Primera línea de sample_f5_logs.txt con código, tiempo de respuesta, path
+    y segundo del timestamp syslog reemplazables. Por defecto es una línea
+    rápida (Time 100) que no supera ningún umbral
+    """
+    with open(SAMPLE_PATH, 'r', encoding='utf-8') as f:
+        line = f.readline().strip()
+
+    def build(status=200, elapsed=100, path=None, second=None):
+        built = line.replace('" 200 ', f'" {status} ', 1)
+        built = re.sub(r'Time \d+ ', f'Time {elapsed} ', built, count=1)
+        if path is not None:
+            built = re.sub(r'"(GET|POST) \S+', lambda match: f'"{match.group(1)} {path}', built, count=1)
+        if second is not None:
+            built = re.sub(r'(\d{2}/\w{3}/\d{4}:\d{2}:\d{2}):\d{2}', rf'\1:{second:02d}', built, count=1)
+        return built
+
+    return build
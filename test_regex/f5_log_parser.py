@@ -13,16 +13,20 @@ import sys
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import argparse
+import os
+
+# Parser F5 compartido (code/layers/f5_shared/python/f5parse.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code', 'layers', 'f5_shared', 'python'))
+from f5parse import F5_LOG_PATTERN, split_line, AVRO_FIELD_NAMES
 
 
 class F5LogParser:
     """Parser para logs F5 con formato TEPROD"""
     
     def __init__(self):
-        # Expresión regular basada en la especificación proporcionada
-        self.regex_pattern = r'(?P<timestamp_syslog>\w{3} \s+\d{1,2} \d{2}:\d{2}:\d{2}) (?P<hostname>[^\s]+) (?P<ip_cliente_externo>[^\s]+) \[(?P<ip_backend_interno>[^\]]+)\] (?P<usuario_autenticado>-|"[^"]*") (?P<identidad>"[^"]*") \[(?P<timestamp_rp>[^\]]+)\] "(?P<metodo>\w+) (?P<request>[^"]+) (?P<protocolo>HTTP/\d\.\d)" (?P<codigo_respuesta>\d+) (?P<tamano_respuesta>\d+) "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)" Time (?P<tiempo_respuesta_ms>\d+) Age "(?P<edad_cache>[^"]*)" "(?P<content_type>[^"]*)" "(?P<jsession_id>[^"]*)" (?P<campo_reservado_2>-|"[^"]*") "(?P<f5_virtualserver>[^"]*)" "(?P<f5_pool>[^"]*)" (?P<f5_bigip_name>\w+)'
-        
-        self.compiled_regex = re.compile(self.regex_pattern)
+        # Expresión regular canónica del parser compartido (fallback de f5parse)
+        self.regex_pattern = F5_LOG_PATTERN.pattern
+        self.compiled_regex = F5_LOG_PATTERN
         
         # Esquema Avro para validación de campos
         self.avro_schema = {
@@ -71,38 +75,36 @@ class F5LogParser:
         if not line:
             return None
             
-        match = self.compiled_regex.match(line)
-        if not match:
+        fields = split_line(line)
+        if fields is None:
             return None
         
-        # Extraer grupos nombrados
-        groups = match.groupdict()
-        
-        # Mapear campos del regex a esquema Avro
+        # Mapear campos del parser compartido a esquema Avro
+        groups = dict(zip(AVRO_FIELD_NAMES, fields))
         parsed_data = {
-            "timestamp_syslog": groups.get("timestamp_syslog", ""),
-            "hostname": groups.get("hostname", ""),
-            "ip_cliente_externo": groups.get("ip_cliente_externo", ""),
-            "ip_red_interna": groups.get("ip_backend_interno", ""),
-            "usuario_autenticado": self._clean_field(groups.get("usuario_autenticado")),
-            "identidad": self._clean_field(groups.get("identidad")),
-            "timestamp_apache": groups.get("timestamp_rp", ""),
-            "metodo": groups.get("metodo", ""),
-            "recurso": groups.get("request", ""),
-            "protocolo": groups.get("protocolo", ""),
-            "codigo_respuesta": self._safe_int(groups.get("codigo_respuesta")),
-            "tamano_respuesta": self._safe_int(groups.get("tamano_respuesta")),
-            "referer": self._clean_field(groups.get("referer")),
-            "user_agent": groups.get("user_agent", ""),
-            "tiempo_respuesta_ms": self._safe_int(groups.get("tiempo_respuesta_ms")),
-            "edad_cache": self._clean_field(groups.get("edad_cache")),
-            "content_type": self._clean_field(groups.get("content_type")),
-            "campo_reservado_1": self._clean_field(groups.get("jsession_id")),
-            "campo_reservado_2": self._clean_field(groups.get("campo_reservado_2")),
+            "timestamp_syslog": groups["timestamp_syslog"],
+            "hostname": groups["hostname"],
+            "ip_cliente_externo": groups["ip_cliente_externo"],
+            "ip_red_interna": groups["ip_red_interna"],
+            "usuario_autenticado": self._clean_field(groups["usuario_autenticado"]),
+            "identidad": self._clean_field(groups["identidad"]),
+            "timestamp_apache": groups["timestamp_apache"],
+            "metodo": groups["metodo"],
+            "recurso": groups["recurso"],
+            "protocolo": groups["protocolo"],
+            "codigo_respuesta": self._safe_int(groups["codigo_respuesta"]),
+            "tamano_respuesta": self._safe_int(groups["tamano_respuesta"]),
+            "referer": self._clean_field(groups["referer"]),
+            "user_agent": groups["user_agent"],
+            "tiempo_respuesta_ms": self._safe_int(groups["tiempo_respuesta_ms"]),
+            "edad_cache": self._clean_field(groups["edad_cache"]),
+            "content_type": self._clean_field(groups["content_type"]),
+            "campo_reservado_1": self._clean_field(groups["campo_reservado_1"]),
+            "campo_reservado_2": self._clean_field(groups["campo_reservado_2"]),
             "campo_reservado_3": None,
-            "ambiente_origen": groups.get("f5_virtualserver", ""),
-            "ambiente_pool": groups.get("f5_pool", ""),
-            "entorno_nodo": groups.get("f5_bigip_name", "")
+            "ambiente_origen": groups["ambiente_origen"],
+            "ambiente_pool": groups["ambiente_pool"],
+            "entorno_nodo": groups["entorno_nodo"]
         }
         
         return parsed_data
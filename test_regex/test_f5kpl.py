@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la de-agregación de registros Kinesis KPL (f5kpl)
+"""
+
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code', 'layers', 'f5_shared', 'python'))
+import f5kpl
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_f5_logs.txt')
+
+
+def sample_lines():
+    with open(SAMPLE_PATH, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n').encode('utf-8') for line in f if line.strip()]
+
+
+def test_round_trip_keeps_every_line():
+    lines = sample_lines()
+    payloads = lines + [gzip.compress(b'\n'.join(lines)), b'']
+    record = f5kpl.aggregate_records('bigip-TEPROD', payloads)
+    assert f5kpl.is_aggregated(record)
+    assert f5kpl.deaggregate(record) == payloads
+
+
+def test_plain_record_passes_through():
+    line = sample_lines()[0]
+    assert f5kpl.deaggregate(line) == [line]
+    assert f5kpl.deaggregate(gzip.compress(line)) == [gzip.compress(line)]
+
+
+def test_checksum_mismatch_is_rejected():
+    record = bytearray(f5kpl.aggregate_records('pk', sample_lines()[:3]))
+    record[10] ^= 0xFF
+    try:
+        f5kpl.deaggregate(bytes(record))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("se esperaba ValueError por checksum inválido")
+
+
+if __name__ == "__main__":
+    test_round_trip_keeps_every_line()
+    test_plain_record_passes_through()
+    test_checksum_mismatch_is_rejected()
+    print("✅ f5kpl: de-agregación, registros planos y checksum")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Pruebas del parser F5 compartido (f5parse) - camino rápido vs regex
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code', 'layers', 'f5_shared', 'python'))
+import f5parse
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_f5_logs.txt')
+
+
+def load_sample_lines():
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def build_variants(line):
+    """Variantes del layout F5 que deben parsear igual con ambos caminos"""
+    long_referer = line.replace('gclid=', 'gclid=' + 'x' * f5parse.FAST_PATH_MIN_LENGTH)
+    return [
+        line,
+        line.replace('Aug  8', 'Aug 18'),
+        line.replace('Aug  8', 'Aug 8'),
+        line.replace(' - "" [', ' "usuario" "id" ['),
+        line.replace('"" - "/Portal', '"" "reservado" "/Portal'),
+        line.replace('HTTP/1.1', 'HTTP/2'),
+        line.replace('" 200 ', '" 503 '),
+        long_referer,
+        long_referer.replace(' - "" [', ' "usuario" "id" ['),
+        'Aug  8 03:33:33 linea que no es F5',
+        '{"message": "json"}',
+    ]
+
+
+def test_fast_path_matches_regex():
+    for line in load_sample_lines():
+        for variant in build_variants(line):
+            match = f5parse.F5_LOG_PATTERN.match(variant)
+            expected = match.groups() if match else None
+            fast = f5parse._split_fast(variant)
+            assert fast is None or fast == expected, variant[:120]
+            assert f5parse.split_line(variant) == expected, variant[:120]
+
+
+def test_fast_path_used_for_long_lines():
+    line = load_sample_lines()[0]
+    long_line = line.replace('gclid=', 'gclid=' + 'x' * f5parse.FAST_PATH_MIN_LENGTH)
+    fields = f5parse._split_fast(long_line)
+    assert fields is not None
+    assert fields[-1] == 'TEPROD'
+    assert fields[10:12] == ('200', '905')
+
+
+def test_parse_line_field_names():
+    line = load_sample_lines()[0]
+    legacy = f5parse.parse_line(line)
+    avro = f5parse.parse_line(line, f5parse.AVRO_FIELD_NAMES)
+    assert legacy['f5_pool'] == avro['ambiente_pool'] == '/PortalGubUy/wwwgubuy-TEPROD-443/Pool_dgi'
+    assert legacy['request'] == avro['recurso']
+    assert legacy['tiempo_respuesta_ms'] == '4213'
+    assert legacy['identidad'] == '""'
+    assert f5parse.parse_line('') is None
+
+
+def triage(line):
+    match = f5parse.match_line(line)
+    return f5parse.triage_fields(match) if match else None
+
+
+def regex_triage(line):
+    match = f5parse.F5_LOG_PATTERN.match(line)
+    return match and tuple(match.group(name) for name in f5parse.TRIAGE_FIELD_NAMES)
+
+
+def test_triage_fields_match_full_parse():
+    for line in load_sample_lines():
+        for variant in build_variants(line) + [line.replace('" 200 905 ', '" 200 9x5 ')]:
+            fields = f5parse.split_line(variant)
+            expected = fields and tuple(fields[index] for index in (10, 11, 14, 16, 19, 20, 21))
+            assert triage(variant) == expected, variant[:120]
+            match = f5parse.match_line(variant)
+            assert (match and f5parse.match_fields(match)) == f5parse.parse_line(variant), variant[:120]
+    assert triage(load_sample_lines()[0]) == (
+        '200', '905', '4213', 'application/javascript', '/PortalGubUy/wwwgubuy-TEPROD-443/wwwgubuy-TEPROD-443',
+        '/PortalGubUy/wwwgubuy-TEPROD-443/Pool_dgi', 'TEPROD')
+    assert triage('Aug  8 03:33:33 linea que no es F5') is None
+
+
+def test_triage_fields_rejects_malformed_lines():
+    import random
+    line = load_sample_lines()[0]
+    malformed = [
+        line.replace('Mozilla', 'Mozi"lla', 1),            # comilla dentro del user agent
+        line.replace('[08/Aug/2025', '08/Aug/2025', 1),     # timestamp sin corchete
+        line.replace('Aug  8 03:33:33', 'Aug 8 3:33', 1),   # prefijo syslog inválido
+        line.replace(' HTTP/1.1"', ' HTTP/1"', 1),          # protocolo inválido
+        line.replace('"GET ', '"', 1),                      # sin método
+    ]
+    for variant in malformed:
+        assert f5parse.F5_LOG_PATTERN.match(variant) is None, variant[:120]
+        assert triage(variant) is None, variant[:120]
+
+    # Mutaciones aleatorias: el triage acepta lo mismo que el parseo completo
+    rng = random.Random(7)
+    for _ in range(3000):
+        chars = list(line)
+        position = rng.randrange(len(chars))
+        mutation = rng.choice(('delete', 'insert', 'replace'))
+        if mutation == 'delete':
+            del chars[position]
+        elif mutation == 'insert':
+            chars.insert(position, rng.choice('"[] -x1'))
+        else:
+            chars[position] = rng.choice('"[] -x1')
+        variant = ''.join(chars)
+        assert triage(variant) == regex_triage(variant), variant[:120]
+        assert (triage(variant) is None) == (f5parse.parse_line(variant) is None), variant[:120]
+
+
+def test_parse_batch_columns():
+    import pytest
+    pa = pytest.importorskip('pyarrow')
+    line = load_sample_lines()[0]
+    batch = f5parse.parse_batch([line, 'linea invalida', line.replace('" 200 ', '" 503 ')])
+    assert batch.num_rows == 3
+    assert batch.schema.field('codigo_respuesta').type == pa.int32()
+    assert batch.schema.field('tiempo_respuesta_ms').type == pa.int64()
+    assert pa.types.is_dictionary(batch.schema.field('f5_pool').type)
+    assert batch.column('codigo_respuesta').to_pylist() == [200, None, 503]
+    assert batch.column('is_valid').to_pylist() == [True, False, True]
+    assert batch.column('f5_bigip_name').null_count == 1
+    assert f5parse.parse_batch([]).num_rows == 0
+
+
+if __name__ == "__main__":
+    test_fast_path_matches_regex()
+    test_fast_path_used_for_long_lines()
+    test_parse_line_field_names()
+    test_triage_fields_match_full_parse()
+    test_triage_fields_rejects_malformed_lines()
+    test_parse_batch_columns()
+    print("✅ f5parse: camino rápido y regex producen los mismos campos")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Pruebas del esquema generado de f5_logs (scripts/generate_f5_schema.py)
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'code', 'layers', 'f5_shared', 'python'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'scripts'))
+import f5parse
+import f5schema
+import generate_f5_schema
+
+
+def test_generated_files_up_to_date():
+    with open(generate_f5_schema.MODULE_PATH, 'r', encoding='utf-8') as f:
+        assert f.read() == generate_f5_schema.render_spark_module(generate_f5_schema.load_table_schema())
+    for schema_path, ddl_path in generate_f5_schema.TABLE_SCHEMAS.items():
+        with open(ddl_path, 'r', encoding='utf-8') as f:
+            assert f.read() == generate_f5_schema.render_ddl(generate_f5_schema.load_table_schema(schema_path), schema_path)
+
+
+def test_columns_match_avro_fields():
+    names = [name for name, _ in f5schema.COLUMNS]
+    assert tuple(names[:len(f5parse.AVRO_FIELD_NAMES)]) == f5parse.AVRO_FIELD_NAMES
+    assert len(names) == len(set(names)) == 34
+    assert [name for name, _ in f5schema.PARTITION_KEYS] == ['year', 'month', 'day', 'hour']
+    assert all(column_type in f5schema.SPARK_TYPES for _, column_type in f5schema.COLUMNS + f5schema.PARTITION_KEYS)
+
+
+if __name__ == "__main__":
+    test_generated_files_up_to_date()
+    test_columns_match_avro_fields()
+    print("✅ f5schema: esquema generado al día con f5-logs-table-schema.yaml")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Pruebas del sketch de latencia mergeable (f5sketch)
+"""
+
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code', 'layers', 'f5_shared', 'python'))
+import f5sketch
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [int(rng.lognormvariate(6, 1.2)) + 2 for _ in range(20000)]
+    sketch = f5sketch.LatencySketch()
+    for value in values:
+        sketch.add(value)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= expected * f5sketch.RELATIVE_ACCURACY, q
+    assert sketch.count == len(values)
+    assert sketch.max == max(values)
+
+
+def test_merge_equals_single_sketch():
+    rng = random.Random(11)
+    hourly = []
+    combined = f5sketch.LatencySketch()
+    for _ in range(24):
+        sketch = f5sketch.LatencySketch()
+        for _ in range(500):
+            value = rng.randint(0, 9000)
+            sketch.add(value)
+            combined.add(value)
+        hourly.append(sketch)
+    merged = f5sketch.merge_all(hourly)
+    assert merged.buckets == combined.buckets
+    assert merged.quantile(0.99) == combined.quantile(0.99)
+    assert merged.count == 24 * 500
+
+
+def test_bytes_round_trip():
+    sketch = f5sketch.LatencySketch()
+    for value in (0, 1, 2, 37, 4213, 4213, 60000):
+        sketch.add(value)
+    restored = f5sketch.LatencySketch.from_bytes(sketch.to_bytes())
+    assert restored.buckets == sketch.buckets
+    assert (restored.count, restored.sum, restored.max) == (sketch.count, sketch.sum, sketch.max)
+    assert f5sketch.LatencySketch().quantile(0.5) is None
+    assert f5sketch.bucket_index(1) == 0 and f5sketch.bucket_index(100) == 231
+
+
+if __name__ == "__main__":
+    test_quantiles_within_relative_accuracy()
+    test_merge_equals_single_sketch()
+    test_bytes_round_trip()
+    print("✅ f5sketch: cuantiles, merge y serialización")
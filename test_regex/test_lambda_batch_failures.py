@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Pruebas de las fallas parciales (ReportBatchItemFailures) de la Lambda de
+filtrado: el primer registro que no se puede decodificar se reporta por su
+sequenceNumber y los anteriores se entregan
+"""
+
+import base64
+import json
+
+import pytest
+
+
+class RecordingClient:
+    """Cliente CloudWatch/CloudWatch Logs sin red que registra las llamadas"""
+
+    class exceptions:
+        class ResourceAlreadyExistsException(Exception):
+            pass
+
+        class ResourceNotFoundException(Exception):
+            pass
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(**kwargs):
+            self.calls.append((name, kwargs))
+            return {}
+        return call
+
+
+def kinesis_record(data, sequence_number):
+    return {'kinesis': {
+        'data': base64.b64encode(data).decode('ascii'),
+        'sequenceNumber': sequence_number,
+        'partitionKey': 'test'
+    }}
+
+
+class FailingLogsClient(RecordingClient):
+    """CloudWatch Logs que rechaza PutLogEvents"""
+
+    def put_log_events(self, **kwargs):
+        raise RuntimeError('ThrottlingException')
+
+
+@pytest.fixture
+def invoke(handler, context, monkeypatch):
+    """Invoca el handler con clientes que registran las llamadas; devuelve (respuesta, cliente logs)"""
+    def call(event, logs=None, cloudwatch=None, metrics_mode='false'):
+        logs = handler._aws_clients['logs'] = logs or RecordingClient()
+        handler._aws_clients['cloudwatch'] = cloudwatch or RecordingClient()
+        monkeypatch.setattr(handler, 'METRICS_MODE', metrics_mode)
+        return handler.lambda_handler(event, context), logs
+    return call
+
+
+def test_first_bad_record_is_reported(invoke, sample_line):
+    import f5kpl  # layer f5_shared, en sys.path vía conftest.py
+
+    corrupted = bytearray(f5kpl.aggregate_records('pk', [sample_line(503).encode('utf-8')]))
+    corrupted[10] ^= 0xFF
+    event = {'Records': [
+        kinesis_record(f"{sample_line()}\n{sample_line(503)}".encode('utf-8'), '100'),
+        kinesis_record(bytes(corrupted), '200'),
+        kinesis_record(sample_line(500).encode('utf-8'), '300'),
+    ]}
+
+    response, logs = invoke(event)
+
+    assert response['batchItemFailures'] == [{'itemIdentifier': '200'}]
+    assert response['statusCode'] == 500
+    assert json.loads(response['body'])['processed_records'] == 1
+    assert 'state' not in response
+    # Solo el registro anterior al fallido se entrega (el 300 se reintenta)
+    sent = [json.loads(event['message'])['parsed_data']['codigo_respuesta']
+            for name, kwargs in logs.calls if name == 'put_log_events' for event in kwargs['logEvents']]
+    assert sent == [503]
+
+
+def test_clean_batch_has_no_failures(invoke, sample_line):
+    response, logs = invoke({'Records': [kinesis_record(sample_line().encode('utf-8'), '100')]})
+    assert response['batchItemFailures'] == []
+    assert response['statusCode'] == 200
+    assert not any(name == 'put_log_events' for name, _ in logs.calls)
+
+
+def test_logs_failure_reports_first_record_with_errors(invoke, sample_line):
+    event = {'Records': [
+        kinesis_record(sample_line().encode('utf-8'), '100'),
+        kinesis_record(f"{sample_line()}\n{sample_line(503)}".encode('utf-8'), '200'),
+        kinesis_record(sample_line().encode('utf-8'), '300'),
+    ]}
+    cloudwatch = RecordingClient()
+
+    response, _ = invoke(event, logs=FailingLogsClient(), cloudwatch=cloudwatch, metrics_mode='api')
+
+    assert response['batchItemFailures'] == [{'itemIdentifier': '200'}]
+    # Solo se publican las métricas del registro anterior al que se reintenta
+    request_counts = [metric['Value'] for name, kwargs in cloudwatch.calls if name == 'put_metric_data'
+                      for metric in kwargs['MetricData'] if metric['MetricName'] == 'RequestCount']
+    assert request_counts == [1]
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Pruebas del colapso de líneas de error por huella en la Lambda de filtrado
+(ErrorFingerprintCollapser)
+"""
+
+import pytest
+
+
+def test_normalize_path(handler):
+    assert handler.normalize_path('/api/clientes/12345/pedidos/9?x=1') == '/api/clientes/{id}/pedidos/{id}'
+    assert handler.normalize_path('/app/login.jsp;jsessionid=ABC') == '/app/login.jsp'
+    assert handler.normalize_path('/doc/3f2504e0-4f89-11d3-9a0c-0305e82c3301') == '/doc/{id}'
+    assert handler.normalize_path('/v2/index.html') == '/v2/index.html'
+
+
+def test_repeats_collapse_into_one_event(handler, sample_line):
+    collapser = handler.ErrorFingerprintCollapser(enabled=True, sample_lines=2)
+    lines = ([sample_line(503, path=f'/api/clientes/{i}', second=i) for i in range(10)]
+             + [sample_line(404, path='/favicon.ico', second=5)])
+    for line in lines:
+        error_log = handler.process_f5_log_line(line, thresholds=handler.ThresholdTable({}))
+        assert error_log is not None
+        collapser.add(error_log)
+    collapser.add({'log_type': 'f5_generic_error', 'original_log': 'FATAL backend down'})
+
+    events = collapser.events()
+    assert len(collapser) == 12
+    assert len(events) == 3
+    collapsed = [event for event in events if 'collapsed' in event]
+    assert len(collapsed) == 1
+    summary = collapsed[0]['collapsed']
+    assert summary['count'] == 10
+    assert summary['fingerprint']['path'] == '/api/clientes/{id}'
+    assert summary['sample_logs'] == lines[1:3]
+    assert summary['first_seen'] < summary['last_seen']
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la tabla de umbrales de la Lambda de filtrado: un refresco fallido
+de SSM conserva la tabla anterior en lugar de volver al archivo empaquetado
+"""
+
+import json
+
+import pytest
+
+POOL = '/Common/Pool_api'
+
+
+class FlakySSM:
+    """Cliente SSM que responde una vez con la tabla (ninguna si config es None) y después falla"""
+
+    def __init__(self, config):
+        self.responses = [] if config is None else [{'Parameter': {'Value': json.dumps(config)}}]
+
+    def get_parameter(self, Name):
+        if not self.responses:
+            raise RuntimeError("ThrottlingException: Rate exceeded")
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def ssm_handler(handler, monkeypatch):
+    monkeypatch.setattr(handler, 'THRESHOLDS_PARAMETER', '/test/f5-log-filter/thresholds')
+    return handler
+
+
+def test_failed_refresh_keeps_previous_table(ssm_handler, monkeypatch):
+    monkeypatch.setattr(ssm_handler, 'THRESHOLDS_TTL_SECONDS', 0)  # cada llamada refresca
+    ssm_handler._aws_clients['ssm'] = FlakySSM({'pool': {POOL: {'slow_response_ms': 300}}})
+
+    loaded = ssm_handler.get_thresholds()
+    assert loaded.lookup(POOL, '', 'text/html')[0] == 300
+
+    refreshed = ssm_handler.get_thresholds()
+    assert refreshed is loaded
+    assert refreshed.lookup(POOL, '', 'text/html')[0] == 300
+
+
+def test_first_load_failure_uses_bundled_file(ssm_handler):
+    ssm_handler._aws_clients['ssm'] = FlakySSM(None)
+
+    with open(ssm_handler.THRESHOLDS_FILE, 'r', encoding='utf-8') as f:
+        bundled = ssm_handler.ThresholdTable(json.load(f))
+    assert ssm_handler.get_thresholds().default == bundled.default
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la ventana tumbling de la Lambda de filtrado: las métricas por pool
+viajan en 'state' entre invocaciones y se publican una sola vez al cerrar la
+ventana (isFinalInvokeForWindow)
+"""
+
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+WINDOW = {'start': '2025-08-08T06:33:00Z', 'end': '2025-08-08T06:34:00Z'}
+
+
+def window_event(lines, state, final):
+    """Evento Kinesis de una ventana con las líneas indicadas en un registro"""
+    data = '\n'.join(lines)
+    return {
+        'Records': [{'kinesis': {
+            'data': base64.b64encode(data.encode('utf-8')).decode('ascii'),
+            'sequenceNumber': '100',
+            'partitionKey': 'test'
+        }}],
+        'window': WINDOW,
+        'state': state,
+        'shardId': 'shardId-000000000000',
+        'isFinalInvokeForWindow': final,
+        'isWindowTerminatedEarly': False
+    }
+
+
+@pytest.fixture
+def invoke_emf(handler, context, monkeypatch, capsys):
+    """Invoca el handler en modo EMF y devuelve (respuesta, documentos EMF)"""
+    monkeypatch.setattr(handler, 'METRICS_MODE', 'emf')
+
+    def call(event):
+        capsys.readouterr()
+        response = handler.lambda_handler(event, context)
+        output = capsys.readouterr().out
+        return response, [json.loads(line) for line in output.splitlines() if line.startswith('{"_aws"')]
+    return call
+
+
+def test_state_round_trip(handler):
+    aggregator = handler.PoolMetricsAggregator()
+    for elapsed in (12, 250, 250, 900, 7000):
+        aggregator.add('TEPROD', '/Common/Pool_a', 200, elapsed)
+    aggregator.add('TEPROD', '/Common/Pool_b', 503, 40)
+
+    restored = handler.PoolMetricsAggregator.from_state(json.loads(json.dumps(aggregator.to_state())))
+
+    assert restored.total_lines == 6
+    assert restored.pools.keys() == aggregator.pools.keys()
+    for key, stats in aggregator.pools.items():
+        for counter in ('total_requests', 'error_requests', 'slow_requests'):
+            assert restored.pools[key][counter] == stats[counter]
+        assert restored.pools[key]['latency'].buckets == stats['latency'].buckets
+        assert restored.pools[key]['latency'].quantile(0.95) == stats['latency'].quantile(0.95)
+    assert handler.PoolMetricsAggregator.from_state({}).pools == {}
+
+
+def test_metrics_flushed_once_when_window_closes(invoke_emf, sample_line):
+    first, documents = invoke_emf(window_event([sample_line(elapsed=elapsed) for elapsed in (100, 200, 300)],
+                                               {}, final=False))
+    assert documents == []
+    assert first['batchItemFailures'] == []
+    assert first['state']['total_lines'] == 3
+
+    last, documents = invoke_emf(window_event([sample_line(elapsed=elapsed) for elapsed in (400, 500)],
+                                              first['state'], final=True))
+    assert last['state'] == {}
+    assert len(documents) == 1
+    document = documents[0]
+    assert document['RequestCount'] == 5
+    assert document['Pool'] == '/PortalGubUy/wwwgubuy-TEPROD-443/Pool_dgi'
+    window_start = datetime(2025, 8, 8, 6, 33, tzinfo=timezone.utc)
+    assert document['_aws']['Timestamp'] == int(window_start.timestamp() * 1000)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))